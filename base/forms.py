@@ -3,6 +3,7 @@ from .models import Pedido, PedidoProducto, PedidoMenu, Menu, MenuProducto, Gast
 from django.forms import DateTimeInput, inlineformset_factory
 from django.utils import timezone
 from django.forms import formset_factory
+from django.urls import reverse
 
 class PedidoForm(forms.ModelForm):
     class Meta:
@@ -29,7 +30,7 @@ class PedidoMenuForm(forms.ModelForm):
 class MenuForm(forms.ModelForm):
     class Meta:
         model = Menu
-        fields = ['nombre', 'precio']
+        fields = ['nombre', 'precio', 'contador', 'peso_contador']
 
 class MenuProductoForm(forms.ModelForm):
     class Meta:
@@ -181,13 +182,25 @@ class ClienteForm(forms.ModelForm):
             'cif_dni': 'CIF/DNI',
         }
 
+# Cliente con autocompletado: en vez de un <select> con todos los clientes, un buscador que consulta
+# la vista 'buscar_clientes' y guarda el id elegido en un campo oculto
+class BusquedaClienteWidget(forms.Widget):
+    template_name = 'carniceria/clientes/widget_busqueda_cliente.html'
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        # Solo se carga el cliente ya elegido (al editar o si el formulario vuelve con errores)
+        context['widget']['cliente'] = Cliente.objects.filter(pk=value).first() if str(value or '').isdigit() else None
+        context['widget']['url'] = reverse('buscar_clientes')
+        return context
+
 class FacturaForm(forms.ModelForm):
     class Meta:
         model = Factura
-        fields = ['cliente', 'numero_factura']
+        # El número de factura lo asigna el contador de la serie al crearla
+        fields = ['cliente']
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-control'}),
-            'numero_factura': forms.TextInput(attrs={'class': 'form-control'}),
+            'cliente': BusquedaClienteWidget(attrs={'class': 'form-control'}),
         }
 
 class FacturaProductoForm(forms.ModelForm):
@@ -0,0 +1,88 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Se ejecuta en un proceso nuevo, como un worker recién arrancado: mide la importación de Django, las apps y
+# la aplicación WSGI, y la primera y la segunda petición a la página de login
+MEDIR_WORKER = '''
+import json, sys, time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+inicio = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+importado = time.perf_counter()
+
+from django.conf import settings
+
+def peticion(ruta):
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+    entorno = {'PATH_INFO': ruta, 'HTTP_HOST': host, 'SERVER_NAME': host, 'SERVER_PORT': '443',
+               'wsgi.url_scheme': 'https', 'wsgi.input': BytesIO()}
+    setup_testing_defaults(entorno)
+    estado = []
+    inicio = time.perf_counter()
+    b''.join(application(entorno, lambda status, headers, exc_info=None: estado.append(status)))
+    return (time.perf_counter() - inicio) * 1000, estado[0]
+
+primera, estado = peticion('/login/')
+segunda, _ = peticion('/login/')
+json.dump({'importacion_ms': (importado - inicio) * 1000, 'primera_ms': primera, 'segunda_ms': segunda,
+           'estado': estado, 'modulos': len(sys.modules),
+           'barra_depuracion': any(modulo.startswith('debug_toolbar') for modulo in sys.modules)}, sys.stdout)
+'''
+
+
+# Recopilar los estáticos para una configuración (la de producción necesita el manifiesto de los nombres con hash)
+def recopilar_estaticos(modulo_settings, static_root):
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': modulo_settings, 'STATIC_ROOT': str(static_root)}
+    subprocess.run([sys.executable, 'manage.py', 'collectstatic', '--noinput', '-v0'], cwd=settings.BASE_DIR,
+                   env=entorno, check=True)
+
+
+# Arrancar un worker con la configuración indicada y devolver sus tiempos
+def medir_arranque(modulo_settings, entorno_extra=None):
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': modulo_settings, **(entorno_extra or {})}
+    salida = subprocess.run([sys.executable, '-c', MEDIR_WORKER], cwd=settings.BASE_DIR, env=entorno,
+                            capture_output=True, text=True, check=True)
+    return json.loads(salida.stdout)
+
+
+class Command(BaseCommand):
+    help = ('Compara el arranque en frío de un worker (importación y primera petición) con la configuración '
+            'de desarrollo y la de producción')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Workers que se arrancan con cada configuración')
+        parser.add_argument('--settings-comparar', nargs='+', default=['pettisso.settings', 'pettisso.settings_produccion'],
+                            dest='modulos', help='Módulos de configuración a comparar')
+        parser.add_argument('--presupuesto-ms', type=float,
+                            help='Falla si la mediana de importación + primera petición de alguna configuración lo supera '
+                                 '(p. ej. 1500 para avisar de que algo pesado ha entrado en el arranque)')
+
+    def handle(self, *args, **options):
+        excedidos = []
+        with tempfile.TemporaryDirectory() as carpeta:
+            # Base de datos y estáticos temporales para no tocar los del proyecto
+            entorno = {'STATIC_ROOT': os.path.join(carpeta, 'static'), 'DB_NOMBRE': os.path.join(carpeta, 'db.sqlite3')}
+            for modulo in options['modulos']:
+                recopilar_estaticos(modulo, entorno['STATIC_ROOT'])
+                medidas = [medir_arranque(modulo, entorno) for _ in range(options['repeticiones'])]
+                mediana = {clave: statistics.median(medida[clave] for medida in medidas)
+                           for clave in ('importacion_ms', 'primera_ms', 'segunda_ms', 'modulos')}
+                self.stdout.write(
+                    f'{modulo:>30}: importación {mediana["importacion_ms"]:6.1f} ms  '
+                    f'primera petición {mediana["primera_ms"]:6.1f} ms  siguiente {mediana["segunda_ms"]:5.1f} ms  '
+                    f'{mediana["modulos"]:.0f} módulos  ({medidas[0]["estado"]})')
+                arranque = mediana['importacion_ms'] + mediana['primera_ms']
+                if options['presupuesto_ms'] and arranque > options['presupuesto_ms']:
+                    excedidos.append(f'{modulo} ({arranque:.0f} ms)')
+        if excedidos:
+            raise CommandError(f'Arranque por encima de {options["presupuesto_ms"]:.0f} ms: {", ".join(excedidos)}')
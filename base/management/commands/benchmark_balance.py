@@ -0,0 +1,70 @@
+from datetime import timedelta
+from decimal import Decimal
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from base.models import FacturasIVA, FacturaTienda, GastosTienda, PagosBanco, Venta
+from base.services.balance_service import AGRUPACIONES, balance_carniceria
+from base.services.resumen_carniceria_service import recalcular_resumen_carniceria
+
+
+class Deshacer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia del balance de la carnicería con varios años de datos. Los datos de prueba se deshacen al terminar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--años', type=int, default=5, help='Años de movimientos diarios a generar')
+        parser.add_argument('--repeticiones', type=int, default=20, help='Mediciones de cada consulta')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                filas = self.generar_datos(options['años'])
+                self.stdout.write(f'{filas} movimientos en {options["años"]} años')
+                self.medir('5 aggregate (totales)', self.totales_por_separado, options['repeticiones'])
+                for agrupacion in AGRUPACIONES:
+                    self.medir(f'resumen por {agrupacion}', lambda: balance_carniceria(agrupacion=agrupacion),
+                               options['repeticiones'])
+                raise Deshacer
+        except Deshacer:
+            pass
+
+    # Un día con una venta, compras a proveedores y algún gasto o pago
+    def generar_datos(self, años):
+        hoy = timezone.localdate()
+        dias = [hoy - timedelta(days=i) for i in range(años * 365)]
+        importe = lambda: Decimal(random.randint(1000, 200000)) / 100
+        Venta.objects.bulk_create(Venta(fecha=dia, total=importe()) for dia in dias)
+        FacturasIVA.objects.bulk_create(FacturasIVA(proveedor='Proveedor', numero_factura=f'B-{i}', fecha=dia, total=importe())
+                                        for i, dia in enumerate(dias))
+        FacturaTienda.objects.bulk_create(FacturaTienda(proveedor='Proveedor', fecha=dia, total=importe()) for dia in dias[::2])
+        GastosTienda.objects.bulk_create(GastosTienda(fecha=dia, gasto='Gasto', total=importe()) for dia in dias[::3])
+        PagosBanco.objects.bulk_create(PagosBanco(fecha=dia, concepto='Pago', total=importe()) for dia in dias[::7])
+        # bulk_create no lanza las señales: reconstruir el resumen diario
+        recalcular_resumen_carniceria()
+        return sum(modelo.objects.count() for modelo in (Venta, FacturasIVA, FacturaTienda, GastosTienda, PagosBanco))
+
+    # Cálculo anterior: un aggregate por tabla y solo totales
+    def totales_por_separado(self):
+        return [modelo.objects.aggregate(total=Sum('total'))['total']
+                for modelo in (Venta, FacturasIVA, FacturaTienda, GastosTienda, PagosBanco)]
+
+    def medir(self, etiqueta, consulta, repeticiones):
+        consulta()  # Calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                consulta()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        self.stdout.write(f'{etiqueta:>24}: {len(consultas)} consultas  media {statistics.mean(tiempos):.1f} ms  '
+                          f'p95 {sorted(tiempos)[int(len(tiempos) * 0.95) - 1]:.1f} ms')
@@ -0,0 +1,135 @@
+from decimal import Decimal
+from pathlib import Path
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from base.models import Pedido, Producto
+
+PRAGMAS_DEFECTO = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+PRAGMAS_WAL = {'journal_mode': 'WAL', 'busy_timeout': 5000, 'synchronous': 'NORMAL', 'mmap_size': 256 * 1024 * 1024}
+
+# Perfiles de SQLite que se comparan: (PRAGMAs de cada conexión, CONN_MAX_AGE). Cada uno cambia una sola cosa
+# respecto al anterior para saber qué parte de la mejora es de los PRAGMAs y cuál de reutilizar las conexiones
+MODOS_SQLITE = {
+    'defecto': (PRAGMAS_DEFECTO, 0),
+    'wal': (PRAGMAS_WAL, 0),
+    'wal_conexiones': (PRAGMAS_WAL, 60),
+}
+CLIENTE_BENCHMARK = 'Benchmark escrituras'
+
+
+class Command(BaseCommand):
+    help = ('Mide cuántos pedidos por segundo admite PedidoCreateView con varios hilos escribiendo a la vez en cada modo '
+            'de la base de datos. Con SQLite se escribe en una copia temporal de la base de datos configurada')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4, help='Hilos que crean pedidos a la vez')
+        parser.add_argument('--pedidos', type=int, default=25, help='Pedidos que crea cada hilo')
+        parser.add_argument('--modos', nargs='+', choices=list(MODOS_SQLITE), default=list(MODOS_SQLITE),
+                            help='Modos de SQLite a comparar (con PostgreSQL se mide solo la configuración actual)')
+        parser.add_argument('--usar-bd-configurada', action='store_true',
+                            help='Con PostgreSQL, aceptar que los pedidos de prueba se escriban en la base de datos '
+                                 'configurada (se borran al terminar)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            if not options['usar_bd_configurada']:
+                raise CommandError('Solo se copia la base de datos con SQLite: con otro motor se escribiría en la base de '
+                                   'datos configurada. Usa --usar-bd-configurada o un DB_NOMBRE de pruebas.')
+            producto = self.preparar_datos()
+            try:
+                self.medir(connection.vendor, {}, settings.DB_CONN_MAX_AGE, options['hilos'], options['pedidos'])
+            finally:
+                Pedido.objects.filter(nombre_cliente=CLIENTE_BENCHMARK).delete()
+                producto.delete()
+            return
+
+        nombre_original = connection.settings_dict['NAME']
+        pragmas_originales = settings.SQLITE_PRAGMAS
+        max_age_original = connection.settings_dict['CONN_MAX_AGE']
+        with tempfile.TemporaryDirectory() as carpeta:
+            try:
+                self.usar_copia(nombre_original, Path(carpeta) / 'db.sqlite3')
+                self.preparar_datos()
+                self.stdout.write(f'{"modo":>15}  {"journal_mode":>12}  {"synchronous":>11}  {"CONN_MAX_AGE":>12}')
+                for modo in options['modos']:
+                    pragmas, max_age = MODOS_SQLITE[modo]
+                    self.medir(modo, pragmas, max_age, options['hilos'], options['pedidos'])
+            finally:
+                connections.close_all()
+                settings.SQLITE_PRAGMAS = pragmas_originales
+                connections.settings['default'].update(NAME=nombre_original, CONN_MAX_AGE=max_age_original)
+
+    # Copiar la base de datos configurada (con la API de copia de SQLite, que incluye lo pendiente del WAL)
+    # o crear una vacía con las migraciones si aún no existe, y pasar a usarla
+    def usar_copia(self, origen, destino):
+        connections.close_all()
+        if Path(origen).exists():
+            fuente, copia = sqlite3.connect(origen), sqlite3.connect(destino)
+            try:
+                fuente.backup(copia)
+            finally:
+                fuente.close()
+                copia.close()
+            connections.settings['default']['NAME'] = str(destino)
+        else:
+            connections.settings['default']['NAME'] = str(destino)
+            call_command('migrate', verbosity=0)
+        self.stdout.write(f'Copia temporal de la base de datos: {destino}')
+
+    def preparar_datos(self):
+        producto = Producto.objects.create(nombre='Pollo benchmark', categoria='principal', precio=Decimal('10.00'))
+        self.datos = {'nombre_cliente': CLIENTE_BENCHMARK, 'fecha_hora': '2024-05-12T14:00', 'observaciones': '',
+                      'productos[0][producto]': producto.id, 'productos[0][cantidad]': 1}
+        self.host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        return producto
+
+    # Cerrar las conexiones abiertas para que las nuevas se creen con los PRAGMAs y CONN_MAX_AGE del modo
+    def preparar_modo(self, pragmas, max_age):
+        connections.close_all()
+        settings.SQLITE_PRAGMAS = pragmas
+        connections.settings['default']['CONN_MAX_AGE'] = max_age
+        connection.ensure_connection()
+
+    def medir(self, modo, pragmas, max_age, hilos, pedidos):
+        self.preparar_modo(pragmas, max_age)
+        tiempos, errores = [], []
+
+        def crear_pedidos():
+            cliente = Client(HTTP_HOST=self.host)
+            try:
+                for _ in range(pedidos):
+                    inicio = time.perf_counter()
+                    try:
+                        response = cliente.post(reverse('crear_pedido'), self.datos)
+                        if response.status_code != 302:
+                            errores.append(f'HTTP {response.status_code}')
+                    except Exception as error:  # p. ej. OperationalError: database is locked
+                        errores.append(str(error))
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+            finally:
+                connection.close()
+
+        inicio = time.perf_counter()
+        trabajadores = [threading.Thread(target=crear_pedidos) for _ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+
+        correctos = len(tiempos) - len(errores)
+        self.stdout.write(f'{modo:>15}  {pragmas.get("journal_mode", "-"):>12}  {pragmas.get("synchronous", "-"):>11}  '
+                          f'{max_age:>12}: {correctos / duracion:7.1f} pedidos/s  media {statistics.mean(tiempos):.1f} ms  '
+                          f'p95 {sorted(tiempos)[int(len(tiempos) * 0.95) - 1]:.1f} ms  errores {len(errores)}')
+        for error in sorted(set(errores))[:3]:
+            self.stdout.write(f'{"":>17}{error}')
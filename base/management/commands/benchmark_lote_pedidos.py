@@ -0,0 +1,63 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from base.models import Menu, Producto
+from base.services.lote_pedidos_service import registrar_lote_pedidos
+
+
+class Deshacer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Mide el alta de pedidos en lote (pedidos/segundo). Todos los cambios se deshacen al terminar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pedidos', type=int, default=1000, help='Pedidos a registrar en cada medición')
+        parser.add_argument('--lotes', default='1,10,50,200', help='Tamaños de lote separados por comas')
+        parser.add_argument('--lineas', type=int, default=4, help='Líneas de producto por pedido')
+
+    def handle(self, *args, **options):
+        tamaños = [int(tamaño) for tamaño in options['lotes'].split(',')]
+        try:
+            with transaction.atomic():
+                productos, menus = self.preparar_catalogo()
+                for tamaño in tamaños:
+                    datos = self.generar_pedidos(options['pedidos'], options['lineas'], productos, menus)
+                    inicio = time.perf_counter()
+                    for desde in range(0, len(datos), tamaño):
+                        _, errores = registrar_lote_pedidos(datos[desde:desde + tamaño])
+                        if errores:
+                            raise ValueError(errores)
+                    segundos = time.perf_counter() - inicio
+                    self.stdout.write(f'lote={tamaño:>4}  {len(datos)} pedidos en {segundos:.2f}s  '
+                                      f'{len(datos) / segundos:,.0f} pedidos/s')
+                raise Deshacer
+        except Deshacer:
+            pass
+
+    # Usar el catálogo existente o crear uno temporal si está vacío
+    def preparar_catalogo(self):
+        productos = list(Producto.objects.values_list('id', flat=True))
+        menus = list(Menu.objects.values_list('id', flat=True))
+        if not productos:
+            productos = [Producto.objects.create(nombre=f'Producto {i}', categoria='principal', precio=Decimal('5.00')).id
+                         for i in range(10)]
+        if not menus:
+            menus = [Menu.objects.create(nombre='Menú prueba', precio=Decimal('12.00')).id]
+        return productos, menus
+
+    def generar_pedidos(self, cantidad, lineas, productos, menus):
+        ahora = timezone.localtime().replace(hour=13, minute=0, second=0, microsecond=0)
+        return [{
+            'nombre_cliente': f'Cliente {i}',
+            'fecha_hora': (ahora + timedelta(minutes=i % 150)).strftime('%Y-%m-%dT%H:%M'),
+            'productos': [{'producto': producto, 'cantidad': random.randint(1, 3)}
+                          for producto in random.sample(productos, min(lineas, len(productos)))],
+            'menus': [{'menu': random.choice(menus), 'cantidad': 1}],
+        } for i in range(cantidad)]
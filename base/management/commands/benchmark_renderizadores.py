@@ -0,0 +1,80 @@
+from decimal import Decimal
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from base.models import Cliente, Factura, FacturaProducto
+from base.services.renderizadores_pdf import RENDERIZADORES, obtener_renderizador
+
+try:
+    import resource  # Solo en Unix: memoria máxima de los procesos hijos (wkhtmltopdf)
+except ImportError:
+    resource = None
+
+
+class Deshacer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compara la latencia por factura y la memoria de los renderizadores de PDF. Las facturas de prueba se deshacen al terminar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--facturas', type=int, default=20, help='Facturas a renderizar con cada renderizador')
+        parser.add_argument('--lineas', type=int, default=15, help='Líneas por factura')
+        parser.add_argument('--renderizadores', default=','.join(RENDERIZADORES), help='Renderizadores separados por comas')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                facturas = self.crear_facturas(options['facturas'], options['lineas'])
+                for nombre in options['renderizadores'].split(','):
+                    self.medir(obtener_renderizador(nombre), facturas)
+                raise Deshacer
+        except Deshacer:
+            pass
+
+    def crear_facturas(self, cantidad, lineas):
+        cliente = Cliente.objects.create(nombre='Cliente de prueba', codigo='BENCH-PDF', direccion='Calle Mayor 1',
+                                         cif_dni='BENCH-PDF')
+        facturas = []
+        for i in range(cantidad):
+            factura = Factura.objects.create(cliente=cliente, numero_factura=f'B-{i}')
+            for j in range(lineas):
+                FacturaProducto.objects.create(factura=factura, descripcion=f'Pieza {j}', cantidad=Decimal('1.250'),
+                                               precio_kg=Decimal('12.90'))
+            factura.save()
+            facturas.append((Factura.objects.select_related('cliente').get(pk=factura.pk),
+                             list(factura.facturaproducto_set.all())))
+        return facturas
+
+    def medir(self, renderizador, facturas):
+        try:
+            renderizador.renderizar(*facturas[0])  # Calentamiento (fuentes, logo, arranque)
+        except OSError as error:
+            self.stdout.write(self.style.WARNING(f'{renderizador.nombre:>12}: no disponible ({error})'))
+            return
+
+        # La latencia se mide sin tracemalloc: el rastreo ralentiza mucho al renderizador en el proceso (Pillow)
+        # y casi nada a wkhtmltopdf, que trabaja en otro proceso. La memoria se mide en una segunda pasada
+        tiempos = []
+        for factura, productos in facturas:
+            inicio = time.perf_counter()
+            pdf = renderizador.renderizar(factura, productos)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+
+        tracemalloc.start()
+        for factura, productos in facturas:
+            renderizador.renderizar(factura, productos)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        linea = (f'{renderizador.nombre:>12}: media {statistics.mean(tiempos):.0f} ms  '
+                 f'p95 {sorted(tiempos)[int(len(tiempos) * 0.95) - 1]:.0f} ms  '
+                 f'pico Python {pico / 1024 / 1024:.1f} MB  PDF {len(pdf) / 1024:.0f} KB')
+        if resource:
+            linea += (f'  pico proceso {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB'
+                      f'  pico procesos hijos {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} MB')
+        self.stdout.write(linea)
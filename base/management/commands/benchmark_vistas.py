@@ -0,0 +1,158 @@
+from datetime import datetime
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from base.models import Cliente, Factura, Pedido, Venta
+from base.urls import urlpatterns
+
+# Rutas que no se miden: el tablero en vivo no termina nunca, logout solo admite POST y la exportación genera
+# un PDF por factura (tiene su propio benchmark_renderizadores)
+EXCLUIDAS = ['eventos_pedidos', 'logout', 'exportar_facturas']
+
+# Parámetros GET de las rutas que los necesitan
+PARAMETROS = {
+    'buscar_clientes': {'q': 'ma'},
+}
+
+
+class Deshacer(Exception):
+    pass
+
+
+# Rutas de base/urls.py que se pueden pedir con GET: [(nombre, URL)]. Las que llevan <pk> usan la fila más
+# reciente del modelo de la vista; si no hay ninguna se devuelven en omitidas
+def rutas_medibles(nombres=None, excluidas=()):
+    rutas, omitidas = [], []
+    for patron in urlpatterns:
+        vista = getattr(patron.callback, 'view_class', None)
+        if not patron.name or patron.name in excluidas or (nombres and patron.name not in nombres):
+            continue
+        if vista and not hasattr(vista, 'get'):
+            continue  # Solo POST (p. ej. el alta de pedidos en lote)
+
+        kwargs = {}
+        if 'pk' in patron.pattern.converters:
+            pk = vista.model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            if pk is None:
+                omitidas.append(patron.name)
+                continue
+            kwargs['pk'] = pk
+        rutas.append((patron.name, reverse(patron.name, kwargs=kwargs)))
+    return rutas, omitidas
+
+
+# Percentil 95 interpolado entre las muestras (con 10 repeticiones, tomar la muestra int(n * 0.95) - 1 da el p90)
+def percentil_95(tiempos):
+    if len(tiempos) < 2:
+        return tiempos[0]
+    return statistics.quantiles(tiempos, n=20, method='inclusive')[-1]
+
+
+# Pedir una ruta <repeticiones> veces (más una de calentamiento) y devolver sus tiempos, consultas y tamaño
+def medir_ruta(cliente, nombre, url, repeticiones):
+    parametros = PARAMETROS.get(nombre, {})
+    cliente.get(url, parametros)
+    tiempos = []
+    for _ in range(repeticiones):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            response = cliente.get(url, parametros)
+            cuerpo = b''.join(response.streaming_content) if response.streaming else response.content
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'url': url,
+        'estado': response.status_code,
+        'p50_ms': round(statistics.median(tiempos), 2),
+        'p95_ms': round(percentil_95(tiempos), 2),
+        'consultas': len(consultas),
+        'bytes': len(cuerpo),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Pide con GET cada ruta de base/urls.py con un usuario del personal, mide p50/p95 y consultas SQL por vista '
+            'y guarda una referencia en JSON. Con --comparar avisa de las vistas que empeoran respecto a otra referencia. '
+            'Los cambios en la base de datos se deshacen al terminar')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=10, help='Peticiones medidas por vista')
+        parser.add_argument('--vistas', nargs='+', help='Nombres de URL a medir (todas por defecto)')
+        parser.add_argument('--excluir', nargs='+', default=[], help='Nombres de URL que no se miden')
+        parser.add_argument('--salida', default='benchmark_vistas.json', help='Fichero JSON donde guardar la referencia')
+        parser.add_argument('--comparar', help='Referencia JSON anterior con la que comparar')
+        parser.add_argument('--tolerancia', type=float, default=20,
+                            help='Porcentaje de empeoramiento del p95 admitido al comparar')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError('Las repeticiones deben ser al menos 1.')
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as fichero:
+                    anterior = json.load(fichero)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se puede leer la referencia {options["comparar"]}: {e}')
+
+        try:
+            with transaction.atomic():
+                resultado = self.medir(options)
+                raise Deshacer
+        except Deshacer:
+            pass
+
+        with open(options['salida'], 'w', encoding='utf-8') as fichero:
+            json.dump(resultado, fichero, indent=2, ensure_ascii=False)
+        self.stdout.write(f'Referencia guardada en {options["salida"]}')
+
+        if anterior:
+            self.comparar(anterior, resultado, options['tolerancia'])
+
+    def medir(self, options):
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+        cliente = Client(HTTP_HOST=host)
+        cliente.force_login(User.objects.create_user('benchmark-vistas', is_staff=True))
+
+        rutas, omitidas = rutas_medibles(options['vistas'], EXCLUIDAS + options['excluir'])
+        vistas = {}
+        self.stdout.write(f'{"vista":>28}  estado    p50 ms    p95 ms  consultas')
+        for nombre, url in rutas:
+            vistas[nombre] = medida = medir_ruta(cliente, nombre, url, options['repeticiones'])
+            self.stdout.write(f'{nombre:>28}  {medida["estado"]:>6}  {medida["p50_ms"]:8.1f}  {medida["p95_ms"]:8.1f}  '
+                              f'{medida["consultas"]:>9}')
+        for nombre in omitidas:
+            self.stdout.write(f'{nombre:>28}  omitida: no hay filas para su <pk>')
+
+        return {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'repeticiones': options['repeticiones'],
+            'motor': connection.vendor,
+            'filas': {modelo.__name__: modelo.objects.count() for modelo in (Pedido, Factura, Cliente, Venta)},
+            'vistas': vistas,
+        }
+
+    # Vistas comunes a las dos referencias cuyo p95 empeora más de la tolerancia o que hacen más consultas
+    def comparar(self, anterior, actual, tolerancia):
+        empeoran = []
+        for nombre, medida in actual['vistas'].items():
+            previa = anterior.get('vistas', {}).get(nombre)
+            if not previa:
+                continue
+            cambio = (medida['p95_ms'] - previa['p95_ms']) / previa['p95_ms'] * 100 if previa['p95_ms'] else 0
+            peor = cambio > tolerancia or medida['consultas'] > previa['consultas']
+            self.stdout.write(f'{nombre:>28}  p95 {previa["p95_ms"]:.1f} -> {medida["p95_ms"]:.1f} ms ({cambio:+.0f} %)  '
+                              f'consultas {previa["consultas"]} -> {medida["consultas"]}{"  EMPEORA" if peor else ""}')
+            if peor:
+                empeoran.append(nombre)
+        if empeoran:
+            raise CommandError(f'{len(empeoran)} vistas empeoran respecto a {anterior.get("fecha")}: {", ".join(empeoran)}')
+        self.stdout.write(self.style.SUCCESS('Ninguna vista empeora respecto a la referencia.'))
@@ -0,0 +1,55 @@
+from datetime import datetime
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from base.models import Factura
+from base.services.exportar_facturas_service import flujo_zip_facturas, generar_pdfs, procesos_por_defecto
+
+
+class Command(BaseCommand):
+    help = 'Exporta en un ZIP los PDFs de las facturas de un rango de fechas (o mide facturas/minuto con --benchmark)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Fecha de emisión inicial (YYYY-MM-DD)')
+        parser.add_argument('--hasta', required=True, help='Fecha de emisión final (YYYY-MM-DD)')
+        parser.add_argument('--salida', default='facturas.zip', help='Fichero ZIP de salida')
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos de wkhtmltopdf en paralelo')
+        parser.add_argument('--benchmark', action='store_true', help='Comparar la generación en serie y en paralelo sin caché')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date()
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Formato de fecha incorrecto, usa YYYY-MM-DD.')
+
+        facturas = Factura.objects.filter(fecha_emision__range=(desde, hasta)).order_by('fecha_emision', 'id')
+        if not facturas.exists():
+            raise CommandError('No hay facturas en las fechas indicadas.')
+        procesos = options['procesos'] or procesos_por_defecto()
+
+        if options['benchmark']:
+            self.benchmark(facturas, procesos)
+            return
+
+        def progreso(hechas, total):
+            self.stdout.write(f'\r{hechas}/{total} facturas', ending='')
+            self.stdout.flush()
+
+        with open(options['salida'], 'wb') as salida:
+            for trozo in flujo_zip_facturas(facturas, procesos, progreso):
+                salida.write(trozo)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f'ZIP generado: {options["salida"]}'))
+
+    # Generar todas las facturas sin caché (carpeta temporal) en serie y con el grupo de procesos
+    def benchmark(self, facturas, procesos):
+        total = facturas.count()
+        for etiqueta, numero in (('serie', 1), (f'{procesos} procesos', procesos)):
+            with tempfile.TemporaryDirectory() as directorio:
+                inicio = time.perf_counter()
+                for _ in generar_pdfs(facturas, numero, directorio):
+                    pass
+                segundos = time.perf_counter() - inicio
+            self.stdout.write(f'{etiqueta:>12}: {total} facturas en {segundos:.1f}s  {total * 60 / segundos:,.1f} facturas/minuto')
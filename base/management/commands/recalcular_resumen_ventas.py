@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from base.services.resumen_service import recalcular_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes de ventas del asador a partir de los pedidos guardados'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha inicial (YYYY-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha final (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else None
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else None
+        except ValueError:
+            raise CommandError('Formato de fecha incorrecto, usa YYYY-MM-DD.')
+
+        total = recalcular_resumenes(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Resúmenes recalculados: {total} días.'))
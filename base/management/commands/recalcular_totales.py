@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from base.services.facturas_service import recalcular_totales
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los totales de las facturas a partir de sus líneas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha de emisión inicial (YYYY-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha de emisión final (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        try:
+            desde = datetime.strptime(options['desde'], '%Y-%m-%d').date() if options['desde'] else None
+            hasta = datetime.strptime(options['hasta'], '%Y-%m-%d').date() if options['hasta'] else None
+        except ValueError:
+            raise CommandError('Formato de fecha incorrecto, usa YYYY-MM-DD.')
+
+        total = recalcular_totales(desde, hasta)
+        self.stdout.write(self.style.SUCCESS(f'Facturas corregidas: {total}.'))
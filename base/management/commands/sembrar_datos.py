@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from base.services.datos_sinteticos_service import generar_datos_sinteticos
+
+
+class Command(BaseCommand):
+    help = ('Genera datos sintéticos realistas (pedidos con productos y menús, facturas con sus líneas, ventas, gastos, '
+            'compras y capital diarios) para probar las vistas con años de datos. Usar con una base de datos de pruebas '
+            '(p. ej. DB_NOMBRE=/tmp/sintetica.sqlite3): los datos se añaden a los existentes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--años', type=float, default=2, help='Años de movimientos hasta hoy')
+        parser.add_argument('--escala', type=float, default=1.0,
+                            help='Multiplicador de los volúmenes diarios (1: unos 20 pedidos y 3 facturas al día)')
+        parser.add_argument('--semilla', type=int, help='Semilla para generar siempre los mismos datos')
+
+    def handle(self, *args, **options):
+        if options['años'] <= 0 or options['escala'] <= 0:
+            raise CommandError('Los años y la escala deben ser mayores que 0.')
+
+        inicio = time.perf_counter()
+        creadas = generar_datos_sinteticos(dias=max(1, round(options['años'] * 365)), escala=options['escala'],
+                                           semilla=options['semilla'])
+        for modelo, filas in sorted(creadas.items()):
+            self.stdout.write(f'{modelo:>18}: {filas}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{sum(creadas.values())} filas generadas en {time.perf_counter() - inicio:.1f} s.'))
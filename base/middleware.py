@@ -0,0 +1,158 @@
+import json
+import logging
+import mimetypes
+import os
+import re
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+from base.services.metricas_service import MedidorConsultas, medidor_peticion, registro, umbral_lento_ms
+
+logger = logging.getLogger('base.metricas')
+
+# Nombre con el hash de ManifestStaticFilesStorage (p. ej. home.3f2a9c1d0b7e.css): su contenido no cambia nunca
+NOMBRE_CON_HASH = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Versiones precomprimidas por base/storage.py, en orden de preferencia
+CODIFICACIONES = (('br', '.br'), ('gzip', '.gz'))
+
+
+# Codificaciones de una cabecera Accept-Encoding con su peso q: {'gzip': 1.0, 'br': 0.0, ...}.
+# Se comparan nombres completos (x-gzip no es gzip) y un q que no es un número cuenta como 0
+def codificaciones_aceptadas(cabecera):
+    aceptadas = {}
+    for elemento in cabecera.split(','):
+        nombre, _, parametros = elemento.partition(';')
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        calidad = 1.0
+        for parametro in parametros.split(';'):
+            clave, _, valor = parametro.partition('=')
+            if clave.strip().lower() == 'q':
+                try:
+                    calidad = float(valor.strip())
+                except ValueError:
+                    calidad = 0.0
+        aceptadas[nombre] = calidad
+    return aceptadas
+
+
+# Sirve los estáticos recopilados en STATIC_ROOT sin pasar por las vistas: la versión .br o .gz si el navegador la
+# acepta y, para los nombres con hash, Cache-Control de un año con immutable. Va justo después de SecurityMiddleware
+class EstaticosMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefijo = settings.STATIC_URL if settings.STATIC_URL.startswith('/') else '/' + settings.STATIC_URL
+        self.raiz = Path(settings.STATIC_ROOT).resolve() if settings.STATIC_ROOT else None
+        self.max_age = getattr(settings, 'ESTATICOS_MAX_AGE', 31536000)
+
+    def __call__(self, request):
+        if self.raiz is None or request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefijo):
+            return self.get_response(request)
+
+        ruta = self.buscar_fichero(request.path[len(self.prefijo):])
+        if ruta is None:
+            return self.get_response(request)
+        return self.servir(request, ruta)
+
+    # Ruta del fichero dentro de STATIC_ROOT (None si no existe o intenta salir de la carpeta)
+    def buscar_fichero(self, nombre):
+        ruta = (self.raiz / nombre).resolve()
+        if not ruta.is_relative_to(self.raiz) or not ruta.is_file():
+            return None
+        return ruta
+
+    def servir(self, request, ruta):
+        estado = ruta.stat()
+        con_hash = bool(NOMBRE_CON_HASH.search(ruta.name))
+
+        # Sin hash el nombre puede cambiar de contenido: se revalida con If-Modified-Since
+        if not con_hash:
+            desde = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            if desde is not None and int(estado.st_mtime) <= desde:
+                return HttpResponseNotModified()
+
+        # La codificación con más peso de las que hay en disco; a igual peso, la primera de CODIFICACIONES.
+        # Las de q=0 están rechazadas y '*' da su peso a las que no aparecen en la cabecera
+        fichero, codificacion, mejor = ruta, None, 0
+        aceptadas = codificaciones_aceptadas(request.headers.get('Accept-Encoding', ''))
+        for nombre, extension in CODIFICACIONES:
+            calidad = aceptadas.get(nombre, aceptadas.get('*', 0))
+            comprimido = ruta.with_name(ruta.name + extension)
+            if calidad > mejor and comprimido.is_file():
+                fichero, codificacion, mejor = comprimido, nombre, calidad
+
+        tipo, _ = mimetypes.guess_type(ruta.name)
+        response = FileResponse(open(fichero, 'rb'), content_type=tipo or 'application/octet-stream')
+        if request.method == 'HEAD':
+            response.streaming_content = []
+        if codificacion:
+            response['Content-Encoding'] = codificacion
+        response['Content-Length'] = os.path.getsize(fichero)
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = http_date(estado.st_mtime)
+        if con_hash:
+            response['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        else:
+            response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        return response
+
+
+# Mide cada petición por nombre de URL resuelto: duración, tiempo en la base de datos, consultas y tamaño de la respuesta.
+# Las muestras van a los histogramas de base/services/metricas_service.py (se exponen en /metricas/) y las peticiones
+# que superan METRICAS_UMBRAL_LENTO_MS se registran además como una línea JSON en el logger 'base.metricas'.
+# Admite los dos modos para que con ASGI Django no tenga que pasar cada petición por sync_to_async
+class MetricasMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medidor = MedidorConsultas()
+        contexto = medidor_peticion.set(medidor)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            medidor_peticion.reset(contexto)
+        self.registrar(request, response, time.perf_counter() - inicio, medidor)
+        return response
+
+    async def __acall__(self, request):
+        medidor = MedidorConsultas()
+        contexto = medidor_peticion.set(medidor)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            medidor_peticion.reset(contexto)
+        self.registrar(request, response, time.perf_counter() - inicio, medidor)
+        return response
+
+    def registrar(self, request, response, segundos, medidor):
+        # Las respuestas en streaming (el tablero en vivo, los ZIP de facturas, los estáticos) no se miden: al volver
+        # aquí solo se han enviado las cabeceras, así que su duración y su tamaño no dirían nada
+        if response.streaming:
+            return
+        vista = request.resolver_match.view_name if request.resolver_match else '<sin resolver>'
+        tamano = len(response.content)
+        registro.registrar(vista, request.method, response.status_code, segundos, medidor.segundos, medidor.consultas, tamano)
+
+        if segundos * 1000 >= umbral_lento_ms():
+            logger.warning(json.dumps({
+                'evento': 'peticion_lenta', 'vista': vista, 'metodo': request.method, 'ruta': request.path,
+                'estado': response.status_code, 'ms': round(segundos * 1000, 1), 'ms_bd': round(medidor.segundos * 1000, 1),
+                'consultas': medidor.consultas, 'bytes': tamano,
+            }))
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:09
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+# Productos sueltos que contaba PedidoListView, por su nombre exacto: (contador, peso)
+CONTADORES_PRODUCTO = {
+    'pollo asado': ('pollos', Decimal('1.00')),
+    'medio pollo asado': ('pollos', Decimal('0.50')),
+    'cachopo ternera': ('cachopos_ternera', Decimal('1.00')),
+    'cachopo pollo': ('cachopos_pollo', Decimal('1.00')),
+    'cachopo lomo': ('cachopos_lomo', Decimal('1.00')),
+}
+
+
+# Asignar los contadores a partir de los nombres que antes se comparaban en PedidoListView
+def asignar_contadores(apps, schema_editor):
+    Producto = apps.get_model('base', 'Producto')
+    Menu = apps.get_model('base', 'Menu')
+    MenuProducto = apps.get_model('base', 'MenuProducto')
+    PesoRecuento = apps.get_model('base', 'PesoRecuento')
+
+    for producto in Producto.objects.all():
+        contador = CONTADORES_PRODUCTO.get(producto.nombre.lower())
+        if contador:
+            producto.contador, producto.peso_contador = contador
+            producto.save(update_fields=['contador', 'peso_contador'])
+            PesoRecuento.objects.create(producto=producto, contador=producto.contador, peso=producto.peso_contador)
+
+    for menu in Menu.objects.all():
+        pesos = {}
+        if menu.nombre.lower() == 'menú cachopo degustación':
+            menu.contador = 'cachopos_degustacion'
+            menu.save(update_fields=['contador'])
+            pesos[menu.contador] = menu.peso_contador
+        for menu_producto in MenuProducto.objects.filter(menu=menu).select_related('producto'):
+            contador = menu_producto.producto.contador
+            if contador:
+                peso = menu_producto.producto.peso_contador * menu_producto.cantidad
+                pesos[contador] = pesos.get(contador, Decimal('0')) + peso
+        for contador, peso in pesos.items():
+            PesoRecuento.objects.create(menu=menu, contador=contador, peso=peso)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0002_alter_factura_cif_nif_emisor_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='contador',
+            field=models.CharField(blank=True, choices=[('pollos', 'Pollos'), ('cachopos_ternera', 'Cachopos de ternera'), ('cachopos_pollo', 'Cachopos de pollo'), ('cachopos_lomo', 'Cachopos de lomo'), ('cachopos_degustacion', 'Cachopos degustación')], max_length=30),
+        ),
+        migrations.AddField(
+            model_name='menu',
+            name='peso_contador',
+            field=models.DecimalField(decimal_places=2, default=Decimal('1.00'), max_digits=5),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='contador',
+            field=models.CharField(blank=True, choices=[('pollos', 'Pollos'), ('cachopos_ternera', 'Cachopos de ternera'), ('cachopos_pollo', 'Cachopos de pollo'), ('cachopos_lomo', 'Cachopos de lomo'), ('cachopos_degustacion', 'Cachopos degustación')], max_length=30),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='peso_contador',
+            field=models.DecimalField(decimal_places=2, default=Decimal('1.00'), max_digits=5),
+        ),
+        migrations.CreateModel(
+            name='PesoRecuento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contador', models.CharField(choices=[('pollos', 'Pollos'), ('cachopos_ternera', 'Cachopos de ternera'), ('cachopos_pollo', 'Cachopos de pollo'), ('cachopos_lomo', 'Cachopos de lomo'), ('cachopos_degustacion', 'Cachopos degustación')], max_length=30)),
+                ('peso', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('menu', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='base.menu')),
+                ('producto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='base.producto')),
+            ],
+        ),
+        migrations.RunPython(asignar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# Dejar una sola fila por fecha (la última guardada) y marcar como cerrados los resúmenes existentes
+def unificar_resumenes(apps, schema_editor):
+    ResumenVentas = apps.get_model('base', 'ResumenVentas')
+    vistos = set()
+    for resumen in ResumenVentas.objects.order_by('fecha', '-id'):
+        if resumen.fecha in vistos:
+            resumen.delete()
+        else:
+            vistos.add(resumen.fecha)
+    ResumenVentas.objects.update(cerrado=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0003_pesos_recuento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumenventas',
+            name='cerrado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(unificar_resumenes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='resumenventas',
+            name='fecha',
+            field=models.DateField(default=django.utils.timezone.localdate, unique=True),
+        ),
+    ]
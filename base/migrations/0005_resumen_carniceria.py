@@ -0,0 +1,58 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:34
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+# Rellenar el resumen con los movimientos que ya existen (una fila por día)
+def rellenar_resumen(apps, schema_editor):
+    ResumenCarniceria = apps.get_model('base', 'ResumenCarniceria')
+    resumenes = {}
+    for modelo, campo in (('Venta', 'ventas'), ('FacturasIVA', 'compras_iva'), ('FacturaTienda', 'compras_tienda'),
+                          ('GastosTienda', 'gastos_tienda'), ('GastosPersonales', 'gastos_personales'),
+                          ('PagosBanco', 'pagos_banco')):
+        for fila in apps.get_model('base', modelo).objects.order_by().values('fecha').annotate(suma=Sum('total')):
+            resumenes.setdefault(fila['fecha'], {})[campo] = fila['suma']
+    Capital = apps.get_model('base', 'Capital')
+    tipos = {tipo for tipo, _ in Capital._meta.get_field('tipo_ingreso').choices}
+    for fila in Capital.objects.filter(tipo_ingreso__in=tipos).order_by().values('fecha', 'tipo_ingreso').annotate(suma=Sum('total')):
+        resumenes.setdefault(fila['fecha'], {})[f'capital_{fila["tipo_ingreso"].lower()}'] = fila['suma']
+    ResumenCarniceria.objects.bulk_create(
+        [ResumenCarniceria(fecha=fecha, **importes) for fecha, importes in resumenes.items()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0004_resumen_ventas_por_dia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenCarniceria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True, verbose_name='Fecha')),
+                ('ventas', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('compras_iva', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('compras_tienda', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('gastos_tienda', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('gastos_personales', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('pagos_banco', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_ef', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_bb', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_s1', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_s2', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_hi', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_es', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_fa', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_va', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('capital_ta', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+            ],
+            options={
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.RunPython(rellenar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_resumen_carniceria'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='capital',
+            index=models.Index(fields=['fecha'], name='capital_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='capital',
+            index=models.Index(fields=['tipo_ingreso', 'fecha'], name='capital_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha_emision'], name='factura_fecha_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facturasiva',
+            index=models.Index(fields=['fecha'], name='facturasiva_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facturatienda',
+            index=models.Index(fields=['fecha'], name='facturatienda_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['fecha'], name='gasto_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastospersonales',
+            index=models.Index(fields=['fecha'], name='gastospersonales_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastostienda',
+            index=models.Index(fields=['fecha'], name='gastostienda_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagosbanco',
+            index=models.Index(fields=['fecha'], name='pagosbanco_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['fecha_hora'], name='pedido_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha'], name='venta_fecha_idx'),
+        ),
+    ]
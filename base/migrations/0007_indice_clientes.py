@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_indices_fechas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre'], name='cliente_nombre_idx'),
+        ),
+    ]
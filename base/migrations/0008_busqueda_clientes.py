@@ -0,0 +1,26 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:47
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_indice_clientes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Lower('codigo'), name='cliente_codigo_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Lower('nombre'), name='cliente_nombre_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Lower('cif_dni'), name='cliente_cif_dni_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.0.4 on 2026-10-18 09:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_busqueda_clientes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorFactura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('serie', models.CharField(max_length=5)),
+                ('ejercicio', models.PositiveSmallIntegerField()),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='ejercicio',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='numero',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='serie',
+            field=models.CharField(blank=True, editable=False, max_length=5),
+        ),
+        migrations.AlterField(
+            model_name='factura',
+            name='numero_factura',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='factura',
+            constraint=models.UniqueConstraint(fields=('serie', 'ejercicio', 'numero'), name='factura_numero_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='contadorfactura',
+            constraint=models.UniqueConstraint(fields=('serie', 'ejercicio'), name='contador_factura_unico'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:09
+
+from decimal import Decimal
+from django.db import migrations, models
+from base.services.resumen_service import recalcular_resumenes
+
+
+# Los totales anteriores a 0004 los enviaba el navegador (0004 solo unificó las filas por fecha): recalcularlos desde
+# los pedidos, ya con los contadores con signo y decimales, para que los incrementos que aplican las señales partan
+# de números correctos
+def recalcular(apps, schema_editor):
+    recalcular_resumenes()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_numeracion_facturas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumenventas',
+            name='numero_pedidos',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='resumenventas',
+            name='total_cachopos',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=10),
+        ),
+        migrations.RunPython(recalcular, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:21
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copia de base.models.normalizar_busqueda tal y como estaba al crear la migración
+def normalizar_busqueda(texto):
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter)).casefold()
+
+
+# Rellenar las columnas de búsqueda de los clientes que ya existen
+def rellenar_busqueda(apps, schema_editor):
+    Cliente = apps.get_model('base', 'Cliente')
+    clientes = list(Cliente.objects.only('codigo', 'nombre', 'cif_dni'))
+    for cliente in clientes:
+        cliente.codigo_busqueda = normalizar_busqueda(cliente.codigo)
+        cliente.nombre_busqueda = normalizar_busqueda(cliente.nombre)
+        cliente.cif_dni_busqueda = normalizar_busqueda(cliente.cif_dni)
+    Cliente.objects.bulk_update(clientes, ['codigo_busqueda', 'nombre_busqueda', 'cif_dni_busqueda'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_contadores_resumen_ventas'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_codigo_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_nombre_lower_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='cliente_cif_dni_lower_idx',
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='cif_dni_busqueda',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='codigo_busqueda',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='nombre_busqueda',
+            field=models.TextField(default='', editable=False),
+        ),
+        migrations.RunPython(rellenar_busqueda, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['codigo_busqueda'], name='cliente_codigo_busqueda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre_busqueda'], name='cliente_nombre_busqueda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['cif_dni_busqueda'], name='cliente_cif_dni_busqueda_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:22
+
+import re
+
+from django.db import migrations, models
+from django.db.models import Max
+
+# Números con el formato de la numeración automática: serie, ejercicio y número (F2025-00042)
+NUMERO_FACTURA = re.compile(r'^([A-Za-z]{1,5})(\d{4})-(\d+)$')
+
+
+# Las facturas anteriores a la numeración automática solo tienen el texto del número: se desglosa en serie,
+# ejercicio y número, y cada contador se adelanta hasta el mayor número usado para no volver a entregarlo
+def desglosar_numeros(apps, schema_editor):
+    Factura = apps.get_model('base', 'Factura')
+    ContadorFactura = apps.get_model('base', 'ContadorFactura')
+
+    usados = set(Factura.objects.filter(numero__isnull=False).values_list('serie', 'ejercicio', 'numero'))
+    facturas = []
+    for factura in Factura.objects.filter(numero__isnull=True).only('numero_factura').order_by('id'):
+        coincidencia = NUMERO_FACTURA.match(factura.numero_factura.strip())
+        if not coincidencia:
+            continue
+        clave = (coincidencia.group(1), int(coincidencia.group(2)), int(coincidencia.group(3)))
+        if clave in usados:
+            continue  # Número repetido entre las antiguas: se queda solo con el texto
+        usados.add(clave)
+        factura.serie, factura.ejercicio, factura.numero = clave
+        facturas.append(factura)
+    Factura.objects.bulk_update(facturas, ['serie', 'ejercicio', 'numero'], batch_size=500)
+
+    maximos = (Factura.objects.filter(numero__isnull=False).order_by()
+               .values('serie', 'ejercicio').annotate(ultimo=Max('numero')))
+    for maximo in maximos:
+        contador, _ = ContadorFactura.objects.get_or_create(serie=maximo['serie'], ejercicio=maximo['ejercicio'])
+        if contador.ultimo < maximo['ultimo']:
+            contador.ultimo = maximo['ultimo']
+            contador.save(update_fields=['ultimo'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_busqueda_clientes_normalizada'),
+    ]
+
+    operations = [
+        migrations.RunPython(desglosar_numeros, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['numero_factura'], name='factura_numero_factura_idx'),
+        ),
+    ]
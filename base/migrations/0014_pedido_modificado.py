@@ -0,0 +1,20 @@
+# Generated by Django 5.0.4 on 2026-10-18 11:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_numeracion_facturas_anteriores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedido',
+            name='modificado',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -1,11 +1,23 @@
+from django.conf import settings
 from django.utils import timezone
 from decimal import Decimal
-from django.db import models
+import unicodedata
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 
 
 # Creación de modelos que son las tablas de la base de datos
 
 ################ ASADOR ################
+# Contadores del tablero de pedidos que puede alimentar un producto o un menú
+CONTADORES = [
+    ('pollos', 'Pollos'),
+    ('cachopos_ternera', 'Cachopos de ternera'),
+    ('cachopos_pollo', 'Cachopos de pollo'),
+    ('cachopos_lomo', 'Cachopos de lomo'),
+    ('cachopos_degustacion', 'Cachopos degustación'),
+]
+
 class Producto(models.Model):
     # Categorías de productos disponibles
     CATEGORIAS = [
@@ -18,6 +30,8 @@ class Producto(models.Model):
     nombre = models.CharField(max_length=100)  # Nombre del producto
     categoria = models.CharField(max_length=10, choices=CATEGORIAS)  # Categoría del producto
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)  # Precio del producto
+    contador = models.CharField(max_length=30, choices=CONTADORES, blank=True)  # Contador del tablero al que suma
+    peso_contador = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('1.00'))  # Unidades que suma al contador (0.5 para medio pollo)
 
     def __str__(self):
         return f"{self.nombre} ({self.categoria})"
@@ -27,6 +41,8 @@ class Menu(models.Model):
     nombre = models.CharField(max_length=100)  # Nombre del menú
     productos = models.ManyToManyField(Producto, through='MenuProducto')  # Relación ManyToMany usando MenuProducto
     precio = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)  # Precio total del menú
+    contador = models.CharField(max_length=30, choices=CONTADORES, blank=True)  # Contador propio del menú (además de sus productos)
+    peso_contador = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal('1.00'))  # Unidades que suma al contador
 
     def __str__(self):
         return self.nombre
@@ -39,17 +55,31 @@ class MenuProducto(models.Model):
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre} en el menú {self.menu.nombre}"
 
+class PesoRecuento(models.Model):
+    # Tabla materializada: cuánto suma cada producto o menú (expandido por MenuProducto) a cada contador.
+    # Se reconstruye al guardar o eliminar Producto, Menu o MenuProducto (ver base/signals.py)
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, null=True, blank=True)  # Producto vendido suelto
+    menu = models.ForeignKey(Menu, on_delete=models.CASCADE, null=True, blank=True)  # Menú vendido
+    contador = models.CharField(max_length=30, choices=CONTADORES)  # Contador al que suma
+    peso = models.DecimalField(max_digits=10, decimal_places=2)  # Unidades por cada unidad vendida
+
+    def __str__(self):
+        origen = self.producto.nombre if self.producto_id else self.menu.nombre
+        return f"{origen} suma {self.peso} a {self.get_contador_display()}"
+
 class Pedido(models.Model):
     nombre_cliente = models.CharField(max_length=100)  # Nombre del cliente que realiza el pedido
     fecha_hora = models.DateTimeField()  # Fecha y hora en que se entregará el pedido
     entregado = models.BooleanField(default=False)  # Campo para indicar si el pedido ha sido entregado
     observaciones = models.TextField(blank=True, null=True)  # Campo para observaciones opcionales
+    modificado = models.DateTimeField(auto_now=True)  # Último cambio (versión del tablero que consultan las pantallas)
     
     def __str__(self):
         return f"Pedido de {self.nombre_cliente}"
 
     class Meta:
         ordering = ['fecha_hora']  # Ordenar por fecha_hora
+        indexes = [models.Index(fields=['fecha_hora'], name='pedido_fecha_hora_idx')]
 
 
 class PedidoProducto(models.Model):
@@ -86,13 +116,18 @@ class Gasto(models.Model):
     def __str__(self):
         return f"{self.descripcion} - {self.monto}€"
 
+    class Meta:
+        indexes = [models.Index(fields=['fecha'], name='gasto_fecha_idx')]
+
 
 class ResumenVentas(models.Model):
-    fecha = models.DateField(auto_now_add=True)  # Fecha de la venta (se asigna automáticamente la fecha actual)
+    fecha = models.DateField(unique=True, default=timezone.localdate)  # Fecha de la venta (una fila por día)
     total_ventas = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)  # Monto total de ventas en euros
-    numero_pedidos = models.PositiveIntegerField(default=0)  # Número total de pedidos realizados en el día
+    # Los contadores reciben incrementos negativos al borrar pedidos o líneas: sin restricción de positivos
+    numero_pedidos = models.IntegerField(default=0)  # Número total de pedidos realizados en el día
     total_pollos = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))  # Total de pollos vendidos
-    total_cachopos = models.PositiveIntegerField(default=0)  # Total de cachopos vendidos
+    total_cachopos = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal('0.00'))  # Total de cachopos vendidos (con pesos)
+    cerrado = models.BooleanField(default=False)  # Indica si ya se ha hecho el cierre del día
 
     def __str__(self):
         return (f"Resumen del {self.fecha}: {self.total_ventas}€ en {self.numero_pedidos} pedidos, "
@@ -110,6 +145,9 @@ class Venta(models.Model):
     def __str__(self):
         return f"{self.fecha} - {self.total}€"
 
+    class Meta:
+        indexes = [models.Index(fields=['fecha'], name='venta_fecha_idx')]
+
 class FacturasIVA(models.Model):
     proveedor = models.CharField(max_length=100)  # Nombre del proveedor
     numero_factura = models.CharField(max_length=50)  # Número de la factura
@@ -123,6 +161,9 @@ class FacturasIVA(models.Model):
 
     class Meta:
         ordering = ['-fecha']  # Ordenar las facturas de forma descendente por fecha
+        indexes = [
+            models.Index(fields=['fecha'], name='facturasiva_fecha_idx'),
+        ]
 
 class FacturaTienda(models.Model):
     proveedor = models.CharField(max_length=100)  # Nombre del proveedor
@@ -135,6 +176,9 @@ class FacturaTienda(models.Model):
     
     class Meta:
         ordering = ['-fecha']  # Ordenar las facturas de forma descendente por fecha
+        indexes = [
+            models.Index(fields=['fecha'], name='facturatienda_fecha_idx'),
+        ]
 
 class GastosTienda(models.Model):
     fecha = models.DateField(verbose_name="Fecha")
@@ -144,6 +188,9 @@ class GastosTienda(models.Model):
     def __str__(self):
         return f"{self.fecha} - {self.gasto} - {self.total} €"
 
+    class Meta:
+        indexes = [models.Index(fields=['fecha'], name='gastostienda_fecha_idx')]
+
 class GastosPersonales(models.Model):
     fecha = models.DateField(verbose_name="Fecha")
     gasto = models.CharField(max_length=255, verbose_name="Descripción del gasto")
@@ -152,6 +199,9 @@ class GastosPersonales(models.Model):
     def __str__(self):
         return f"{self.fecha} - {self.gasto} - {self.total} €"
 
+    class Meta:
+        indexes = [models.Index(fields=['fecha'], name='gastospersonales_fecha_idx')]
+
 class PagosBanco(models.Model):
     fecha = models.DateField(verbose_name="Fecha")
     concepto = models.CharField(max_length=255, verbose_name="Concepto")
@@ -159,6 +209,9 @@ class PagosBanco(models.Model):
 
     def __str__(self):
         return f"{self.fecha} - {self.concepto} - {self.total} €"
+
+    class Meta:
+        indexes = [models.Index(fields=['fecha'], name='pagosbanco_fecha_idx')]
     
 class Capital(models.Model):
     TIPOS_INGRESO = [
@@ -180,14 +233,70 @@ class Capital(models.Model):
     def __str__(self):
         return f"{self.get_tipo_ingreso_display()} - {self.fecha} - {self.total}€"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha'], name='capital_fecha_idx'),
+            models.Index(fields=['tipo_ingreso', 'fecha'], name='capital_tipo_fecha_idx'),  # Tarjetas de un rango de fechas
+        ]
+
+# Resumen diario de la carnicería: una fila por día con los totales de cada tabla, mantenida con señales
+# (base/signals.py) para que los informes por rango sumen como mucho 365 filas por año
+class ResumenCarniceria(models.Model):
+    fecha = models.DateField(unique=True, verbose_name="Fecha")
+    ventas = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    compras_iva = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))  # FacturasIVA
+    compras_tienda = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))  # FacturaTienda
+    gastos_tienda = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    gastos_personales = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    pagos_banco = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Capital por tipo de ingreso (Capital.TIPOS_INGRESO)
+    capital_ef = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_bb = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_s1 = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_s2 = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_hi = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_es = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_fa = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_va = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    capital_ta = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+
+    def __str__(self):
+        return f"Resumen de la carnicería del {self.fecha}: {self.ventas}€ en ventas"
+
+    class Meta:
+        ordering = ['-fecha']
+
+# Texto de búsqueda de clientes: sin tildes y en minúsculas. Se aplica igual a lo guardado y a lo buscado
+# (el LOWER() de SQLite solo pasa a minúsculas las letras ASCII, así que 'álv' no encontraba 'ÁLVAREZ')
+def normalizar_busqueda(texto):
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter)).casefold()
+
+
 class Cliente(models.Model):
     nombre = models.CharField(max_length=255, verbose_name="Nombre")
     codigo = models.CharField(max_length=50, unique=True, verbose_name="Código")
     direccion = models.TextField(verbose_name="Dirección")
     cif_dni = models.CharField(max_length=50, unique=True, verbose_name="CIF/DNI")
+    # Código, nombre y CIF/DNI normalizados para el autocompletado (se rellenan al guardar)
+    codigo_busqueda = models.TextField(editable=False, default='')
+    nombre_busqueda = models.TextField(editable=False, default='')
+    cif_dni_busqueda = models.TextField(editable=False, default='')
 
     def __str__(self):
         return f"{self.codigo}"
+
+    # También para las altas con bulk_create, que no pasan por save()
+    def actualizar_busqueda(self):
+        self.codigo_busqueda = normalizar_busqueda(self.codigo)
+        self.nombre_busqueda = normalizar_busqueda(self.nombre)
+        self.cif_dni_busqueda = normalizar_busqueda(self.cif_dni)
+
+    def save(self, *args, **kwargs):
+        self.actualizar_busqueda()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'codigo_busqueda', 'nombre_busqueda', 'cif_dni_busqueda'}
+        super().save(*args, **kwargs)
     
     def to_dict(self):
         return {
@@ -198,11 +307,55 @@ class Cliente(models.Model):
             'cif_dni': self.cif_dni,
         }
 
+    class Meta:
+        # La lista de clientes se pagina en orden alfabético por (nombre, id) y el autocompletado
+        # busca por prefijo sin distinguir mayúsculas ni tildes en código, nombre y CIF/DNI
+        indexes = [
+            models.Index(fields=['nombre'], name='cliente_nombre_idx'),
+            models.Index(fields=['codigo_busqueda'], name='cliente_codigo_busqueda_idx'),
+            models.Index(fields=['nombre_busqueda'], name='cliente_nombre_busqueda_idx'),
+            models.Index(fields=['cif_dni_busqueda'], name='cliente_cif_dni_busqueda_idx'),
+        ]
+
+# Último número entregado de cada serie de facturas y ejercicio (año de emisión)
+class ContadorFactura(models.Model):
+    serie = models.CharField(max_length=5)
+    ejercicio = models.PositiveSmallIntegerField()
+    ultimo = models.PositiveIntegerField(default=0)
+
+    # Siguiente número de la serie en O(1). El UPDATE ... SET ultimo = ultimo + 1 bloquea la fila del contador
+    # hasta el final de la transacción que lo llama: dos altas a la vez se esperan, y si la factura no llega
+    # a guardarse el incremento se deshace con ella (la numeración no deja huecos)
+    @classmethod
+    def siguiente(cls, serie, ejercicio):
+        contador = cls.objects.filter(serie=serie, ejercicio=ejercicio)
+        with transaction.atomic():
+            if contador.update(ultimo=F('ultimo') + 1):
+                return contador.values_list('ultimo', flat=True).get()
+            try:
+                # Primera factura de la serie en el ejercicio (si otro proceso se adelanta, se usa su fila)
+                with transaction.atomic():
+                    cls.objects.create(serie=serie, ejercicio=ejercicio, ultimo=1)
+                return 1
+            except IntegrityError:
+                contador.update(ultimo=F('ultimo') + 1)
+                return contador.values_list('ultimo', flat=True).get()
+
+    def __str__(self):
+        return f"Serie {self.serie} de {self.ejercicio}: {self.ultimo}"
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['serie', 'ejercicio'], name='contador_factura_unico')]
+
 class Factura(models.Model):
     nombre_empresa = models.CharField(max_length=100, default="PETTISSO", editable=False)
     telefono_empresa = models.CharField(max_length=20, default="123456789", editable=False)
     email_empresa = models.EmailField(default="ejemplo@hotmail.com", editable=False)
-    numero_factura = models.CharField(max_length=20)
+    numero_factura = models.CharField(max_length=20, blank=True)
+    # Numeración automática: serie, ejercicio y número entero (ordenan numéricamente y son únicos)
+    serie = models.CharField(max_length=5, blank=True, editable=False)
+    ejercicio = models.PositiveSmallIntegerField(null=True, editable=False)
+    numero = models.PositiveIntegerField(null=True, editable=False)
     fecha_emision = models.DateField(default=timezone.now, editable=False)
     fecha_entrega = models.DateField(default=timezone.now, editable=False)
     nombre_emisor = models.CharField(max_length=100, default="Alfredo Martínez Simón", editable=False)
@@ -213,17 +366,51 @@ class Factura(models.Model):
     total_iva = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
 
+    # Totales de la factura con una única consulta agregada sobre sus líneas
+    def calcular_totales(self):
+        totales = self.facturaproducto_set.aggregate(
+            total_neto=models.Sum('total_neto'), total_iva=models.Sum('iva'), total=models.Sum('total'))
+        # Redondeo a céntimos: SQLite suma los decimales en coma flotante (7.800000000000001)
+        centimos = Decimal('0.01')
+        self.total_neto = (totales['total_neto'] or Decimal('0.00')).quantize(centimos)
+        self.total_iva = (totales['total_iva'] or Decimal('0.00')).quantize(centimos)
+        self.total = (totales['total'] or Decimal('0.00')).quantize(centimos)
+
+    # Número de la serie para su ejercicio, p. ej. F2025-00042. Se saltan los números que ya lleva otra factura
+    # (escritos a mano con el mismo formato): el contador nunca entrega un número repetido
+    def asignar_numero(self):
+        fecha = self._meta.get_field('fecha_emision').to_python(self.fecha_emision)
+        self.serie = self.serie or getattr(settings, 'FACTURAS_SERIE', 'F')
+        self.ejercicio = fecha.year
+        while True:
+            self.numero = ContadorFactura.siguiente(self.serie, self.ejercicio)
+            self.numero_factura = f"{self.serie}{self.ejercicio}-{self.numero:05d}"
+            if not Factura.objects.filter(numero_factura=self.numero_factura).exists():
+                return
+
     def save(self, *args, **kwargs):
         # Solo calcular los totales si la instancia ya tiene una clave primaria
         if self.pk:
-            self.total_neto = sum(producto.total_neto for producto in self.facturaproducto_set.all())
-            self.total_iva = sum(producto.iva for producto in self.facturaproducto_set.all())
-            self.total = sum(producto.total for producto in self.facturaproducto_set.all())
+            self.calcular_totales()
+
+        # Las facturas nuevas sin número se numeran en la misma transacción que su INSERT
+        if self._state.adding and not self.numero_factura:
+            with transaction.atomic():
+                self.asignar_numero()
+                super().save(*args, **kwargs)
+            return
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Factura {self.numero_factura} - {self.cliente.nombre}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_emision'], name='factura_fecha_emision_idx'),
+            models.Index(fields=['numero_factura'], name='factura_numero_factura_idx'),  # Números ya usados
+        ]
+        constraints = [models.UniqueConstraint(fields=['serie', 'ejercicio', 'numero'], name='factura_numero_unico')]
+
 class FacturaProducto(models.Model):
     factura = models.ForeignKey(Factura, on_delete=models.CASCADE)
     descripcion = models.CharField(max_length=255)
@@ -0,0 +1,150 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import DecimalField, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import TruncMonth, TruncWeek
+from base.models import Gasto, ResumenCarniceria, ResumenVentas
+
+# En SQLite TruncWeek y TruncMonth llaman por cada fila a una función de Python registrada por Django:
+# se sustituyen por date() de SQLite, que agrupa igual sin salir del motor (el resto de motores usan su SQL)
+class InicioSemana(TruncWeek):
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, 'weekday 0', '-6 days')", params
+
+
+class InicioMes(TruncMonth):
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return f"date({sql}, 'start of month')", params
+
+
+# Agrupaciones de la serie del balance (parámetro `agrupacion` de la página)
+AGRUPACIONES = {
+    'dia': F,  # La fecha ya es el día: agrupar por la columna sin truncar
+    'semana': InicioSemana,  # Semanas de lunes a domingo, etiquetadas con el lunes
+    'mes': InicioMes,
+}
+AGRUPACION_POR_DEFECTO = 'mes'
+
+
+################ CARNICERÍA ################
+
+# Conceptos del balance a partir de las columnas del resumen diario de la carnicería
+CONCEPTOS = {
+    'ventas': F('ventas'),
+    'compras': F('compras_iva') + F('compras_tienda'),
+    'gastos': F('gastos_tienda') + F('pagos_banco'),
+}
+
+
+# Balance de la carnicería en una sola consulta sobre el resumen diario (una fila por día), agrupada por periodo.
+# Devuelve los totales y la serie ordenada por periodo (solo los periodos con movimientos)
+def balance_carniceria(fecha_inicio=None, fecha_fin=None, agrupacion=AGRUPACION_POR_DEFECTO):
+    truncar = AGRUPACIONES[agrupacion]
+    filtros = Q()
+    if fecha_inicio and fecha_fin:
+        filtros &= Q(fecha__range=[fecha_inicio, fecha_fin])
+
+    filas = (ResumenCarniceria.objects.filter(filtros).order_by()
+             .values(periodo=truncar('fecha'))
+             .annotate(**{f'suma_{concepto}': Sum(expresion) for concepto, expresion in CONCEPTOS.items()})
+             .order_by('periodo'))
+
+    totales = {concepto: Decimal('0.00') for concepto in CONCEPTOS}
+    serie = []
+    for fila in filas:
+        periodo = {concepto: fila[f'suma_{concepto}'] or Decimal('0.00') for concepto in CONCEPTOS}
+        for concepto, importe in periodo.items():
+            totales[concepto] += importe
+        periodo['beneficios'] = periodo['ventas'] - periodo['compras'] - periodo['gastos']
+        serie.append({'periodo': fila['periodo'], **periodo})
+    totales['beneficios'] = totales['ventas'] - totales['compras'] - totales['gastos']
+    return totales, serie
+
+
+################ ASADOR ################
+
+# Tamaño aproximado de cada agrupación en días (para elegir la agrupación según el rango)
+DIAS_AGRUPACION = {'dia': 1, 'semana': 7, 'mes': 31}
+
+
+def max_puntos_grafico():
+    return getattr(settings, 'ASADOR_BALANCE_MAX_PUNTOS', 120)
+
+
+# Totales del asador: un aggregate sobre los resúmenes diarios y otro sobre los gastos.
+# Incluyen la primera y la última fecha con datos para acotar la serie
+def totales_asador(fecha_inicio=None, fecha_fin=None):
+    filtros = Q()
+    if fecha_inicio and fecha_fin:
+        filtros &= Q(fecha__range=[fecha_inicio, fecha_fin])
+
+    ventas = ResumenVentas.objects.filter(filtros).aggregate(
+        ventas=Sum('total_ventas'), pedidos=Sum('numero_pedidos'), pollos=Sum('total_pollos'),
+        cachopos=Sum('total_cachopos'), primera=Min('fecha'), ultima=Max('fecha'))
+    gastos = Gasto.objects.filter(filtros).aggregate(gastos=Sum('monto'), primera=Min('fecha'), ultima=Max('fecha'))
+
+    fechas = [fecha for fecha in (ventas['primera'], ventas['ultima'], gastos['primera'], gastos['ultima']) if fecha]
+    totales = {
+        'ventas': ventas['ventas'] or Decimal('0.00'),
+        'pedidos': ventas['pedidos'] or 0,
+        'pollos': ventas['pollos'] or Decimal('0.00'),
+        'cachopos': ventas['cachopos'] or Decimal('0.00'),
+        'gastos': gastos['gastos'] or Decimal('0.00'),
+        'primera': min(fechas, default=None),
+        'ultima': max(fechas, default=None),
+    }
+    totales['beneficios'] = totales['ventas'] - totales['gastos']
+    return totales
+
+
+# Agrupación más fina con la que el rango cabe en `max_puntos` puntos
+def agrupacion_para_rango(desde, hasta, max_puntos):
+    dias = (hasta - desde).days + 1
+    for agrupacion, dias_agrupacion in DIAS_AGRUPACION.items():
+        if dias <= dias_agrupacion * max_puntos:
+            return agrupacion
+    return 'mes'
+
+
+# Primer día de los últimos `max_puntos` periodos hasta `hasta` (los más antiguos se descartan)
+def inicio_ventana(hasta, agrupacion, max_puntos):
+    if agrupacion == 'dia':
+        return hasta - timedelta(days=max_puntos - 1)
+    if agrupacion == 'semana':
+        return hasta - timedelta(days=hasta.weekday(), weeks=max_puntos - 1)
+    meses = hasta.year * 12 + hasta.month - 1 - (max_puntos - 1)
+    return date(meses // 12, meses % 12 + 1, 1)
+
+
+# Serie de ventas, gastos y beneficios agrupada en SQL (una consulta) y con como mucho `max_puntos` periodos.
+# Sin agrupación se elige la más fina que cubre el rango; si aun así no cabe se devuelven los periodos más recientes
+def serie_asador(totales, agrupacion=None, max_puntos=None):
+    max_puntos = min(max_puntos or max_puntos_grafico(), max_puntos_grafico())
+    desde, hasta = totales['primera'], totales['ultima']
+    if desde is None:
+        return agrupacion or AGRUPACION_POR_DEFECTO, False, []
+    agrupacion = agrupacion or agrupacion_para_rango(desde, hasta, max_puntos)
+    ventana = inicio_ventana(hasta, agrupacion, max_puntos)
+    recortada = ventana > desde
+    desde = max(desde, ventana)
+
+    truncar = AGRUPACIONES[agrupacion]
+    ventas = (ResumenVentas.objects.filter(fecha__range=[desde, hasta]).order_by()
+              .values(periodo=truncar('fecha'))
+              .annotate(ventas=Sum('total_ventas'), gastos=Value(Decimal('0.00'), output_field=DecimalField())))
+    gastos = (Gasto.objects.filter(fecha__range=[desde, hasta]).order_by()
+              .values(periodo=truncar('fecha'))
+              .annotate(ventas=Value(Decimal('0.00'), output_field=DecimalField()), gastos=Sum('monto')))
+
+    periodos = {}
+    for fila in ventas.union(gastos, all=True):
+        periodo = periodos.setdefault(fila['periodo'], {'ventas': Decimal('0.00'), 'gastos': Decimal('0.00')})
+        periodo['ventas'] += fila['ventas'] or Decimal('0.00')
+        periodo['gastos'] += fila['gastos'] or Decimal('0.00')
+
+    serie = [{'periodo': periodo, **valores, 'beneficios': valores['ventas'] - valores['gastos']}
+             for periodo, valores in sorted(periodos.items())]
+    return agrupacion, recortada, serie
@@ -0,0 +1,17 @@
+from base.models import Menu, Producto
+from base.services.inventario_service import cargar_composicion_menus
+from base.services.recuento_service import cargar_pesos_recuento
+
+
+# Catálogo del asador (precios, pesos de recuento y productos de cada menú) para validar y valorar pedidos en lote.
+# Se lee de la base de datos dentro de la transacción del alta: con varios procesos una caché local podría
+# valorar los pedidos con precios antiguos tras un cambio guardado en otro proceso
+def cargar_catalogo():
+    pesos_producto, pesos_menu = cargar_pesos_recuento()
+    return {
+        'productos': dict(Producto.objects.values_list('id', 'precio')),
+        'menus': dict(Menu.objects.values_list('id', 'precio')),
+        'pesos_producto': dict(pesos_producto),
+        'pesos_menu': dict(pesos_menu),
+        'composicion_menus': dict(cargar_composicion_menus()),
+    }
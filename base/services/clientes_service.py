@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db.models import Q
+from base.models import Cliente, normalizar_busqueda
+
+# Campos por los que se busca un cliente (cada uno con su columna normalizada <campo>_busqueda indexada)
+CAMPOS_BUSQUEDA = ('codigo', 'nombre', 'cif_dni')
+
+
+def max_resultados():
+    return getattr(settings, 'CLIENTES_BUSQUEDA_MAX', 20)
+
+
+# Clientes cuyo código, nombre o CIF/DNI empieza por el texto. Se compara por rango sobre las columnas
+# normalizadas (campo_busqueda >= texto AND campo_busqueda < texto + '\U0010ffff') y no con LIKE para que use los índices
+def por_prefijo(texto):
+    texto = normalizar_busqueda(texto)
+    condicion = Q()
+    for campo in CAMPOS_BUSQUEDA:
+        condicion |= Q(**{f'{campo}_busqueda__gte': texto, f'{campo}_busqueda__lt': texto + '\U0010ffff'})
+    return Cliente.objects.filter(condicion)
+
+
+# Clientes que contienen el texto en cualquiera de los campos (recorre la tabla: solo completa resultados)
+def por_subcadena(texto):
+    texto = normalizar_busqueda(texto)
+    condicion = Q()
+    for campo in CAMPOS_BUSQUEDA:
+        condicion |= Q(**{f'{campo}_busqueda__contains': texto})
+    return Cliente.objects.filter(condicion)
+
+
+# Búsqueda para el autocompletado: primero los que empiezan por el texto y, si no llegan al límite,
+# los que lo contienen. Nunca devuelve más de CLIENTES_BUSQUEDA_MAX clientes
+def buscar_clientes(texto, limite=None):
+    texto = (texto or '').strip()
+    limite = min(limite or max_resultados(), max_resultados())
+    if not texto:
+        return []
+
+    clientes = list(por_prefijo(texto).order_by('nombre', 'id')[:limite])
+    if len(clientes) < limite and len(texto) >= 2:
+        vistos = [cliente.id for cliente in clientes]
+        clientes += por_subcadena(texto).exclude(id__in=vistos).order_by('nombre', 'id')[:limite - len(clientes)]
+    return clientes
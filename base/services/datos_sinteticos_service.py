@@ -0,0 +1,258 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from base.models import (Capital, Cliente, ContadorFactura, Factura, FacturaProducto, FacturasIVA, FacturaTienda, Gasto,
+                         GastosPersonales, GastosTienda, Inventario, Menu, MenuProducto, PagosBanco, Pedido, PedidoMenu,
+                         PedidoProducto, Producto, Venta)
+from base.services.facturas_service import recalcular_totales
+from base.services.intervalos_service import obtener_turnos
+from base.services.inventario_service import UNIDAD
+from base.services.recuento_service import reconstruir_pesos_recuento
+from base.services.resumen_carniceria_service import recalcular_resumen_carniceria
+from base.services.resumen_service import recalcular_resumenes
+
+# Movimientos medios por día con escala 1: un asador con más pedidos el fin de semana y una carnicería abierta a diario.
+# Los valores menores que 1 son la probabilidad de que haya un movimiento ese día
+PEDIDOS_LABORABLE = 12
+PEDIDOS_FIN_DE_SEMANA = 45
+FACTURAS_CLIENTES = 3
+COMPRAS_IVA = 1
+COMPRAS_TIENDA = 0.5
+GASTOS_TIENDA = 0.35
+GASTOS_PERSONALES = 0.15
+PAGOS_BANCO = 0.15
+GASTOS_ASADOR = 0.3
+CAPITAL_OTROS = 0.4
+CLIENTES = 150
+
+CENTIMOS = Decimal('0.01')
+
+# Filas que se guardan de una vez y días que se generan por bloque (cada bloque en su transacción)
+TAMANO_LOTE = 1000
+DIAS_POR_BLOQUE = 31
+
+# Catálogo mínimo si la base de datos no tiene productos: (nombre, categoría, precio, contador, peso)
+CATALOGO = [
+    ('Pollo asado', 'principal', '10.00', 'pollos', '1.00'),
+    ('Medio pollo asado', 'principal', '6.00', 'pollos', '0.50'),
+    ('Cachopo ternera', 'principal', '15.00', 'cachopos_ternera', '1.00'),
+    ('Cachopo pollo', 'principal', '13.00', 'cachopos_pollo', '1.00'),
+    ('Cachopo lomo', 'principal', '13.00', 'cachopos_lomo', '1.00'),
+    ('Patatas', 'raciones', '3.00', '', '1.00'),
+    ('Croquetas', 'raciones', '6.50', '', '1.00'),
+    ('Ensalada', 'raciones', '5.00', '', '1.00'),
+    ('Agua', 'bebida', '1.20', '', '1.00'),
+    ('Refresco', 'bebida', '1.80', '', '1.00'),
+    ('Cerveza', 'bebida', '2.00', '', '1.00'),
+    ('Tarta de queso', 'postre', '4.00', '', '1.00'),
+    ('Flan', 'postre', '3.00', '', '1.00'),
+]
+MENUS = [
+    ('Menú pollo', '12.00', {'Pollo asado': 1, 'Patatas': 1}),
+    ('Menú familiar', '22.00', {'Pollo asado': 2, 'Patatas': 2, 'Refresco': 2}),
+    ('Menú cachopo', '18.00', {'Cachopo ternera': 1, 'Patatas': 1, 'Agua': 1}),
+]
+
+NOMBRES = ['María', 'Carmen', 'Ana', 'Lucía', 'Laura', 'Antonio', 'José', 'Manuel', 'Francisco', 'David', 'Javier',
+           'Pablo', 'Elena', 'Marta', 'Sergio', 'Raúl', 'Isabel', 'Pilar', 'Alberto', 'Cristina']
+APELLIDOS = ['García', 'Fernández', 'González', 'Rodríguez', 'López', 'Martínez', 'Sánchez', 'Pérez', 'Gómez',
+             'Martín', 'Jiménez', 'Ruiz', 'Hernández', 'Díaz', 'Moreno', 'Álvarez', 'Romero', 'Navarro']
+PROVEEDORES = ['Cárnicas del Henares', 'Embutidos Sierra', 'Distribuciones Alcalá', 'Aves Castilla', 'Makro',
+               'Frigoríficos Centro']
+CORTES = ['Solomillo de ternera', 'Lomo de cerdo', 'Pechuga de pollo', 'Chuletas de cordero', 'Carne picada mixta',
+          'Costillas de cerdo', 'Entrecot', 'Muslos de pollo', 'Secreto ibérico', 'Morcillo']
+GASTOS = ['Luz', 'Agua', 'Gas', 'Bolsas y envases', 'Limpieza', 'Mantenimiento cámara', 'Gestoría', 'Teléfono']
+LETRAS_DNI = 'TRWAGMYFPDXBNJZSQVHLCKE'
+
+
+# Cuántos movimientos hay un día para una media diaria: la parte entera más uno con la probabilidad de la decimal
+def _cantidad(aleatorio, media):
+    entera = int(media)
+    return entera + (aleatorio.random() < media - entera)
+
+
+def _importe(aleatorio, minimo, maximo):
+    return Decimal(aleatorio.randint(int(minimo * 100), int(maximo * 100))) / 100
+
+
+def _nombre(aleatorio):
+    return f'{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)}'
+
+
+def _a_minutos(hora):
+    horas, minutos = hora.split(':')
+    return int(horas) * 60 + int(minutos)
+
+
+def _guardar(modelo, filas):
+    return modelo.objects.bulk_create(filas, batch_size=TAMANO_LOTE)
+
+
+# Catálogo del asador (si no hay productos) e inventario de los productos que no lo tengan
+def preparar_catalogo():
+    if not Producto.objects.exists():
+        productos = _guardar(Producto, [Producto(nombre=nombre, categoria=categoria, precio=Decimal(precio),
+                                                 contador=contador, peso_contador=Decimal(peso))
+                                        for nombre, categoria, precio, contador, peso in CATALOGO])
+        por_nombre = {producto.nombre: producto for producto in productos}
+        menus = _guardar(Menu, [Menu(nombre=nombre, precio=Decimal(precio)) for nombre, precio, _ in MENUS])
+        _guardar(MenuProducto, [MenuProducto(menu=menu, producto=por_nombre[producto], cantidad=cantidad)
+                                for menu, (_, _, composicion) in zip(menus, MENUS)
+                                for producto, cantidad in composicion.items()])
+        # bulk_create no lanza las señales que mantienen los pesos del recuento
+        reconstruir_pesos_recuento()
+
+    # Los productos con contador descuentan de la fila de su producto unidad (ver filas_contadores)
+    sin_inventario = Producto.objects.filter(Q(contador='') | Q(peso_contador=UNIDAD), inventario__isnull=True)
+    _guardar(Inventario, [Inventario(producto=producto, cantidad_disponible=Decimal(200)) for producto in sin_inventario])
+
+
+# Clientes de las facturas con código y DNI únicos, a continuación del mayor código C000000 que ya hay (contar los
+# clientes no basta: si se ha borrado alguno o hay otros códigos se repetiría un código existente)
+def generar_clientes(aleatorio, cantidad):
+    ultimo = (Cliente.objects.filter(codigo__regex=r'^C[0-9]{6}$').order_by('-codigo')
+              .values_list('codigo', flat=True).first())
+    inicio = int(ultimo[1:]) + 1 if ultimo else 1
+    clientes = []
+    for numero in range(inicio, inicio + cantidad):
+        dni = numero * 7919 % 100000000
+        cliente = Cliente(nombre=_nombre(aleatorio), codigo=f'C{numero:06d}',
+                          direccion=f'Calle {aleatorio.choice(APELLIDOS)}, {aleatorio.randint(1, 120)}, Alcalá de Henares',
+                          cif_dni=f'{dni:08d}{LETRAS_DNI[dni % 23]}')
+        cliente.actualizar_busqueda()
+        clientes.append(cliente)
+    return _guardar(Cliente, clientes)
+
+
+# Pedidos de un día repartidos por los turnos del asador: [(pedido, líneas de productos, líneas de menús)]
+# con 1-3 productos y, en uno de cada tres pedidos, un menú
+def pedidos_del_dia(aleatorio, dia, escala, productos, menus, turnos, hoy):
+    media = PEDIDOS_FIN_DE_SEMANA if dia.weekday() >= 5 else PEDIDOS_LABORABLE
+    pedidos = []
+    for _ in range(_cantidad(aleatorio, media * escala)):
+        inicio, fin = aleatorio.choice(turnos)
+        minuto = aleatorio.randrange(inicio, fin)
+        pedido = Pedido(nombre_cliente=_nombre(aleatorio), entregado=dia < hoy,
+                        fecha_hora=timezone.make_aware(datetime.combine(dia, time(minuto // 60, minuto % 60))),
+                        observaciones='Sin sal' if aleatorio.random() < 0.05 else '')
+        lineas = [PedidoProducto(pedido=pedido, producto=producto, cantidad=aleatorio.randint(1, 3))
+                  for producto in aleatorio.sample(productos, aleatorio.randint(1, min(3, len(productos))))]
+        lineas_menu = []
+        if menus and aleatorio.random() < 0.3:
+            lineas_menu.append(PedidoMenu(pedido=pedido, menu=aleatorio.choice(menus), cantidad=aleatorio.randint(1, 2)))
+        pedidos.append((pedido, lineas, lineas_menu))
+    return pedidos
+
+
+# Movimientos de la carnicería de un día: venta, compras, gastos, pagos y capital por tipo de ingreso
+def movimientos_del_dia(aleatorio, dia, escala, filas):
+    # Cierre de caja: una venta y el efectivo y las tarjetas del día (no dependen de la escala)
+    filas[Venta].append(Venta(fecha=dia, total=_importe(aleatorio, 300, 2500)))
+    filas[Capital].append(Capital(fecha=dia, tipo_ingreso='EF', total=_importe(aleatorio, 100, 1200)))
+    filas[Capital].append(Capital(fecha=dia, tipo_ingreso='TA', total=_importe(aleatorio, 200, 1500)))
+    for _ in range(_cantidad(aleatorio, CAPITAL_OTROS * escala)):
+        tipo = aleatorio.choice(['BB', 'S1', 'S2', 'HI', 'ES', 'FA', 'VA'])
+        filas[Capital].append(Capital(fecha=dia, tipo_ingreso=tipo, total=_importe(aleatorio, 50, 3000)))
+    for _ in range(_cantidad(aleatorio, COMPRAS_IVA * escala)):
+        filas[FacturasIVA].append(FacturasIVA(proveedor=aleatorio.choice(PROVEEDORES), fecha=dia,
+                                              numero_factura=f'P{dia:%y%m%d}-{aleatorio.randint(1, 9999):04d}',
+                                              total=_importe(aleatorio, 80, 1800), pagada=aleatorio.random() < 0.8))
+    for _ in range(_cantidad(aleatorio, COMPRAS_TIENDA * escala)):
+        filas[FacturaTienda].append(FacturaTienda(proveedor=aleatorio.choice(PROVEEDORES), fecha=dia,
+                                                  total=_importe(aleatorio, 20, 400), pagada=aleatorio.random() < 0.8))
+    for _ in range(_cantidad(aleatorio, GASTOS_TIENDA * escala)):
+        filas[GastosTienda].append(GastosTienda(fecha=dia, gasto=aleatorio.choice(GASTOS), total=_importe(aleatorio, 15, 350)))
+    for _ in range(_cantidad(aleatorio, GASTOS_PERSONALES * escala)):
+        filas[GastosPersonales].append(GastosPersonales(fecha=dia, gasto='Retirada personal', total=_importe(aleatorio, 50, 600)))
+    for _ in range(_cantidad(aleatorio, PAGOS_BANCO * escala)):
+        filas[PagosBanco].append(PagosBanco(fecha=dia, concepto=aleatorio.choice(['Préstamo', 'Seguro', 'Comisiones', 'Alquiler']),
+                                            total=_importe(aleatorio, 30, 1500)))
+    for _ in range(_cantidad(aleatorio, GASTOS_ASADOR * escala)):
+        filas[Gasto].append(Gasto(descripcion=aleatorio.choice(GASTOS), fecha=dia, monto=_importe(aleatorio, 10, 300)))
+
+
+# Facturas a clientes de un día con 1-5 líneas: [(factura, líneas)]. Se numeran aquí porque bulk_create
+# no pasa por Factura.save()
+def facturas_del_dia(aleatorio, dia, escala, clientes, numeros, serie):
+    facturas = []
+    for _ in range(_cantidad(aleatorio, FACTURAS_CLIENTES * escala)):
+        numeros[dia.year] += 1
+        factura = Factura(cliente=aleatorio.choice(clientes), fecha_emision=dia, fecha_entrega=dia, serie=serie,
+                          ejercicio=dia.year, numero=numeros[dia.year],
+                          numero_factura=f'{serie}{dia.year}-{numeros[dia.year]:05d}')
+        lineas = []
+        for _ in range(aleatorio.randint(1, 5)):
+            cantidad = Decimal(aleatorio.randint(250, 15000)) / 1000
+            precio_kg = _importe(aleatorio, 4, 45)
+            # Mismo cálculo que FacturaProducto.save()
+            total_neto = (cantidad * precio_kg).quantize(CENTIMOS)
+            iva = (total_neto * Decimal('0.10')).quantize(CENTIMOS)
+            lineas.append(FacturaProducto(factura=factura, descripcion=aleatorio.choice(CORTES), cantidad=cantidad,
+                                          precio_kg=precio_kg, iva=iva, total_neto=total_neto, total=total_neto + iva))
+        facturas.append((factura, lineas))
+    return facturas
+
+
+# Guardar un bloque de días en una transacción. Las líneas van después de sus cabeceras: bulk_create
+# toma el id del pedido o la factura recién guardados
+def _guardar_bloque(pedidos, facturas, filas, creadas):
+    nuevas = {
+        Pedido: [pedido for pedido, _, _ in pedidos],
+        PedidoProducto: [linea for _, lineas, _ in pedidos for linea in lineas],
+        PedidoMenu: [linea for _, _, lineas_menu in pedidos for linea in lineas_menu],
+        Factura: [factura for factura, _ in facturas],
+        FacturaProducto: [linea for _, lineas in facturas for linea in lineas],
+        **filas,
+    }
+    with transaction.atomic():
+        for modelo, instancias in nuevas.items():
+            _guardar(modelo, instancias)
+            creadas[modelo.__name__] += len(instancias)
+
+
+# Generar los movimientos de los últimos <dias> días hasta <hasta> (hoy por defecto) con los volúmenes de escala 1
+# multiplicados por <escala>. Con la misma semilla se generan los mismos datos. Devuelve las filas creadas por modelo
+def generar_datos_sinteticos(dias=730, escala=1.0, semilla=None, hasta=None):
+    aleatorio = random.Random(semilla)
+    hoy = timezone.localdate()
+    hasta = hasta or hoy
+    desde = hasta - timedelta(days=dias - 1)
+    creadas = Counter()
+
+    preparar_catalogo()
+    productos = list(Producto.objects.all())
+    menus = list(Menu.objects.all())
+    clientes = generar_clientes(aleatorio, max(1, round(CLIENTES * escala)))
+    creadas['Cliente'] = len(clientes)
+    turnos = [(_a_minutos(inicio), _a_minutos(fin)) for inicio, fin in obtener_turnos().values()]
+
+    # La numeración sigue donde la dejó el contador de cada ejercicio
+    serie = getattr(settings, 'FACTURAS_SERIE', 'F')
+    numeros = Counter(dict(ContadorFactura.objects.filter(serie=serie).values_list('ejercicio', 'ultimo')))
+
+    dia = desde
+    while dia <= hasta:
+        pedidos, facturas, filas = [], [], {modelo: [] for modelo in (
+            Venta, FacturasIVA, FacturaTienda, GastosTienda, GastosPersonales, PagosBanco, Capital, Gasto)}
+        fin_bloque = min(dia + timedelta(days=DIAS_POR_BLOQUE - 1), hasta)
+        while dia <= fin_bloque:
+            pedidos += pedidos_del_dia(aleatorio, dia, escala, productos, menus, turnos, hoy)
+            facturas += facturas_del_dia(aleatorio, dia, escala, clientes, numeros, serie)
+            movimientos_del_dia(aleatorio, dia, escala, filas)
+            dia += timedelta(days=1)
+        _guardar_bloque(pedidos, facturas, filas, creadas)
+
+    for ejercicio, ultimo in numeros.items():
+        ContadorFactura.objects.update_or_create(serie=serie, ejercicio=ejercicio, defaults={'ultimo': ultimo})
+
+    # bulk_create no lanza las señales: reconstruir los resúmenes diarios y los totales de las facturas del rango
+    recalcular_resumenes(desde, hasta)
+    recalcular_resumen_carniceria(desde, hasta)
+    recalcular_totales(desde, hasta)
+    return dict(creadas)
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum
+from django.utils import timezone
+from base.models import Pedido, PedidoMenu, PedidoProducto
+from base.services.inventario_service import existencias_contador
+from base.services.pedidos_service import filtrar_pedidos_dia
+from base.services.recuento_service import contadores_vacios
+
+# Eventos pendientes por pantalla: si una pantalla no los consume se descartan los más antiguos
+MAXIMO_EVENTOS_PENDIENTES = 100
+
+# Pantallas conectadas al tablero: (bucle de eventos, cola) de cada conexión.
+# Las señales se ejecutan en hilos síncronos, así que los eventos se entregan con call_soon_threadsafe.
+# Es un canal en memoria del proceso: con varios procesos cada uno solo avisa a sus propias conexiones
+_suscriptores = set()
+_candado = threading.Lock()
+
+
+def suscribir():
+    cola = asyncio.Queue(maxsize=MAXIMO_EVENTOS_PENDIENTES)
+    with _candado:
+        _suscriptores.add((asyncio.get_running_loop(), cola))
+    return cola
+
+
+def cancelar_suscripcion(cola):
+    with _candado:
+        for suscriptor in [s for s in _suscriptores if s[1] is cola]:
+            _suscriptores.discard(suscriptor)
+
+
+def hay_suscriptores():
+    return bool(_suscriptores)
+
+
+def _entregar(cola, evento):
+    if cola.full():
+        cola.get_nowait()
+    cola.put_nowait(evento)
+
+
+def publicar(evento):
+    with _candado:
+        suscriptores = list(_suscriptores)
+    for bucle, cola in suscriptores:
+        if bucle.is_closed():
+            continue
+        bucle.call_soon_threadsafe(_entregar, cola, evento)
+
+
+# Versión del tablero de un día: cambia al crear, editar, entregar o borrar cualquiera de sus pedidos
+def version_tablero(numero_pedidos, modificado):
+    return f"{numero_pedidos}-{modificado.isoformat() if modificado else ''}"
+
+
+# Contadores que muestra el tablero de un día (encargados de cada contador y, si es hoy, pollos restantes y
+# disponibles) y su versión, con consultas agregadas en lugar de construir el tablero entero
+def contadores_dia(fecha):
+    pedidos = filtrar_pedidos_dia(Pedido.objects.order_by(), fecha.isoformat())
+    estado = pedidos.aggregate(numero=Count('id'), modificado=Max('modificado'))
+    contadores = {'version': version_tablero(estado['numero'], estado['modificado']), 'numero_pedidos': estado['numero']}
+
+    totales = contadores_vacios()
+    encargados = DecimalField(max_digits=10, decimal_places=2)
+    for modelo, articulo in ((PedidoProducto, 'producto'), (PedidoMenu, 'menu')):
+        lineas = (modelo.objects.filter(pedido__in=pedidos, **{f'{articulo}__pesorecuento__isnull': False})
+                  .values(f'{articulo}__pesorecuento__contador')
+                  .annotate(total=Sum(F('cantidad') * F(f'{articulo}__pesorecuento__peso'), output_field=encargados)))
+        for fila in lineas:
+            totales[fila[f'{articulo}__pesorecuento__contador']] += fila['total']
+    for contador, total in totales.items():
+        contadores[f'total_{contador}'] = str(total)
+
+    if fecha == timezone.localdate():
+        restantes = existencias_contador('pollos')
+        contadores['pollos_restantes'] = str(restantes)
+        contadores['pollos_disponibles'] = str(restantes + totales['pollos'])
+    return contadores
+
+
+# Avisar a las pantallas de un cambio en uno o varios pedidos del mismo día cuando se confirme la transacción
+def publicar_cambio_pedidos(tipo, pedido_ids, fecha, **datos):
+    def enviar():
+        if not hay_suscriptores():
+            return
+        evento = {'tipo': tipo, 'pedidos': list(pedido_ids), 'fecha': fecha.isoformat(), **datos}
+        # Entregar un pedido no cambia ningún contador
+        if tipo != 'entregado':
+            evento['contadores'] = contadores_dia(fecha)
+        publicar(evento)
+    transaction.on_commit(enviar)
@@ -0,0 +1,90 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+import multiprocessing
+import os
+import zipfile
+
+from django.conf import settings
+from base.services.facturas_pdf_service import pdf_factura, ruta_pdf_factura
+from base.services.procesos_facturas import iniciar_proceso, renderizar_factura
+
+
+def procesos_por_defecto():
+    return getattr(settings, 'FACTURAS_EXPORTAR_PROCESOS', min(4, os.cpu_count() or 1))
+
+
+def nombre_en_zip(factura):
+    return f'Factura_Pettisso_{factura.numero_factura}_{factura.pk}.pdf'
+
+
+# Generar los PDFs de varias facturas: los de la caché se devuelven al momento y el resto se reparte
+# entre como mucho `procesos` procesos (cada uno lanza su wkhtmltopdf). Devuelve (factura, ruta) según terminan
+def generar_pdfs(facturas, procesos=None, directorio=None):
+    procesos = procesos or procesos_por_defecto()
+    pendientes = {}
+    for factura in facturas.select_related('cliente').prefetch_related('facturaproducto_set'):
+        productos = list(factura.facturaproducto_set.all())
+        ruta = ruta_pdf_factura(factura, productos, directorio)
+        if ruta.exists():
+            yield factura, ruta
+        else:
+            pendientes[factura.pk] = (factura, productos)
+
+    # Ruta en serie: un solo proceso o una sola factura no compensan arrancar procesos
+    if procesos <= 1 or len(pendientes) <= 1:
+        for factura, productos in pendientes.values():
+            yield factura, pdf_factura(factura, productos, directorio)
+        return
+
+    # Los procesos se crean con 'spawn' (igual en Linux y Windows) y preparan Django desde cero
+    contexto = multiprocessing.get_context('spawn')
+    ejecutor = ProcessPoolExecutor(max_workers=min(procesos, len(pendientes)), mp_context=contexto,
+                                   initializer=iniciar_proceso)
+    try:
+        futuros = [ejecutor.submit(renderizar_factura, factura_id, directorio) for factura_id in pendientes]
+        for futuro in as_completed(futuros):
+            factura_id, ruta = futuro.result()
+            yield pendientes[factura_id][0], Path(ruta)
+    finally:
+        # Si se corta la descarga (GeneratorExit) o falla una factura, las pendientes no llegan a renderizarse:
+        # solo se espera a las que ya están en marcha
+        ejecutor.shutdown(cancel_futures=True)
+
+
+# Salida del ZIP en memoria que se vacía tras cada fichero para enviarlo por partes
+class _SalidaZip:
+
+    def __init__(self):
+        self.trozos = []
+
+    def write(self, datos):
+        self.trozos.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.trozos)
+        self.trozos.clear()
+        return datos
+
+
+# ZIP con los PDFs de las facturas, generado por partes para StreamingHttpResponse o para un fichero.
+# `progreso(hechas, total)` se llama después de añadir cada factura
+def flujo_zip_facturas(facturas, procesos=None, progreso=None, directorio=None):
+    total = facturas.count()
+    salida = _SalidaZip()
+    pdfs = generar_pdfs(facturas, procesos, directorio)
+    try:
+        # Los PDF ya van comprimidos: se guardan tal cual
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo:
+            for hechas, (factura, ruta) in enumerate(pdfs, 1):
+                archivo.write(ruta, nombre_en_zip(factura))
+                if progreso:
+                    progreso(hechas, total)
+                yield salida.vaciar()
+        yield salida.vaciar()
+    finally:
+        # Cerrar el generador al cortarse la descarga cancela los PDFs que aún no se han empezado
+        pdfs.close()
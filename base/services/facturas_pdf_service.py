@@ -0,0 +1,138 @@
+from functools import lru_cache
+from pathlib import Path
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import get_template
+from base.services.renderizadores_pdf import obtener_renderizador
+
+# Plantillas y ficheros estáticos con los que se genera el PDF: si cambian, cambia la huella y se generan PDFs nuevos
+PLANTILLA_FACTURA = 'carniceria/facturas/imprimir_factura.html'
+PLANTILLAS_PDF = (PLANTILLA_FACTURA, 'carniceria/facturas/factura_contenido.html')
+CSS_FACTURA = 'styles/carniceria/facturas/facturas.css'
+LOGO_FACTURA = 'images/logo_factura.png'
+# Subir al cambiar la forma de generar el PDF (opciones de pdfkit, dibujo con Pillow...) para descartar la caché
+VERSION_PDF_FACTURA = 1
+
+
+def directorio_pdfs(directorio=None):
+    return Path(directorio or getattr(settings, 'FACTURAS_PDF_DIR', settings.BASE_DIR / 'cache' / 'facturas'))
+
+
+# Ruta local de un fichero estático: primero STATIC_ROOT (tras collectstatic) y si no, las carpetas de static
+def ruta_estatico(nombre):
+    if settings.STATIC_ROOT:
+        ruta = Path(settings.STATIC_ROOT) / nombre
+        if ruta.exists():
+            return ruta
+    ruta = finders.find(nombre)
+    if not ruta:
+        raise FileNotFoundError(f'No se encuentra el fichero estático {nombre}.')
+    return Path(ruta)
+
+
+@lru_cache(maxsize=None)
+def _css_factura():
+    return ruta_estatico(CSS_FACTURA).read_text(encoding='utf-8')
+
+
+@lru_cache(maxsize=None)
+def _version_plantilla():
+    huella = hashlib.sha256()
+    for nombre in PLANTILLAS_PDF:
+        with open(get_template(nombre).origin.name, 'rb') as plantilla:
+            huella.update(plantilla.read())
+    huella.update(_css_factura().encode())
+    huella.update(ruta_estatico(LOGO_FACTURA).read_bytes())
+    return huella.hexdigest()
+
+
+# Huella de todo lo que aparece en el PDF: factura, cliente, líneas, versión de la plantilla y renderizador
+def huella_factura(factura, productos, renderizador):
+    cliente = factura.cliente
+    datos = {
+        'version': VERSION_PDF_FACTURA,
+        'renderizador': renderizador,
+        'plantilla': _version_plantilla(),
+        'factura': [
+            factura.numero_factura, factura.fecha_emision, factura.fecha_entrega,
+            factura.nombre_empresa, factura.telefono_empresa, factura.email_empresa,
+            factura.nombre_emisor, factura.direccion_emisor, factura.cif_nif_emisor,
+            factura.total_neto, factura.total_iva, factura.total,
+        ],
+        'cliente': [cliente.nombre, cliente.codigo, cliente.direccion, cliente.cif_dni],
+        'productos': [
+            [producto.pk, producto.descripcion, producto.cantidad, producto.precio_kg,
+             producto.total_neto, producto.iva, producto.total]
+            for producto in productos
+        ],
+    }
+    return hashlib.sha256(json.dumps(datos, default=str).encode()).hexdigest()
+
+
+def ruta_pdf_factura(factura, productos, directorio=None, renderizador=None):
+    renderizador = renderizador or obtener_renderizador().nombre
+    return directorio_pdfs(directorio) / f'factura-{factura.pk}-{huella_factura(factura, productos, renderizador)}.pdf'
+
+
+# Guardar el PDF de forma atómica (fichero temporal + rename) para no servir nunca un PDF a medias
+def guardar_pdf_factura(ruta, pdf):
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as fichero:
+            fichero.write(pdf)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+# Borrar los PDFs cacheados de una factura (al cambiar la factura o sus líneas)
+def invalidar_pdf_factura(factura_id):
+    for ruta in directorio_pdfs().glob(f'factura-{factura_id}-*.pdf'):
+        ruta.unlink(missing_ok=True)
+
+
+# Contexto de la plantilla de la factura (previsualización y PDF)
+def contexto_factura(factura, productos):
+    return {
+        'factura': factura,
+        'cliente': factura.cliente,
+        'productos': productos,
+        'empresa': {
+            'nombre': factura.nombre_emisor,
+            'telefono': factura.telefono_empresa,
+            'email': factura.email_empresa,
+            'direccion': factura.direccion_emisor,
+            'cif_nif': factura.cif_nif_emisor
+        },
+        'totales': {
+            'neto': factura.total_neto,
+            'iva': factura.total_iva,
+            'total': factura.total
+        },
+    }
+
+
+# HTML para imprimir: plantilla propia con los estilos incrustados y el logo como fichero local,
+# así wkhtmltopdf no hace ninguna petición al servidor
+def html_impresion_factura(factura, productos):
+    contexto = contexto_factura(factura, productos)
+    contexto['css'] = _css_factura()
+    contexto['logo_src'] = ruta_estatico(LOGO_FACTURA).resolve().as_uri()
+    return get_template(PLANTILLA_FACTURA).render(contexto)
+
+
+# PDF de la factura: el de la caché si la factura no ha cambiado o uno nuevo generado con el renderizador
+# configurado (o el indicado). Devuelve la ruta del fichero
+def pdf_factura(factura, productos, directorio=None, renderizador=None):
+    renderizador = obtener_renderizador(renderizador)
+    ruta = ruta_pdf_factura(factura, productos, directorio, renderizador.nombre)
+    if not ruta.exists():
+        guardar_pdf_factura(ruta, renderizador.renderizar(factura, productos))
+    return ruta
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from base.models import Factura, FacturaProducto
+
+CENTIMOS = Decimal('0.01')
+CAMPOS_TOTALES = ['total_neto', 'total_iva', 'total']
+
+
+# Recalcular los totales de las facturas de un rango de fechas de emisión con una consulta
+# agrupada por factura y un bulk_update de las que no cuadran. Devuelve las facturas corregidas
+def recalcular_totales(fecha_inicio=None, fecha_fin=None):
+    facturas = Factura.objects.order_by()
+    if fecha_inicio:
+        facturas = facturas.filter(fecha_emision__gte=fecha_inicio)
+    if fecha_fin:
+        facturas = facturas.filter(fecha_emision__lte=fecha_fin)
+
+    totales = {
+        fila['factura_id']: fila
+        for fila in (FacturaProducto.objects.filter(factura__in=facturas).order_by()
+                     .values('factura_id')
+                     .annotate(total_neto=Sum('total_neto'), total_iva=Sum('iva'), total=Sum('total')))
+    }
+
+    corregidas = []
+    for factura in facturas.only('id', *CAMPOS_TOTALES):
+        fila = totales.get(factura.pk, {})
+        nuevos = [(fila.get(campo) or Decimal('0.00')).quantize(CENTIMOS) for campo in CAMPOS_TOTALES]
+        if [factura.total_neto, factura.total_iva, factura.total] != nuevos:
+            factura.total_neto, factura.total_iva, factura.total = nuevos
+            corregidas.append(factura)
+
+    with transaction.atomic():
+        Factura.objects.bulk_update(corregidas, CAMPOS_TOTALES, batch_size=500)
+    return len(corregidas)
@@ -0,0 +1,89 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import ExtractHour, ExtractMinute
+
+# Turnos de servicio y ancho de los intervalos por defecto (configurables en settings)
+TURNOS_POR_DEFECTO = {
+    'comida': ('13:00', '15:30'),
+    'cena': ('20:00', '23:00'),
+}
+MINUTOS_INTERVALO_POR_DEFECTO = 15
+
+
+def obtener_turnos():
+    return getattr(settings, 'ASADOR_TURNOS', TURNOS_POR_DEFECTO)
+
+
+def obtener_minutos_intervalo():
+    return getattr(settings, 'ASADOR_MINUTOS_INTERVALO', MINUTOS_INTERVALO_POR_DEFECTO)
+
+
+def _a_minutos(hora):
+    horas, minutos = hora.split(':')
+    return int(horas) * 60 + int(minutos)
+
+
+def _a_hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+# Tabla minuto del día -> índice de intervalo, calculada una vez por configuración.
+# El último intervalo de cada turno incluye también la hora de cierre
+@lru_cache(maxsize=16)
+def _tabla_intervalos(turnos, minutos):
+    intervalos = []
+    tabla = [None] * (24 * 60)
+    for inicio, fin in turnos:
+        desde, hasta = _a_minutos(inicio), _a_minutos(fin)
+        for limite in range(desde, hasta, minutos):
+            indice = len(intervalos)
+            intervalos.append((_a_hora(limite), _a_hora(min(limite + minutos, hasta))))
+            for minuto in range(limite, min(limite + minutos, hasta)):
+                tabla[minuto] = indice
+        if hasta < len(tabla) and tabla[hasta] is None and intervalos:
+            tabla[hasta] = len(intervalos) - 1
+    return tuple(intervalos), tuple(tabla)
+
+
+# Histograma de pedidos por intervalo con búsqueda O(1) por minuto del día
+class HistogramaIntervalos:
+
+    def __init__(self, minutos=None, turnos=None):
+        self.minutos = minutos or obtener_minutos_intervalo()
+        self.turnos = turnos or obtener_turnos()
+        self.intervalos, self.tabla = _tabla_intervalos(tuple(tuple(turno) for turno in self.turnos.values()), self.minutos)
+        self.conteo = [0] * len(self.intervalos)
+        self.fuera_de_turno = 0
+
+    def sumar(self, hora, minuto, cantidad=1):
+        indice = self.tabla[hora * 60 + minuto]
+        if indice is None:
+            self.fuera_de_turno += cantidad
+        else:
+            self.conteo[indice] += cantidad
+
+    def como_diccionario(self):
+        return dict(zip(self.intervalos, self.conteo))
+
+    def como_json(self):
+        return {
+            'minutos': self.minutos,
+            'turnos': self.turnos,
+            'intervalos': [{'inicio': inicio, 'fin': fin, 'pedidos': pedidos}
+                           for (inicio, fin), pedidos in zip(self.intervalos, self.conteo)],
+            'fuera_de_turno': self.fuera_de_turno,
+        }
+
+
+# Contar los pedidos agrupando por minuto del día en la base de datos (a lo sumo 1440 filas)
+def histograma_pedidos(pedidos, minutos=None):
+    histograma = HistogramaIntervalos(minutos)
+    filas = (pedidos.order_by()
+             .annotate(hora=ExtractHour('fecha_hora'), minuto=ExtractMinute('fecha_hora'))
+             .values('hora', 'minuto')
+             .annotate(cantidad=Count('id')))
+    for fila in filas:
+        histograma.sumar(fila['hora'], fila['minuto'], fila['cantidad'])
+    return histograma
@@ -0,0 +1,96 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import BigIntegerField, Case, DecimalField, F, OuterRef, Q, Subquery, Value, When
+from base.models import Inventario, MenuProducto, PedidoMenu, PedidoProducto, Producto
+
+# Peso del producto unidad de un contador, el que guarda sus existencias
+UNIDAD = Decimal('1.00')
+
+
+# Productos de cada menú: {menu_id: [(producto_id, cantidad), ...]}
+def cargar_composicion_menus(menu_ids=None):
+    composicion = defaultdict(list)
+    menu_productos = MenuProducto.objects.values_list('menu_id', 'producto_id', 'cantidad')
+    if menu_ids is not None:
+        menu_productos = menu_productos.filter(menu_id__in=list(menu_ids))
+    for menu_id, producto_id, cantidad in menu_productos:
+        composicion[menu_id].append((producto_id, cantidad))
+    return composicion
+
+
+# Unidades de cada producto que consumen unas líneas ({id: cantidad}, admite cantidades negativas),
+# con los menús expandidos por sus productos
+def calcular_consumo(productos, menus, composicion, consumo=None):
+    consumo = consumo if consumo is not None else defaultdict(Decimal)
+    for producto_id, cantidad in productos.items():
+        consumo[producto_id] += cantidad
+    for menu_id, cantidad in menus.items():
+        for producto_id, cantidad_menu in composicion.get(menu_id, ()):
+            consumo[producto_id] += cantidad_menu * cantidad
+    return consumo
+
+
+# Consumo completo de un pedido guardado (todas sus líneas)
+def consumo_pedido(pedido_id):
+    productos = defaultdict(int)
+    for producto_id, cantidad in PedidoProducto.objects.filter(pedido_id=pedido_id).values_list('producto_id', 'cantidad'):
+        productos[producto_id] += cantidad
+    menus = defaultdict(int)
+    for menu_id, cantidad in PedidoMenu.objects.filter(pedido_id=pedido_id).values_list('menu_id', 'cantidad'):
+        menus[menu_id] += cantidad
+    return calcular_consumo(productos, menus, cargar_composicion_menus(menus) if menus else {})
+
+
+# Fila de inventario de un contador del tablero: cada contador guarda sus existencias en una sola fila, la de su
+# producto unidad (peso_contador 1, p. ej. el pollo asado). Si hay varios se usa el primero que se dio de alta
+def fila_contador(contador):
+    return (Inventario.objects.filter(producto__contador=contador, producto__peso_contador=UNIDAD)
+            .order_by('producto_id'))
+
+
+# Descontar el consumo de las existencias con una consulta (la fila que descuenta cada producto) y un único
+# UPDATE atómico: cantidad_disponible = cantidad_disponible - CASE producto_id WHEN ... END.
+# Al calcularse en la base de datos, dos terminales que venden a la vez no se pisan.
+# Los productos que suman a un contador del tablero descuentan de la fila del contador en sus unidades
+# (tres medios pollos descuentan 1.5 del pollo asado), el resto de su propia fila.
+# Los productos sin fila de inventario no llevan control de existencias
+def descontar_existencias(consumo):
+    consumo = {producto_id: cantidad for producto_id, cantidad in consumo.items() if cantidad}
+    if not consumo:
+        return 0
+    # Fila que descuenta cada producto y en qué unidades
+    fila_del_contador = Subquery(fila_contador(OuterRef('contador')).values('producto_id')[:1])
+    destinos = Producto.objects.filter(pk__in=consumo).annotate(
+        fila=Case(When(contador='', then=F('id')), default=fila_del_contador, output_field=BigIntegerField()),
+        factor=Case(When(contador='', then=Value(UNIDAD)), default=F('peso_contador'),
+                    output_field=DecimalField(max_digits=5, decimal_places=2)),
+    ).values_list('id', 'fila', 'factor')
+    descuentos = defaultdict(Decimal)
+    for producto_id, fila, factor in destinos:
+        if fila is not None:
+            descuentos[fila] += factor * consumo[producto_id]
+    descuentos = {producto_id: cantidad for producto_id, cantidad in descuentos.items() if cantidad}
+    if not descuentos:
+        return 0
+
+    descuento = Case(
+        *[When(producto_id=producto_id, then=Value(Decimal(cantidad))) for producto_id, cantidad in descuentos.items()],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    return Inventario.objects.filter(producto_id__in=descuentos).update(
+        cantidad_disponible=F('cantidad_disponible') - descuento)
+
+
+# Existencias actuales de los productos con inventario (una consulta). De los productos con contador solo se
+# muestra la fila que se descuenta (la de peso_contador 1)
+def existencias():
+    return list(Inventario.objects.select_related('producto')
+                .exclude(~Q(producto__contador='') & ~Q(producto__peso_contador=UNIDAD))
+                .order_by('producto__nombre'))
+
+
+# Existencias que quedan de un contador del tablero, en unidades del contador (una consulta a su fila)
+def existencias_contador(contador):
+    restantes = fila_contador(contador).values_list('cantidad_disponible', flat=True).first()
+    return restantes if restantes is not None else Decimal('0.00')
@@ -0,0 +1,115 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from base.forms import PedidoForm
+from base.models import Pedido, PedidoMenu, PedidoProducto
+from base.services.catalogo_service import cargar_catalogo
+from base.services.eventos_service import publicar_cambio_pedidos
+from base.services.inventario_service import calcular_consumo, descontar_existencias
+from base.services.resumen_service import (
+    Aportacion, aplicar_delta, calcular_aportacion, fecha_resumen, lineas_en_bloque,
+)
+
+# Máximo de pedidos aceptados en una sola petición
+MAXIMO_PEDIDOS_LOTE = 500
+
+
+# Validar las líneas de un pedido contra el catálogo: devuelve ({id: cantidad}, errores)
+def _validar_lineas(lineas, campo, precios):
+    cantidades = {}
+    errores = []
+    if not isinstance(lineas, list):
+        return cantidades, [f'La lista de {campo}s no es válida.']
+    for posicion, linea in enumerate(lineas):
+        try:
+            articulo_id = int(linea[campo])
+            cantidad = int(linea.get('cantidad', 1))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            errores.append(f'{campo} {posicion}: línea incorrecta.')
+            continue
+        if articulo_id not in precios:
+            errores.append(f'{campo} {posicion}: el {campo} {articulo_id} no existe.')
+        elif cantidad < 1:
+            errores.append(f'{campo} {posicion}: la cantidad debe ser al menos 1.')
+        else:
+            cantidades[articulo_id] = cantidades.get(articulo_id, 0) + cantidad
+    return cantidades, errores
+
+
+# Validar cada pedido con las mismas reglas que el formulario de creación y contra el catálogo.
+# Devuelve ([(pedido sin guardar, productos, menús)], {posición: errores})
+def _validar_pedidos(datos_pedidos, catalogo):
+    validos = []
+    errores = {}
+
+    for posicion, datos in enumerate(datos_pedidos):
+        if not isinstance(datos, dict):
+            errores[posicion] = {'pedido': ['El pedido debe ser un objeto.']}
+            continue
+        # Mismas reglas de validación que el formulario de creación
+        form = PedidoForm(data={
+            'nombre_cliente': datos.get('nombre_cliente'),
+            'fecha_hora': datos.get('fecha_hora'),
+            'observaciones': datos.get('observaciones') or '',
+        })
+        productos, errores_productos = _validar_lineas(datos.get('productos', []), 'producto', catalogo['productos'])
+        menus, errores_menus = _validar_lineas(datos.get('menus', []), 'menu', catalogo['menus'])
+
+        if not form.is_valid() or errores_productos or errores_menus:
+            errores[posicion] = dict(form.errors)
+            if errores_productos:
+                errores[posicion]['productos'] = errores_productos
+            if errores_menus:
+                errores[posicion]['menus'] = errores_menus
+            continue
+        validos.append((form.save(commit=False), productos, menus))
+
+    return validos, errores
+
+
+# Registrar uno o varios pedidos con sus líneas en una transacción y con inserciones en bloque.
+# Si algún pedido no es válido no se guarda ninguno y se devuelven los errores por posición
+def registrar_lote_pedidos(datos_pedidos):
+    with transaction.atomic(), lineas_en_bloque():
+        # Precios y pesos leídos en la misma transacción que las inserciones (nunca de una caché desfasada)
+        catalogo = cargar_catalogo()
+        validos, errores = _validar_pedidos(datos_pedidos, catalogo)
+        if errores:
+            return None, errores
+
+        pedidos = Pedido.objects.bulk_create([pedido for pedido, _, _ in validos])
+
+        lineas_productos, lineas_menus = [], []
+        consumo = defaultdict(Decimal)
+        deltas = defaultdict(lambda: {'pedidos': 0, 'aportacion': Aportacion(), 'ids': []})
+        resultado = []
+        for pedido, productos, menus in validos:
+            aportacion = Aportacion()
+            for producto_id, cantidad in productos.items():
+                lineas_productos.append(PedidoProducto(pedido=pedido, producto_id=producto_id, cantidad=cantidad))
+                aportacion += calcular_aportacion(
+                    catalogo['productos'][producto_id], catalogo['pesos_producto'].get(producto_id, ()), cantidad)
+            for menu_id, cantidad in menus.items():
+                lineas_menus.append(PedidoMenu(pedido=pedido, menu_id=menu_id, cantidad=cantidad))
+                aportacion += calcular_aportacion(
+                    catalogo['menus'][menu_id], catalogo['pesos_menu'].get(menu_id, ()), cantidad)
+
+            calcular_consumo(productos, menus, catalogo['composicion_menus'], consumo)
+
+            delta = deltas[fecha_resumen(pedido.fecha_hora)]
+            delta['pedidos'] += 1
+            delta['ids'].append(pedido.pk)
+            delta['aportacion'] += aportacion
+            resultado.append({'id': pedido.pk, 'total': str(aportacion.ventas)})
+
+        PedidoProducto.objects.bulk_create(lineas_productos)
+        PedidoMenu.objects.bulk_create(lineas_menus)
+        descontar_existencias(consumo)
+
+        # Un único incremento del resumen y un único aviso al tablero por día afectado
+        for fecha, delta in deltas.items():
+            aplicar_delta(fecha, pedidos=delta['pedidos'], aportacion=delta['aportacion'])
+            publicar_cambio_pedidos('creado', delta['ids'], fecha)
+
+    return resultado, None
@@ -0,0 +1,131 @@
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+import threading
+import time
+
+from django.conf import settings
+
+# Límites de los histogramas (acumulados al exportar, como los de Prometheus)
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+LIMITES_BYTES = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+UMBRAL_LENTO_MS_POR_DEFECTO = 500
+
+
+def umbral_lento_ms():
+    return getattr(settings, 'METRICAS_UMBRAL_LENTO_MS', UMBRAL_LENTO_MS_POR_DEFECTO)
+
+
+# Histograma de límites fijos: sumar una muestra es una búsqueda binaria y un incremento
+class Histograma:
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.conteo = [0] * (len(limites) + 1)  # El último cubo es +Inf
+        self.suma = 0
+        self.total = 0
+
+    def sumar(self, valor):
+        self.conteo[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    # [(límite, muestras <= límite)] terminando en '+Inf'
+    def acumulado(self):
+        acumulado, filas = 0, []
+        for limite, conteo in zip(self.limites + ('+Inf',), self.conteo):
+            acumulado += conteo
+            filas.append((limite, acumulado))
+        return filas
+
+
+# Métricas de una vista (nombre de URL resuelto)
+class MetricasVista:
+
+    def __init__(self):
+        self.peticiones = defaultdict(int)  # (método, estado) -> peticiones
+        self.segundos = Histograma(LIMITES_SEGUNDOS)
+        self.segundos_bd = Histograma(LIMITES_SEGUNDOS)
+        self.consultas = Histograma(LIMITES_CONSULTAS)
+        self.bytes = Histograma(LIMITES_BYTES)
+
+
+# Métricas del proceso. Cada worker tiene las suyas: Prometheus las suma al consultar cada instancia
+class RegistroMetricas:
+
+    def __init__(self):
+        self.bloqueo = threading.Lock()
+        self.vistas = defaultdict(MetricasVista)
+
+    def registrar(self, vista, metodo, estado, segundos, segundos_bd, consultas, tamano):
+        with self.bloqueo:
+            metricas = self.vistas[vista]
+            metricas.peticiones[(metodo, estado)] += 1
+            metricas.segundos.sumar(segundos)
+            metricas.segundos_bd.sumar(segundos_bd)
+            metricas.consultas.sumar(consultas)
+            metricas.bytes.sumar(tamano)
+
+    def reiniciar(self):
+        with self.bloqueo:
+            self.vistas.clear()
+
+    # Formato de texto de Prometheus (versión 0.0.4)
+    def como_prometheus(self):
+        with self.bloqueo:
+            vistas = sorted(self.vistas.items())
+            lineas = ['# HELP pettisso_peticiones_total Peticiones atendidas por vista, método y estado.',
+                      '# TYPE pettisso_peticiones_total counter']
+            for vista, metricas in vistas:
+                for (metodo, estado), total in sorted(metricas.peticiones.items()):
+                    lineas.append(f'pettisso_peticiones_total{{vista="{_escapar(vista)}",metodo="{metodo}",'
+                                  f'estado="{estado}"}} {total}')
+
+            for nombre, atributo, ayuda in (
+                    ('pettisso_peticion_segundos', 'segundos', 'Duración total de la petición.'),
+                    ('pettisso_bd_segundos', 'segundos_bd', 'Tiempo de la petición dentro de la base de datos.'),
+                    ('pettisso_consultas', 'consultas', 'Consultas SQL por petición.'),
+                    ('pettisso_respuesta_bytes', 'bytes', 'Tamaño del cuerpo de la respuesta.')):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram']
+                for vista, metricas in vistas:
+                    histograma = getattr(metricas, atributo)
+                    etiqueta = f'vista="{_escapar(vista)}"'
+                    for limite, acumulado in histograma.acumulado():
+                        lineas.append(f'{nombre}_bucket{{{etiqueta},le="{limite}"}} {acumulado}')
+                    lineas.append(f'{nombre}_sum{{{etiqueta}}} {histograma.suma:g}')
+                    lineas.append(f'{nombre}_count{{{etiqueta}}} {histograma.total}')
+        return '\n'.join(lineas) + '\n'
+
+
+# Consultas de la petición en curso y tiempo que pasan en la base de datos. MetricasMiddleware lo guarda en una
+# variable de contexto, que también ven las vistas síncronas que Django ejecuta en otro hilo cuando se sirve por ASGI
+class MedidorConsultas:
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+
+medidor_peticion = ContextVar('medidor_peticion', default=None)
+
+
+# execute_wrapper de todas las conexiones (base/signals.py): suma cada consulta al medidor de la petición, si lo hay
+def medir_consulta(execute, sql, params, many, context):
+    medidor = medidor_peticion.get()
+    if medidor is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medidor.segundos += time.perf_counter() - inicio
+        medidor.consultas += 1
+
+
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registro = RegistroMetricas()
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.timezone import make_aware
+
+
+def tamano_pagina():
+    return getattr(settings, 'CARNICERIA_TAMANO_PAGINA', 50)
+
+
+# Rango de fechas de las listas: el del filtro o, si falta o no es válido, la semana actual.
+# Devuelve también las fechas en texto para el formulario
+def rango_fechas_lista(fecha_inicio_str, fecha_fin_str):
+    if fecha_inicio_str and fecha_fin_str:
+        try:
+            fecha_inicio = make_aware(datetime.strptime(fecha_inicio_str, '%Y-%m-%d'))
+            fecha_fin = make_aware(datetime.strptime(fecha_fin_str, '%Y-%m-%d')) + timedelta(days=1) - timedelta(seconds=1)
+            return fecha_inicio, fecha_fin, fecha_inicio_str, fecha_fin_str
+        except ValueError:
+            pass
+
+    hoy = datetime.now().date()
+    lunes = hoy - timedelta(days=hoy.weekday())  # Lunes de esta semana
+    domingo = lunes + timedelta(days=6)  # Domingo de esta semana
+    fecha_inicio = make_aware(datetime.combine(lunes, datetime.min.time()))
+    fecha_fin = make_aware(datetime.combine(domingo, datetime.max.time()))
+    return fecha_inicio, fecha_fin, fecha_inicio.strftime('%Y-%m-%d'), fecha_fin.strftime('%Y-%m-%d')
+
+
+# El cursor guarda los valores (campo, id) de la última fila servida, en base64 para ir en la URL
+def codificar_cursor(fila, campo):
+    valores = [getattr(fila, campo), fila.pk]
+    texto = json.dumps([valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in valores])
+    return base64.urlsafe_b64encode(texto.encode()).decode()
+
+
+def decodificar_cursor(consulta, campo, cursor):
+    try:
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return consulta.model._meta.get_field(campo).to_python(valor), int(pk)
+    except (ValueError, TypeError, ValidationError):
+        raise ValueError('Cursor no válido.')
+
+
+# Paginación por clave (keyset) sobre (campo, id): cada página continúa donde acabó la anterior
+# con un WHERE sobre el índice, sin OFFSET ni contar filas, así que cuesta lo mismo en la primera y en la última.
+# Devuelve las filas de la página y el cursor de la siguiente (None si no hay más)
+def pagina_keyset(consulta, campo='fecha', cursor=None, tamano=None, descendente=True):
+    tamano = tamano or tamano_pagina()
+    signo, comparacion = ('-', 'lt') if descendente else ('', 'gt')
+    consulta = consulta.order_by(f'{signo}{campo}', f'{signo}id')
+
+    if cursor:
+        valor, pk = decodificar_cursor(consulta, campo, cursor)
+        consulta = consulta.filter(Q(**{f'{campo}__{comparacion}': valor}) | Q(**{campo: valor, f'id__{comparacion}': pk}))
+
+    # Una fila de más para saber si hay página siguiente
+    filas = list(consulta[:tamano + 1])
+    siguiente = codificar_cursor(filas[tamano - 1], campo) if len(filas) > tamano else None
+    return filas[:tamano], siguiente
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from base.models import Menu, PedidoMenu, PedidoProducto, Producto
+from base.services.intervalos_service import HistogramaIntervalos
+from base.services.inventario_service import calcular_consumo, cargar_composicion_menus, descontar_existencias
+from base.services.recuento_service import cargar_pesos_recuento, contadores_vacios
+from base.services.resumen_service import (
+    Aportacion, aplicar_delta, calcular_aportacion, fecha_resumen, lineas_en_bloque,
+)
+
+
+# Filtrar los pedidos de un día (fecha 'YYYY-MM-DD' o el día actual si no se indica)
+def filtrar_pedidos_dia(queryset, fecha=None):
+    if fecha:
+        fecha_inicio = timezone.make_aware(datetime.strptime(fecha, '%Y-%m-%d'))
+    else:
+        fecha_inicio = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    fecha_fin = fecha_inicio + timedelta(days=1) - timedelta(seconds=1)
+    return queryset.filter(fecha_hora__range=(fecha_inicio, fecha_fin))
+
+
+# Precargar las líneas de los pedidos con un número fijo de consultas:
+# pedidos + productos del pedido + menús del pedido
+def precargar_lineas(pedidos):
+    return pedidos.prefetch_related(
+        Prefetch('pedidoproducto_set', queryset=PedidoProducto.objects.select_related('producto')),
+        Prefetch('pedidomenu_set', queryset=PedidoMenu.objects.select_related('menu')),
+    )
+
+
+# Construir el tablero de pedidos del día (detalles, totales, recuentos e intervalos)
+def construir_tablero(pedidos):
+    pedidos = list(precargar_lineas(pedidos))
+
+    # Pesos de recuento precalculados para cada producto y menú
+    pesos_producto, pesos_menu = cargar_pesos_recuento()
+    contadores = contadores_vacios()
+    total_ventas = 0
+
+    # Intervalos de los turnos de servicio configurados
+    histograma = HistogramaIntervalos()
+
+    for pedido in pedidos:
+        total_precio = 0
+        pedido.detalles = []
+
+        # Sumar precios de productos
+        for detalle in pedido.pedidoproducto_set.all():
+            precio_detalle = detalle.cantidad * detalle.producto.precio
+            total_precio += precio_detalle
+            pedido.detalles.append({
+                'nombre': detalle.producto.nombre,
+                'cantidad': detalle.cantidad,
+                'precio': precio_detalle
+            })
+            for contador, peso in pesos_producto.get(detalle.producto_id, ()):
+                contadores[contador] += peso * detalle.cantidad
+
+        # Sumar precios de menús
+        for detalle in pedido.pedidomenu_set.all():
+            precio_detalle = detalle.cantidad * detalle.menu.precio
+            total_precio += precio_detalle
+            pedido.detalles.append({
+                'nombre': detalle.menu.nombre,
+                'cantidad': detalle.cantidad,
+                'precio': precio_detalle
+            })
+            for contador, peso in pesos_menu.get(detalle.menu_id, ()):
+                contadores[contador] += peso * detalle.cantidad
+
+        pedido.total_precio = total_precio
+        total_ventas += total_precio
+
+        # Contamos el pedido en su intervalo
+        hora_pedido = timezone.localtime(pedido.fecha_hora)
+        histograma.sumar(hora_pedido.hour, hora_pedido.minute)
+
+    tablero = {
+        'pedidos': pedidos,
+        'total_ventas': total_ventas,
+        'conteo_pedidos_por_intervalo': histograma.como_diccionario(),
+        'pedidos_fuera_de_turno': histograma.fuera_de_turno,
+    }
+    # Un total por contador: total_pollos, total_cachopos_ternera, ...
+    for contador, total in contadores.items():
+        tablero[f'total_{contador}'] = total
+    return tablero
+
+
+# Leer las líneas enviadas por el formulario (productos[i][producto], productos[i][cantidad], ...)
+# y devolver {id: cantidad}, sumando las cantidades si un mismo artículo aparece varias veces
+def leer_lineas(datos, prefijo, campo):
+    lineas = {}
+    i = 0
+    while True:
+        articulo_id = datos.get(f'{prefijo}[{i}][{campo}]')
+        cantidad = datos.get(f'{prefijo}[{i}][cantidad]')
+
+        if articulo_id is None or cantidad is None:
+            break  # Salir del bucle si no hay más líneas
+
+        if articulo_id and cantidad:
+            try:
+                articulo_id, cantidad = int(articulo_id), int(cantidad)
+            except (TypeError, ValueError):
+                raise ValidationError('Línea de pedido incorrecta.')
+            if cantidad < 1:
+                raise ValidationError('La cantidad debe ser al menos 1.')
+            lineas[articulo_id] = lineas.get(articulo_id, 0) + cantidad
+
+        i += 1  # Incrementar el índice para la próxima iteración
+    return lineas
+
+
+# Calcular las diferencias entre las líneas guardadas y las nuevas y aplicarlas en bloque.
+# Devuelve {id: diferencia de cantidad} para actualizar el resumen del día
+def _sincronizar_lineas(modelo, campo, pedido, lineas, cantidades):
+    existentes = {}
+    sobrantes = []
+    for linea in lineas:
+        articulo_id = getattr(linea, f'{campo}_id')
+        if articulo_id in existentes:
+            sobrantes.append(linea)  # Líneas repetidas de un mismo artículo
+        else:
+            existentes[articulo_id] = linea
+
+    diferencias = {}
+    nuevas, modificadas = [], []
+    for articulo_id, cantidad in cantidades.items():
+        linea = existentes.pop(articulo_id, None)
+        if linea is None:
+            nuevas.append(modelo(pedido=pedido, cantidad=cantidad, **{f'{campo}_id': articulo_id}))
+            diferencias[articulo_id] = cantidad
+        elif linea.cantidad != cantidad:
+            diferencias[articulo_id] = cantidad - linea.cantidad
+            linea.cantidad = cantidad
+            modificadas.append(linea)
+
+    borradas = sobrantes + list(existentes.values())
+    for linea in borradas:
+        articulo_id = getattr(linea, f'{campo}_id')
+        diferencias[articulo_id] = diferencias.get(articulo_id, 0) - linea.cantidad
+
+    if nuevas:
+        modelo.objects.bulk_create(nuevas)
+    if modificadas:
+        modelo.objects.bulk_update(modificadas, ['cantidad'])
+    if borradas:
+        modelo.objects.filter(pk__in=[linea.pk for linea in borradas]).delete()
+    return diferencias
+
+
+# Guardar las líneas de un pedido en una transacción: validación con in_bulk, diferencias con las
+# líneas existentes, un único incremento del resumen del día y un único ajuste de existencias
+def guardar_lineas(pedido, productos, menus, creado=False):
+    with transaction.atomic(), lineas_en_bloque():
+        # Un pedido recién creado no tiene líneas que comparar
+        lineas_productos = list(PedidoProducto.objects.filter(pedido=pedido)) if not creado else []
+        lineas_menus = list(PedidoMenu.objects.filter(pedido=pedido)) if not creado else []
+
+        catalogo_productos = Producto.objects.in_bulk(set(productos) | {linea.producto_id for linea in lineas_productos})
+        catalogo_menus = Menu.objects.in_bulk(set(menus) | {linea.menu_id for linea in lineas_menus})
+        if not set(productos) <= catalogo_productos.keys() or not set(menus) <= catalogo_menus.keys():
+            raise ValidationError('El pedido contiene productos o menús que no existen.')
+
+        diferencias_productos = _sincronizar_lineas(PedidoProducto, 'producto', pedido, lineas_productos, productos)
+        diferencias_menus = _sincronizar_lineas(PedidoMenu, 'menu', pedido, lineas_menus, menus)
+
+        # Incremento del resumen del día con los precios y pesos ya cargados
+        pesos_producto, pesos_menu = cargar_pesos_recuento()
+        aportacion = Aportacion()
+        for producto_id, diferencia in diferencias_productos.items():
+            aportacion += calcular_aportacion(catalogo_productos[producto_id].precio, pesos_producto[producto_id], diferencia)
+        for menu_id, diferencia in diferencias_menus.items():
+            aportacion += calcular_aportacion(catalogo_menus[menu_id].precio, pesos_menu[menu_id], diferencia)
+        aplicar_delta(fecha_resumen(pedido.fecha_hora), aportacion=aportacion)
+
+        # Existencias: solo se ajusta lo que cambia, con los menús expandidos por sus productos
+        composicion = cargar_composicion_menus(diferencias_menus) if diferencias_menus else {}
+        descontar_existencias(calcular_consumo(diferencias_productos, diferencias_menus, composicion))
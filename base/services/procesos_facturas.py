@@ -0,0 +1,15 @@
+# Funciones que ejecutan los procesos del exportador de facturas. Los procesos nuevos ('spawn') importan
+# este módulo antes de preparar Django, así que no puede importar modelos al cargarse
+
+
+def iniciar_proceso():
+    import django
+    django.setup()
+
+
+def renderizar_factura(factura_id, directorio):
+    from base.models import Factura
+    from base.services.facturas_pdf_service import pdf_factura
+
+    factura = Factura.objects.select_related('cliente').get(pk=factura_id)
+    return factura_id, str(pdf_factura(factura, list(factura.facturaproducto_set.all()), directorio))
@@ -0,0 +1,46 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from base.models import CONTADORES, Menu, MenuProducto, PesoRecuento, Producto
+
+
+# Reconstruir la tabla de pesos a partir del catálogo (productos, menús y productos de cada menú)
+def reconstruir_pesos_recuento():
+    pesos = []
+
+    # Productos vendidos sueltos
+    for producto_id, contador, peso in Producto.objects.exclude(contador='').values_list('id', 'contador', 'peso_contador'):
+        pesos.append(PesoRecuento(producto_id=producto_id, contador=contador, peso=peso))
+
+    # Menús: su contador propio más el de sus productos multiplicado por la cantidad en el menú
+    pesos_menu = defaultdict(Decimal)
+    for menu_id, contador, peso in Menu.objects.exclude(contador='').values_list('id', 'contador', 'peso_contador'):
+        pesos_menu[(menu_id, contador)] += peso
+    menu_productos = MenuProducto.objects.exclude(producto__contador='').values_list(
+        'menu_id', 'producto__contador', 'producto__peso_contador', 'cantidad')
+    for menu_id, contador, peso, cantidad in menu_productos:
+        pesos_menu[(menu_id, contador)] += peso * cantidad
+    for (menu_id, contador), peso in pesos_menu.items():
+        pesos.append(PesoRecuento(menu_id=menu_id, contador=contador, peso=peso))
+
+    with transaction.atomic():
+        PesoRecuento.objects.all().delete()
+        PesoRecuento.objects.bulk_create(pesos)
+
+
+# Cargar los pesos en dos diccionarios {id: [(contador, peso), ...]} para productos y menús
+def cargar_pesos_recuento():
+    pesos_producto = defaultdict(list)
+    pesos_menu = defaultdict(list)
+    for producto_id, menu_id, contador, peso in PesoRecuento.objects.values_list('producto_id', 'menu_id', 'contador', 'peso'):
+        if producto_id:
+            pesos_producto[producto_id].append((contador, peso))
+        else:
+            pesos_menu[menu_id].append((contador, peso))
+    return pesos_producto, pesos_menu
+
+
+# Contadores a cero para todos los tipos definidos
+def contadores_vacios():
+    return {contador: Decimal('0.00') for contador, _ in CONTADORES}
@@ -0,0 +1,235 @@
+from functools import lru_cache
+import io
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.formats import date_format
+from PIL import Image, ImageDraw, ImageFont
+import pdfkit
+
+
+# Renderizadores del PDF de las facturas. Todos reciben la factura y sus líneas y devuelven los bytes del PDF.
+# Se elige con FACTURAS_PDF_RENDERIZADOR ('wkhtmltopdf', el de referencia, o 'pillow' como alternativa de emergencia)
+
+# wkhtmltopdf: HTML de la plantilla de impresión convertido por el ejecutable externo (un proceso por factura)
+class RenderizadorWkhtmltopdf:
+    nombre = 'wkhtmltopdf'
+
+    # Configuración de pdfkit
+    opciones = {
+        'page-size': 'A4',
+        'margin-top': '0mm',
+        'margin-right': '0mm',
+        'margin-bottom': '0mm',
+        'margin-left': '0mm',
+        'encoding': 'UTF-8',
+        'enable-local-file-access': None,  # Habilitar acceso a archivos locales
+    }
+
+    def renderizar(self, factura, productos):
+        from base.services.facturas_pdf_service import html_impresion_factura
+        # Con PDFKIT_WKHTMLTOPDF vacío pdfkit busca wkhtmltopdf en el PATH
+        configuracion = pdfkit.configuration(wkhtmltopdf=getattr(settings, 'PDFKIT_WKHTMLTOPDF', ''))
+        return pdfkit.from_string(html_impresion_factura(factura, productos), False,
+                                  options=self.opciones, configuration=configuracion)
+
+
+# Pillow: último recurso cuando no se puede usar wkhtmltopdf. La factura se dibuja en páginas A4 dentro del proceso,
+# sin HTML ni procesos externos, pero el PDF es una imagen rasterizada a 150 ppp: el texto no se puede seleccionar
+# ni buscar e imita la plantilla de impresión en lugar de usarla (los cambios de la plantilla no le llegan)
+class RenderizadorPillow:
+    nombre = 'pillow'
+
+    # A4 a 150 ppp
+    ancho, alto = 1240, 1754
+    margen = 70
+    # Colores de facturas.css
+    oscuro = '#1a0e06'
+    claro = '#c7b59d'
+    fondo = '#f1ede7'
+    texto = '#291d0d'
+    # Anchos de las columnas de la tabla (como en la plantilla)
+    columnas = (
+        ('Descripción', 0.25), ('Cantidad', 0.15), ('Precio (€)', 0.15),
+        ('Total Neto (€)', 0.15), ('IVA (€)', 0.15), ('Importe Total (€)', 0.15),
+    )
+    alto_fila = 48
+
+    def renderizar(self, factura, productos):
+        paginas = [self._pagina_nueva()]
+        dibujo = ImageDraw.Draw(paginas[0])
+        y = self._cabecera(paginas[0], dibujo, factura)
+        y = self._cabecera_tabla(dibujo, y)
+
+        for producto in productos:
+            valores = [str(valor) for valor in (producto.descripcion, producto.cantidad, producto.precio_kg,
+                                                producto.total_neto, producto.iva, producto.total)]
+            if y + self._alto_fila(dibujo, valores, _fuente(20)) > self.alto - self.margen:
+                paginas.append(self._pagina_nueva())
+                dibujo = ImageDraw.Draw(paginas[-1])
+                y = self._cabecera_tabla(dibujo, self.margen)
+            y = self._fila(dibujo, y, valores, _fuente(20))
+
+        # Totales a la derecha bajo la tabla (tres filas y la línea gruesa de separación)
+        if y + 3 * self.alto_fila + 20 > self.alto - self.margen:
+            paginas.append(self._pagina_nueva())
+            dibujo = ImageDraw.Draw(paginas[-1])
+            y = self.margen
+        dibujo.line((self.margen, y + 2, self.ancho - self.margen, y + 2), fill=self.claro, width=5)
+        y += 8
+        x_importe = self.ancho - self.margen - 12
+        totales = (('Total Neto:', factura.total_neto, 22), ('IVA (10%):', factura.total_iva, 22),
+                   ('Total a Pagar:', factura.total, 28))
+        for etiqueta, importe, tamaño in totales:
+            fuente = _fuente(tamaño, negrita=True)
+            centro = y + self.alto_fila // 2
+            importe = f'{importe} €'
+            dibujo.text((x_importe, centro), importe, font=fuente, fill=self.texto, anchor='rm')
+            dibujo.text((x_importe - dibujo.textlength(importe, font=fuente) - 16, centro), etiqueta,
+                        font=fuente, fill=self.texto, anchor='rm')
+            y += self.alto_fila
+
+        salida = io.BytesIO()
+        paginas[0].save(salida, 'PDF', resolution=150, save_all=True, append_images=paginas[1:], quality=90)
+        return salida.getvalue()
+
+    def _pagina_nueva(self):
+        return Image.new('RGB', (self.ancho, self.alto), 'white')
+
+    def _cabecera(self, pagina, dibujo, factura):
+        ancho_util = self.ancho - 2 * self.margen
+        x0, x1 = self.margen, self.ancho - self.margen
+
+        # Título
+        dibujo.rectangle((x0, self.margen, x1, self.margen + 100), fill=self.oscuro)
+        dibujo.text((self.ancho // 2, self.margen + 50), f'Factura: {factura.numero_factura}',
+                    font=_fuente(40, negrita=True), fill='white', anchor='mm')
+
+        # Datos de contacto, logo y fechas
+        y = self.margen + 100
+        dibujo.rectangle((x0, y, x1, y + 260), fill=self.claro)
+        columna = ancho_util // 3
+        self._bloque(dibujo, x0 + 20, y + 25, 'Datos de contacto', (
+            ('Nombre:', factura.nombre_emisor), ('Teléfono:', factura.telefono_empresa), ('Email:', factura.email_empresa)))
+        logo = _logo(columna - 40, 220)
+        if logo is not None:
+            pagina.paste(logo, (x0 + columna + (columna - logo.width) // 2, y + (260 - logo.height) // 2), logo)
+        x_fechas = x0 + 2 * columna + columna // 2
+        for i, (titulo, fecha) in enumerate((('Fecha de Emisión:', factura.fecha_emision),
+                                             ('Fecha de Entrega:', factura.fecha_entrega))):
+            dibujo.text((x_fechas, y + 55 + i * 100), titulo, font=_fuente(24, negrita=True), fill=self.texto, anchor='mm')
+            dibujo.text((x_fechas, y + 95 + i * 100), date_format(fecha), font=_fuente(22), fill=self.texto, anchor='mm')
+
+        # Emisor y receptor
+        y += 260
+        dibujo.rectangle((x0, y, x1, y + 230), fill=self.fondo)
+        dibujo.line((x0 + ancho_util // 2, y + 20, x0 + ancho_util // 2, y + 210), fill=self.claro, width=2)
+        cliente = factura.cliente
+        self._bloque(dibujo, x0 + 30, y + 25, 'Emisor:', (
+            ('Nombre:', factura.nombre_emisor), ('Direccion:', factura.direccion_emisor), ('CIF/NIF:', factura.cif_nif_emisor)))
+        self._bloque(dibujo, x0 + ancho_util // 2 + 30, y + 25, 'Receptor:', (
+            ('Nombre:', cliente.nombre), ('Direccion:', cliente.direccion), ('CIF/NIF:', cliente.cif_dni)))
+        return y + 250
+
+    def _bloque(self, dibujo, x, y, titulo, lineas):
+        ancho_maximo = (self.ancho - 2 * self.margen) // 2 - 60
+        dibujo.text((x, y), titulo, font=_fuente(24, negrita=True), fill=self.texto)
+        for i, (etiqueta, valor) in enumerate(lineas):
+            fila = y + 50 + i * 45
+            negrita = _fuente(20, negrita=True)
+            dibujo.text((x, fila), etiqueta, font=negrita, fill=self.texto)
+            x_valor = x + dibujo.textlength(etiqueta, font=negrita) + 8
+            dibujo.text((x_valor, fila), _recortar(dibujo, str(valor), _fuente(20), ancho_maximo - (x_valor - x)),
+                        font=_fuente(20), fill=self.texto)
+
+    def _cabecera_tabla(self, dibujo, y):
+        titulos = [titulo for titulo, _ in self.columnas]
+        fuente = _fuente(20, negrita=True)
+        dibujo.rectangle((self.margen, y, self.ancho - self.margen, y + self._alto_fila(dibujo, titulos, fuente)),
+                         fill=self.claro)
+        return self._fila(dibujo, y, titulos, fuente)
+
+    def _celdas(self, dibujo, valores, fuente):
+        ancho_util = self.ancho - 2 * self.margen
+        return [_partir(dibujo, valor, fuente, int(ancho_util * proporcion) - 24)
+                for valor, (_, proporcion) in zip(valores, self.columnas)]
+
+    def _alto_fila(self, dibujo, valores, fuente):
+        return self._alto_celdas(self._celdas(dibujo, valores, fuente), fuente)
+
+    def _alto_celdas(self, celdas, fuente):
+        return max(self.alto_fila, max(len(lineas) for lineas in celdas) * (fuente.size + 8) + 20)
+
+    # Dibujar una fila de la tabla (el texto largo ocupa varias líneas, como en el HTML). Devuelve la y siguiente
+    def _fila(self, dibujo, y, valores, fuente):
+        celdas = self._celdas(dibujo, valores, fuente)
+        alto = self._alto_celdas(celdas, fuente)
+        x = self.margen
+        for lineas, (_, proporcion) in zip(celdas, self.columnas):
+            ancho = int((self.ancho - 2 * self.margen) * proporcion)
+            dibujo.rectangle((x, y, x + ancho, y + alto), outline=self.claro, width=1)
+            dibujo.multiline_text((x + 12, y + alto // 2), '\n'.join(lineas), font=fuente, fill=self.texto,
+                                  anchor='lm', spacing=8)
+            x += ancho
+        return y + alto
+
+
+# Fuente TrueType (FACTURAS_PDF_FUENTE o DejaVu Sans) o la de Pillow si no hay ninguna instalada
+@lru_cache(maxsize=None)
+def _fuente(tamaño, negrita=False):
+    candidatas = [getattr(settings, 'FACTURAS_PDF_FUENTE_NEGRITA' if negrita else 'FACTURAS_PDF_FUENTE', None),
+                  'DejaVuSans-Bold.ttf' if negrita else 'DejaVuSans.ttf',
+                  'arialbd.ttf' if negrita else 'arial.ttf']
+    for candidata in filter(None, candidatas):
+        try:
+            return ImageFont.truetype(candidata, tamaño)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=tamaño)
+
+
+# Logo reducido una sola vez por proceso
+@lru_cache(maxsize=None)
+def _logo(ancho, alto):
+    from base.services.facturas_pdf_service import LOGO_FACTURA, ruta_estatico
+    try:
+        logo = Image.open(ruta_estatico(LOGO_FACTURA)).convert('RGBA')
+    except FileNotFoundError:
+        return None
+    logo.thumbnail((ancho, alto))
+    return logo
+
+
+def _recortar(dibujo, texto, fuente, ancho):
+    if dibujo.textlength(texto, font=fuente) <= ancho:
+        return texto
+    while texto and dibujo.textlength(texto + '…', font=fuente) > ancho:
+        texto = texto[:-1]
+    return texto + '…'
+
+
+# Repartir un texto en líneas que quepan en el ancho (como mucho `maximo` líneas, la última recortada)
+def _partir(dibujo, texto, fuente, ancho, maximo=3):
+    lineas = []
+    for palabra in texto.split() or ['']:
+        if lineas and dibujo.textlength(f'{lineas[-1]} {palabra}', font=fuente) <= ancho:
+            lineas[-1] = f'{lineas[-1]} {palabra}'
+        else:
+            lineas.append(palabra)
+    if len(lineas) > maximo:
+        lineas = lineas[:maximo - 1] + [' '.join(lineas[maximo - 1:])]
+    return [_recortar(dibujo, linea, fuente, ancho) for linea in lineas]
+
+
+RENDERIZADORES = {
+    RenderizadorWkhtmltopdf.nombre: RenderizadorWkhtmltopdf,
+    RenderizadorPillow.nombre: RenderizadorPillow,
+}
+
+
+def obtener_renderizador(nombre=None):
+    nombre = nombre or getattr(settings, 'FACTURAS_PDF_RENDERIZADOR', RenderizadorWkhtmltopdf.nombre)
+    try:
+        return RENDERIZADORES[nombre]()
+    except KeyError:
+        raise ImproperlyConfigured(f'Renderizador de facturas desconocido: {nombre}. Opciones: {", ".join(RENDERIZADORES)}')
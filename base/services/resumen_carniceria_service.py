@@ -0,0 +1,81 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from base.models import Capital, FacturasIVA, FacturaTienda, GastosPersonales, GastosTienda, PagosBanco, ResumenCarniceria, Venta
+
+# Campo del resumen diario que alimenta cada modelo (el capital va a un campo por tipo de ingreso)
+CAMPOS_RESUMEN = {
+    Venta: 'ventas',
+    FacturasIVA: 'compras_iva',
+    FacturaTienda: 'compras_tienda',
+    GastosTienda: 'gastos_tienda',
+    GastosPersonales: 'gastos_personales',
+    PagosBanco: 'pagos_banco',
+}
+CAMPOS_CAPITAL = {tipo: f'capital_{tipo.lower()}' for tipo, _ in Capital.TIPOS_INGRESO}
+CAMPOS = [*CAMPOS_RESUMEN.values(), *CAMPOS_CAPITAL.values()]
+
+
+def campo_resumen(instancia, tipo_ingreso=None):
+    if isinstance(instancia, Capital):
+        return CAMPOS_CAPITAL.get(tipo_ingreso or instancia.tipo_ingreso)
+    return CAMPOS_RESUMEN[type(instancia)]
+
+
+# Sumar importes al resumen de un día ({campo: importe}) con un upsert atómico (UPDATE ... SET x = x + importe)
+def aplicar_delta_carniceria(fecha, importes):
+    importes = {campo: importe for campo, importe in importes.items() if campo and importe}
+    if not importes:
+        return
+
+    def actualizar():
+        return ResumenCarniceria.objects.filter(fecha=fecha).update(
+            **{campo: F(campo) + importe for campo, importe in importes.items()})
+
+    with transaction.atomic():
+        if actualizar():
+            return
+        try:
+            # Primer movimiento del día: crear la fila (si otro proceso se adelanta, se actualiza la suya)
+            with transaction.atomic():
+                ResumenCarniceria.objects.create(fecha=fecha, **importes)
+        except IntegrityError:
+            actualizar()
+
+
+# Recalcular desde cero los resúmenes de un rango de fechas con una consulta agrupada por día para cada tabla.
+# Las filas del rango se sustituyen enteras (los días sin movimientos desaparecen)
+def recalcular_resumen_carniceria(fecha_inicio=None, fecha_fin=None):
+    def filtrar(consulta):
+        if fecha_inicio:
+            consulta = consulta.filter(fecha__gte=fecha_inicio)
+        if fecha_fin:
+            consulta = consulta.filter(fecha__lte=fecha_fin)
+        return consulta.order_by()
+
+    resumenes = defaultdict(dict)
+    for modelo, campo in CAMPOS_RESUMEN.items():
+        for fila in filtrar(modelo.objects).values('fecha').annotate(suma=Sum('total')):
+            resumenes[fila['fecha']][campo] = fila['suma'] or Decimal('0.00')
+    for fila in filtrar(Capital.objects).values('fecha', 'tipo_ingreso').annotate(suma=Sum('total')):
+        campo = CAMPOS_CAPITAL.get(fila['tipo_ingreso'])
+        if campo:
+            resumenes[fila['fecha']][campo] = fila['suma'] or Decimal('0.00')
+
+    filas = [ResumenCarniceria(fecha=dia, **{campo: importes.get(campo, Decimal('0.00')) for campo in CAMPOS})
+             for dia, importes in resumenes.items()]
+    with transaction.atomic():
+        filtrar(ResumenCarniceria.objects).delete()
+        ResumenCarniceria.objects.bulk_create(filas, batch_size=500)
+    return len(filas)
+
+
+# Totales de capital de un rango desde el resumen diario (un aggregate): el capital sin tarjetas y las tarjetas
+def totales_capital(fecha_inicio, fecha_fin):
+    campos_sin_tarjetas = [campo for tipo, campo in CAMPOS_CAPITAL.items() if tipo != 'TA']
+    capital = sum((F(campo) for campo in campos_sin_tarjetas[1:]), F(campos_sin_tarjetas[0]))
+    totales = ResumenCarniceria.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).aggregate(
+        capital=Sum(capital), tarjetas=Sum(CAMPOS_CAPITAL['TA']))
+    return totales['capital'] or Decimal('0.00'), totales['tarjetas'] or Decimal('0.00')
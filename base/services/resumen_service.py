@@ -0,0 +1,200 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from base.models import Menu, Pedido, PedidoMenu, PedidoProducto, PesoRecuento, Producto, ResumenVentas
+from base.services.recuento_service import cargar_pesos_recuento
+
+# Contadores que suman al total de cachopos del resumen (el degustación se cuenta aparte en el tablero)
+CONTADORES_CACHOPOS = ('cachopos_ternera', 'cachopos_pollo', 'cachopos_lomo')
+
+
+# Aportación de una línea al resumen: ventas, pollos y cachopos
+class Aportacion:
+
+    def __init__(self, ventas=Decimal('0.00'), pollos=Decimal('0.00'), cachopos=Decimal('0.00')):
+        self.ventas = ventas
+        self.pollos = pollos
+        self.cachopos = cachopos
+
+    def __add__(self, otra):
+        return Aportacion(self.ventas + otra.ventas, self.pollos + otra.pollos, self.cachopos + otra.cachopos)
+
+    def __neg__(self):
+        return Aportacion(-self.ventas, -self.pollos, -self.cachopos)
+
+    def __sub__(self, otra):
+        return self + (-otra)
+
+
+# Las señales de las líneas no aplican incrementos mientras se guardan líneas en bloque:
+# quien las guarda calcula y aplica el incremento total una sola vez
+_estado = threading.local()
+
+
+@contextmanager
+def lineas_en_bloque():
+    _estado.en_bloque = True
+    try:
+        yield
+    finally:
+        _estado.en_bloque = False
+
+
+def guardando_en_bloque():
+    return getattr(_estado, 'en_bloque', False)
+
+
+def fecha_resumen(fecha_hora):
+    return timezone.localtime(fecha_hora).date()
+
+
+def calcular_aportacion(precio, pesos, cantidad):
+    aportacion = Aportacion(ventas=precio * cantidad)
+    for contador, peso in pesos:
+        if contador == 'pollos':
+            aportacion.pollos += peso * cantidad
+        elif contador in CONTADORES_CACHOPOS:
+            aportacion.cachopos += peso * cantidad
+    return aportacion
+
+
+def aportacion_producto(producto_id, cantidad):
+    if not producto_id or not cantidad:
+        return Aportacion()
+    precio = Producto.objects.filter(pk=producto_id).values_list('precio', flat=True).first() or Decimal('0.00')
+    pesos = PesoRecuento.objects.filter(producto_id=producto_id).values_list('contador', 'peso')
+    return calcular_aportacion(precio, pesos, cantidad)
+
+
+def aportacion_menu(menu_id, cantidad):
+    if not menu_id or not cantidad:
+        return Aportacion()
+    precio = Menu.objects.filter(pk=menu_id).values_list('precio', flat=True).first() or Decimal('0.00')
+    pesos = PesoRecuento.objects.filter(menu_id=menu_id).values_list('contador', 'peso')
+    return calcular_aportacion(precio, pesos, cantidad)
+
+
+# Aportación completa de un pedido (todas sus líneas) con un número fijo de consultas: las líneas con el precio
+# de su producto o menú y la tabla de pesos, sin consultas por línea
+def aportacion_pedido(pedido_id):
+    pesos_producto, pesos_menu = cargar_pesos_recuento()
+    aportacion = Aportacion()
+    lineas_producto = PedidoProducto.objects.filter(pedido_id=pedido_id).values_list(
+        'producto_id', 'producto__precio', 'cantidad')
+    for producto_id, precio, cantidad in lineas_producto:
+        aportacion += calcular_aportacion(precio, pesos_producto[producto_id], cantidad)
+    lineas_menu = PedidoMenu.objects.filter(pedido_id=pedido_id).values_list(
+        'menu_id', 'menu__precio', 'cantidad')
+    for menu_id, precio, cantidad in lineas_menu:
+        aportacion += calcular_aportacion(precio, pesos_menu[menu_id], cantidad)
+    return aportacion
+
+
+# Aplicar un incremento al resumen del día con un upsert atómico (UPDATE ... SET x = x + delta)
+def aplicar_delta(fecha, pedidos=0, aportacion=None):
+    aportacion = aportacion or Aportacion()
+    if not pedidos and not (aportacion.ventas or aportacion.pollos or aportacion.cachopos):
+        return
+
+    def actualizar():
+        return ResumenVentas.objects.filter(fecha=fecha).update(
+            numero_pedidos=F('numero_pedidos') + pedidos,
+            total_ventas=F('total_ventas') + aportacion.ventas,
+            total_pollos=F('total_pollos') + aportacion.pollos,
+            total_cachopos=F('total_cachopos') + aportacion.cachopos,
+        )
+
+    with transaction.atomic():
+        if actualizar():
+            return
+        try:
+            # Primera venta del día: crear la fila (si otro proceso se adelanta, se actualiza la suya)
+            with transaction.atomic():
+                ResumenVentas.objects.create(
+                    fecha=fecha,
+                    numero_pedidos=pedidos,
+                    total_ventas=aportacion.ventas,
+                    total_pollos=aportacion.pollos,
+                    total_cachopos=aportacion.cachopos,
+                )
+        except IntegrityError:
+            actualizar()
+
+
+# Recalcular desde cero los resúmenes de un rango de fechas con consultas agrupadas por día
+def recalcular_resumenes(fecha_inicio=None, fecha_fin=None):
+    pedidos = Pedido.objects.order_by()
+    if fecha_inicio:
+        pedidos = pedidos.filter(fecha_hora__date__gte=fecha_inicio)
+    if fecha_fin:
+        pedidos = pedidos.filter(fecha_hora__date__lte=fecha_fin)
+
+    resumenes = defaultdict(lambda: {'pedidos': 0, 'aportacion': Aportacion()})
+    for fila in pedidos.annotate(dia=TruncDate('fecha_hora')).values('dia').annotate(cantidad=Count('id')):
+        resumenes[fila['dia']]['pedidos'] = fila['cantidad']
+
+    # Catálogo (precios y pesos) cargado una sola vez
+    precios_producto = dict(Producto.objects.values_list('id', 'precio'))
+    precios_menu = dict(Menu.objects.values_list('id', 'precio'))
+    pesos_producto, pesos_menu = cargar_pesos_recuento()
+
+    lineas_producto = (PedidoProducto.objects.filter(pedido__in=pedidos)
+                       .annotate(dia=TruncDate('pedido__fecha_hora'))
+                       .values('dia', 'producto_id').annotate(cantidad=Sum('cantidad')))
+    for fila in lineas_producto:
+        resumenes[fila['dia']]['aportacion'] += calcular_aportacion(
+            precios_producto.get(fila['producto_id'], Decimal('0.00')), pesos_producto[fila['producto_id']], fila['cantidad'])
+
+    lineas_menu = (PedidoMenu.objects.filter(pedido__in=pedidos)
+                   .annotate(dia=TruncDate('pedido__fecha_hora'))
+                   .values('dia', 'menu_id').annotate(cantidad=Sum('cantidad')))
+    for fila in lineas_menu:
+        resumenes[fila['dia']]['aportacion'] += calcular_aportacion(
+            precios_menu.get(fila['menu_id'], Decimal('0.00')), pesos_menu[fila['menu_id']], fila['cantidad'])
+
+    filas = [
+        ResumenVentas(
+            fecha=dia,
+            numero_pedidos=datos['pedidos'],
+            total_ventas=datos['aportacion'].ventas,
+            total_pollos=datos['aportacion'].pollos,
+            total_cachopos=datos['aportacion'].cachopos,
+        )
+        for dia, datos in resumenes.items()
+    ]
+    # Días del rango que tienen resumen pero ya no tienen pedidos: se ponen a cero (la fila se conserva por el cierre)
+    sin_pedidos = ResumenVentas.objects.exclude(fecha__in=pedidos.annotate(dia=TruncDate('fecha_hora')).values('dia'))
+    if fecha_inicio:
+        sin_pedidos = sin_pedidos.filter(fecha__gte=fecha_inicio)
+    if fecha_fin:
+        sin_pedidos = sin_pedidos.filter(fecha__lte=fecha_fin)
+
+    with transaction.atomic():
+        ResumenVentas.objects.bulk_create(
+            filas,
+            update_conflicts=True,
+            unique_fields=['fecha'],
+            update_fields=['numero_pedidos', 'total_ventas', 'total_pollos', 'total_cachopos'],
+        )
+        vaciados = sin_pedidos.update(numero_pedidos=0, total_ventas=Decimal('0.00'), total_pollos=Decimal('0.00'),
+                                      total_cachopos=Decimal('0.00'))
+    return len(filas) + vaciados
+
+
+# Cierre del día: leer y bloquear la fila del resumen (O(1), sin datos enviados por el navegador)
+def cerrar_dia(fecha):
+    with transaction.atomic():
+        resumen = ResumenVentas.objects.select_for_update().filter(fecha=fecha).first()
+        if resumen is None:
+            resumen = ResumenVentas.objects.create(fecha=fecha)
+        ya_cerrado = resumen.cerrado
+        if not ya_cerrado:
+            resumen.cerrado = True
+            resumen.save(update_fields=['cerrado'])
+    return resumen, ya_cerrado
@@ -0,0 +1,250 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+from base.models import (
+    Capital, Cliente, Factura, FacturaProducto, Menu, MenuProducto, Pedido, PedidoMenu, PedidoProducto, Producto,
+)
+from base.services.eventos_service import publicar_cambio_pedidos
+from base.services.facturas_pdf_service import invalidar_pdf_factura
+from base.services.metricas_service import medir_consulta
+from base.services.inventario_service import (
+    calcular_consumo, cargar_composicion_menus, consumo_pedido, descontar_existencias,
+)
+from base.services.recuento_service import reconstruir_pesos_recuento
+from base.services.resumen_carniceria_service import CAMPOS_RESUMEN, aplicar_delta_carniceria, campo_resumen
+from base.services.resumen_service import (
+    aplicar_delta, aportacion_menu, aportacion_pedido, aportacion_producto, fecha_resumen, guardando_en_bloque,
+)
+
+
+# Mantener la tabla de pesos de recuento al día cuando cambia el catálogo.
+# Se reconstruye al confirmar la transacción para no interferir con los borrados en cascada
+@receiver([post_save, post_delete], sender=Producto)
+@receiver([post_save, post_delete], sender=Menu)
+@receiver([post_save, post_delete], sender=MenuProducto)
+def actualizar_pesos_recuento(sender, **kwargs):
+    if kwargs.get('raw'):
+        return  # No reconstruir al cargar fixtures
+    # Una sola reconstrucción por transacción aunque se guarden el menú y todas sus líneas: cada cambio encola la
+    # reconstrucción, pero solo la primera que se ejecuta al confirmar encuentra la marca de pendiente. Si se deshace
+    # un savepoint, Django descarta sus callbacks y los que sigan encolados fuera de él reconstruyen igualmente
+    connection.catalogo_pendiente = True
+    transaction.on_commit(catalogo_modificado)
+
+
+def catalogo_modificado():
+    if not getattr(connection, 'catalogo_pendiente', False):
+        return
+    connection.catalogo_pendiente = False
+    reconstruir_pesos_recuento()
+
+
+################ RESUMEN DE VENTAS E INVENTARIO ################
+# Pedidos que se están borrando: su aportación se descuenta entera en pre_delete
+# y las líneas borradas en cascada no deben descontarse otra vez
+_pedidos_borrandose = set()
+
+
+# Guardar los valores originales para calcular el incremento al guardar
+@receiver(post_init, sender=Pedido)
+def recordar_fecha_pedido(sender, instance, **kwargs):
+    # Se lee de __dict__ para no forzar una consulta si fecha_hora está diferida
+    fecha_hora = instance.__dict__.get('fecha_hora')
+    instance._fecha_resumen = fecha_resumen(fecha_hora) if instance.pk and fecha_hora else None
+    instance._entregado = instance.__dict__.get('entregado')
+
+
+@receiver(post_init, sender=PedidoProducto)
+@receiver(post_init, sender=PedidoMenu)
+def recordar_linea(sender, instance, **kwargs):
+    campo = 'producto_id' if sender is PedidoProducto else 'menu_id'
+    if instance.pk:
+        instance._linea_original = (instance.__dict__.get(campo), instance.__dict__.get('cantidad'))
+    else:
+        instance._linea_original = None
+
+
+@receiver(post_save, sender=Pedido)
+def resumen_pedido_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fecha = fecha_resumen(instance.fecha_hora)
+    if created:
+        aplicar_delta(fecha, pedidos=1)
+    elif instance._fecha_resumen and instance._fecha_resumen != fecha:
+        # El pedido cambia de día: mover su aportación de un resumen a otro
+        aportacion = aportacion_pedido(instance.pk)
+        aplicar_delta(instance._fecha_resumen, pedidos=-1, aportacion=-aportacion)
+        aplicar_delta(fecha, pedidos=1, aportacion=aportacion)
+    instance._fecha_resumen = fecha
+
+
+@receiver(pre_delete, sender=Pedido)
+def resumen_pedido_borrandose(sender, instance, **kwargs):
+    _pedidos_borrandose.add(instance.pk)
+    aplicar_delta(fecha_resumen(instance.fecha_hora), pedidos=-1, aportacion=-aportacion_pedido(instance.pk))
+    # Devolver a las existencias todo lo que consumía el pedido
+    descontar_existencias({producto_id: -cantidad for producto_id, cantidad in consumo_pedido(instance.pk).items()})
+
+
+@receiver(post_delete, sender=Pedido)
+def resumen_pedido_borrado(sender, instance, **kwargs):
+    _pedidos_borrandose.discard(instance.pk)
+
+
+def _aportacion_linea(sender, articulo_id, cantidad):
+    if sender is PedidoProducto:
+        return aportacion_producto(articulo_id, cantidad)
+    return aportacion_menu(articulo_id, cantidad)
+
+
+# Ajustar las existencias con la diferencia de cantidades de una línea ({id: diferencia})
+def _ajustar_existencias_linea(sender, diferencias):
+    if sender is PedidoProducto:
+        descontar_existencias(calcular_consumo(diferencias, {}, {}))
+    else:
+        descontar_existencias(calcular_consumo({}, diferencias, cargar_composicion_menus(diferencias)))
+
+
+@receiver(post_save, sender=PedidoProducto)
+@receiver(post_save, sender=PedidoMenu)
+def resumen_linea_guardada(sender, instance, raw=False, **kwargs):
+    if raw or guardando_en_bloque():
+        return
+    articulo_id = instance.producto_id if sender is PedidoProducto else instance.menu_id
+    aportacion = _aportacion_linea(sender, articulo_id, instance.cantidad)
+    diferencias = {articulo_id: instance.cantidad}
+    if instance._linea_original:
+        aportacion -= _aportacion_linea(sender, *instance._linea_original)
+        articulo_original, cantidad_original = instance._linea_original
+        diferencias[articulo_original] = diferencias.get(articulo_original, 0) - cantidad_original
+    aplicar_delta(fecha_resumen(instance.pedido.fecha_hora), aportacion=aportacion)
+    _ajustar_existencias_linea(sender, diferencias)
+    instance._linea_original = (articulo_id, instance.cantidad)
+
+
+@receiver(post_delete, sender=PedidoProducto)
+@receiver(post_delete, sender=PedidoMenu)
+def resumen_linea_borrada(sender, instance, **kwargs):
+    if instance.pedido_id in _pedidos_borrandose or not instance._linea_original or guardando_en_bloque():
+        return
+    aportacion = _aportacion_linea(sender, *instance._linea_original)
+    aplicar_delta(fecha_resumen(instance.pedido.fecha_hora), aportacion=-aportacion)
+    articulo_id, cantidad = instance._linea_original
+    _ajustar_existencias_linea(sender, {articulo_id: -cantidad})
+
+
+################ TABLERO EN VIVO ################
+# Avisar a las pantallas conectadas (ver TableroEventosView) de los cambios en los pedidos
+@receiver(post_save, sender=Pedido)
+def evento_pedido_guardado(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    fecha = fecha_resumen(instance.fecha_hora)
+    if created:
+        publicar_cambio_pedidos('creado', [instance.pk], fecha)
+    elif instance._entregado is not None and instance._entregado != instance.entregado:
+        publicar_cambio_pedidos('entregado', [instance.pk], fecha, entregado=instance.entregado)
+    else:
+        publicar_cambio_pedidos('actualizado', [instance.pk], fecha)
+    instance._entregado = instance.entregado
+
+
+@receiver(post_delete, sender=Pedido)
+def evento_pedido_borrado(sender, instance, **kwargs):
+    publicar_cambio_pedidos('eliminado', [instance.pk], fecha_resumen(instance.fecha_hora))
+
+
+@receiver(post_save, sender=PedidoProducto)
+@receiver(post_save, sender=PedidoMenu)
+@receiver(post_delete, sender=PedidoProducto)
+@receiver(post_delete, sender=PedidoMenu)
+def evento_linea_cambiada(sender, instance, raw=False, **kwargs):
+    # Las líneas guardadas en bloque van acompañadas del guardado del pedido, que ya avisa
+    if raw or guardando_en_bloque() or instance.pedido_id in _pedidos_borrandose:
+        return
+    publicar_cambio_pedidos('actualizado', [instance.pedido_id], fecha_resumen(instance.pedido.fecha_hora))
+
+
+################ FACTURAS ################
+# Borrar los PDFs cacheados cuando cambia lo que aparece en ellos
+@receiver([post_save, post_delete], sender=Factura)
+def invalidar_pdf_por_factura(sender, instance, **kwargs):
+    invalidar_pdf_factura(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=FacturaProducto)
+def invalidar_pdf_por_linea(sender, instance, **kwargs):
+    invalidar_pdf_factura(instance.factura_id)
+
+
+@receiver(post_save, sender=Cliente)
+def invalidar_pdf_por_cliente(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for factura_id in Factura.objects.filter(cliente=instance).values_list('id', flat=True):
+        invalidar_pdf_factura(factura_id)
+
+
+################ RESUMEN DE LA CARNICERÍA ################
+# Modelos que suman en el resumen diario de la carnicería
+MODELOS_RESUMEN_CARNICERIA = [*CAMPOS_RESUMEN, Capital]
+
+
+# Guardar la fecha, el importe y el tipo originales para mover el importe si cambian
+def recordar_movimiento(sender, instance, **kwargs):
+    if instance.pk:
+        instance._movimiento_original = (instance.__dict__.get('fecha'), instance.__dict__.get('total'),
+                                         instance.__dict__.get('tipo_ingreso'))
+    else:
+        instance._movimiento_original = None
+
+
+def resumen_movimiento_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    fecha, total, campo = instance.fecha, Decimal(str(instance.total)), campo_resumen(instance)
+    original = getattr(instance, '_movimiento_original', None)
+    if original and original[0] and original[1] is not None:
+        fecha_original, total_original, tipo_original = original
+        campo_original = campo_resumen(instance, tipo_original)
+        if (str(fecha_original), campo_original) == (str(fecha), campo):
+            # Mismo día y concepto: sumar solo la diferencia
+            total -= total_original
+        else:
+            aplicar_delta_carniceria(fecha_original, {campo_original: -total_original})
+    aplicar_delta_carniceria(fecha, {campo: total})
+    instance._movimiento_original = (instance.fecha, Decimal(str(instance.total)), getattr(instance, 'tipo_ingreso', None))
+
+
+def resumen_movimiento_borrado(sender, instance, **kwargs):
+    aplicar_delta_carniceria(instance.fecha, {campo_resumen(instance): -Decimal(str(instance.total))})
+
+
+for modelo in MODELOS_RESUMEN_CARNICERIA:
+    post_init.connect(recordar_movimiento, sender=modelo, dispatch_uid=f'recordar_movimiento_{modelo.__name__}')
+    post_save.connect(resumen_movimiento_guardado, sender=modelo, dispatch_uid=f'resumen_guardado_{modelo.__name__}')
+    post_delete.connect(resumen_movimiento_borrado, sender=modelo, dispatch_uid=f'resumen_borrado_{modelo.__name__}')
+
+
+################ CONEXIONES A LA BASE DE DATOS ################
+# Ajustar cada conexión SQLite nueva con los PRAGMAs de SQLITE_PRAGMAS (WAL, busy_timeout, synchronous, mmap).
+# Con CONN_MAX_AGE la conexión se reutiliza entre peticiones, así que se ejecutan una vez por conexión y no por petición
+# Medir las consultas de cada petición (MetricasMiddleware) en cualquier conexión, también en las de los hilos en
+# los que Django ejecuta las vistas síncronas cuando se sirve por ASGI
+@receiver(connection_created, dispatch_uid='medir_consultas')
+def medir_consultas_conexion(sender, connection, **kwargs):
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+@receiver(connection_created, dispatch_uid='pragmas_sqlite')
+def configurar_conexion_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for pragma, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f'PRAGMA {pragma} = {valor}')
@@ -0,0 +1,80 @@
+// Autocompletado de clientes: al escribir se piden a la vista de búsqueda los primeros clientes que coinciden
+// y al elegir uno se guarda su id en el campo oculto del formulario
+document.querySelectorAll('.busqueda-cliente:not([data-iniciado])').forEach(function (contenedor) {
+    contenedor.dataset.iniciado = 'true';
+    const campoId = contenedor.querySelector('.busqueda-cliente-id');
+    const campoTexto = contenedor.querySelector('.busqueda-cliente-texto');
+    const resultados = contenedor.querySelector('.busqueda-cliente-resultados');
+    let espera = null;
+    let peticion = null;
+
+    function elegir(cliente) {
+        campoId.value = cliente.id;
+        campoTexto.value = `${cliente.codigo} - ${cliente.nombre}`;
+        resultados.hidden = true;
+    }
+
+    function mostrar(clientes) {
+        resultados.innerHTML = '';
+        clientes.forEach(function (cliente) {
+            const opcion = document.createElement('li');
+            opcion.textContent = `${cliente.codigo} - ${cliente.nombre} (${cliente.cif_dni})`;
+            opcion.addEventListener('mousedown', function (event) {
+                event.preventDefault();  // Que el campo de texto no pierda el foco antes de elegir
+                elegir(cliente);
+            });
+            resultados.appendChild(opcion);
+        });
+        if (!clientes.length) {
+            const vacio = document.createElement('li');
+            vacio.textContent = 'No hay clientes que coincidan.';
+            vacio.className = 'sin-resultados';
+            resultados.appendChild(vacio);
+        }
+        resultados.hidden = false;
+    }
+
+    campoTexto.addEventListener('input', function () {
+        // El texto ya no corresponde al cliente elegido hasta que se elija otro
+        campoId.value = '';
+        clearTimeout(espera);
+        const texto = campoTexto.value.trim();
+        if (!texto) {
+            resultados.hidden = true;
+            return;
+        }
+
+        // Esperar a que se deje de escribir y cancelar la petición anterior para no mezclar respuestas
+        espera = setTimeout(function () {
+            if (peticion) {
+                peticion.abort();
+            }
+            peticion = new AbortController();
+            fetch(`${contenedor.dataset.url}?q=${encodeURIComponent(texto)}`, { signal: peticion.signal })
+                .then(response => response.json())
+                .then(data => {
+                    if (data.success) {
+                        mostrar(data.clientes);
+                    }
+                })
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Error al buscar clientes:', error);
+                    }
+                });
+        }, 200);
+    });
+
+    // Con Intro se elige el primer resultado en lugar de enviar el formulario
+    campoTexto.addEventListener('keydown', function (event) {
+        const primero = resultados.querySelector('li:not(.sin-resultados)');
+        if (event.key === 'Enter' && !resultados.hidden && primero) {
+            event.preventDefault();
+            primero.dispatchEvent(new MouseEvent('mousedown'));
+        }
+    });
+
+    campoTexto.addEventListener('blur', function () {
+        resultados.hidden = true;
+    });
+});
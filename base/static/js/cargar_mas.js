@@ -0,0 +1,31 @@
+// Botones "Cargar más" de las listas paginadas: piden la siguiente página de su tabla a la misma URL
+// (con los filtros actuales) y añaden las filas al final del cuerpo de la tabla
+document.addEventListener('click', function (event) {
+    const boton = event.target.closest('.cargar-mas');
+    if (!boton) {
+        return;
+    }
+
+    const tabla = boton.dataset.tabla;
+    const parametros = new URLSearchParams(window.location.search);
+    parametros.set('tabla', tabla);
+    parametros.set('cursor', boton.dataset.cursor);
+
+    boton.disabled = true;
+    fetch(`${window.location.pathname}?${parametros}`, { headers: { 'Accept': 'application/json' } })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            document.getElementById(`filas-${tabla}`).insertAdjacentHTML('beforeend', data.html);
+            boton.dataset.cursor = data.cursor || '';
+            boton.hidden = !data.cursor;
+        })
+        .catch(error => {
+            console.error('Error al cargar más filas:', error);
+        })
+        .finally(() => {
+            boton.disabled = false;
+        });
+});
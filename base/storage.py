@@ -0,0 +1,66 @@
+import gzip
+import io
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from PIL import Image
+
+try:
+    import brotli  # Opcional: sin él solo se generan las versiones .gz
+except ImportError:
+    brotli = None
+
+# Extensiones de texto que merece la pena comprimir (las imágenes ya van comprimidas)
+EXTENSIONES_COMPRIMIBLES = {'.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.xml', '.ico'}
+
+
+# Estáticos de producción: nombres con el hash del contenido (ManifestStaticFilesStorage), PNG optimizados con Pillow
+# antes de calcular el hash y copias .gz/.br de los ficheros de texto para servirlas ya comprimidas (base/middleware.py)
+class EstaticosComprimidosStorage(ManifestStaticFilesStorage):
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+
+        # Los PNG se optimizan en la copia sin hash para que el hash corresponda a la imagen final
+        for nombre in paths:
+            if nombre.lower().endswith('.png'):
+                self.optimizar_png(nombre)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        for nombre in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(nombre)[1].lower() in EXTENSIONES_COMPRIMIBLES:
+                for comprimido in self.comprimir(nombre):
+                    yield nombre, comprimido, True
+
+    # Reescribir el PNG con optimize=True solo si ocupa menos
+    def optimizar_png(self, nombre):
+        with self.open(nombre) as fichero:
+            original = fichero.read()
+        try:
+            with Image.open(io.BytesIO(original)) as imagen:
+                salida = io.BytesIO()
+                imagen.save(salida, format='PNG', optimize=True)
+        except (OSError, ValueError):
+            return  # PNG que Pillow no sabe leer: se deja como está
+        if len(salida.getvalue()) < len(original):
+            self.delete(nombre)
+            self._save(nombre, ContentFile(salida.getvalue()))
+
+    # Escribir <nombre>.gz y <nombre>.br junto al fichero si ahorran al menos un 5 %
+    def comprimir(self, nombre):
+        with self.open(nombre) as fichero:
+            contenido = fichero.read()
+
+        versiones = {'.gz': gzip.compress(contenido, compresslevel=9, mtime=0)}
+        if brotli:
+            versiones['.br'] = brotli.compress(contenido, quality=11)
+
+        for extension, comprimido in versiones.items():
+            if len(comprimido) < len(contenido) * 0.95:
+                if self.exists(nombre + extension):
+                    self.delete(nombre + extension)
+                self._save(nombre + extension, ContentFile(comprimido))
+                yield nombre + extension
@@ -1,3 +1,1558 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+import asyncio
+import gzip
+import io
+import json
+import random
+import re
+import tempfile
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from base.models import Capital, Cliente, ContadorFactura, Factura, FacturaProducto, FacturasIVA, FacturaTienda, Gasto, GastosTienda, Inventario, Menu, MenuProducto, GastosPersonales, PagosBanco, Pedido, PedidoMenu, PedidoProducto, PesoRecuento, Producto, ResumenCarniceria, ResumenVentas, Venta
+from base.management.commands.benchmark_arranque import medir_arranque, recopilar_estaticos
+from base.management.commands.benchmark_vistas import percentil_95
+from base.middleware import EstaticosMiddleware, MetricasMiddleware, codificaciones_aceptadas
+from base.services.balance_service import AGRUPACIONES, balance_carniceria, serie_asador, totales_asador
+from base.services.clientes_service import buscar_clientes, por_prefijo
+from base.services.datos_sinteticos_service import generar_clientes, generar_datos_sinteticos
+from base.services.eventos_service import cancelar_suscripcion, publicar, suscribir
+from base.services.facturas_pdf_service import guardar_pdf_factura, html_impresion_factura, ruta_pdf_factura
+from base.services.facturas_service import recalcular_totales
+from base.services.intervalos_service import HistogramaIntervalos, histograma_pedidos
+from base.services.inventario_service import descontar_existencias, existencias, existencias_contador
+from base.services.lote_pedidos_service import registrar_lote_pedidos
+from base.services.metricas_service import Histograma, registro
+from base.services.paginacion_service import pagina_keyset
+from base.services.pedidos_service import construir_tablero
+from base.services.recuento_service import reconstruir_pesos_recuento
+from base.services.renderizadores_pdf import RenderizadorPillow, obtener_renderizador
+from base.services.resumen_carniceria_service import recalcular_resumen_carniceria
+from base.services.resumen_service import aportacion_pedido, recalcular_resumenes
+
+
+################ ASADOR ################
+class TableroPedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pollo = Producto.objects.create(nombre='Pollo asado', categoria='principal', precio=Decimal('10.00'),
+                                            contador='pollos')
+        cls.medio_pollo = Producto.objects.create(nombre='Medio pollo asado', categoria='principal', precio=Decimal('6.00'),
+                                                  contador='pollos', peso_contador=Decimal('0.50'))
+        cls.cachopo = Producto.objects.create(nombre='Cachopo ternera', categoria='principal', precio=Decimal('15.00'),
+                                              contador='cachopos_ternera')
+        cls.patatas = Producto.objects.create(nombre='Patatas', categoria='raciones', precio=Decimal('3.00'))
+        cls.menu = Menu.objects.create(nombre='Menú pollo', precio=Decimal('12.00'))
+        MenuProducto.objects.create(menu=cls.menu, producto=cls.pollo, cantidad=1)
+        MenuProducto.objects.create(menu=cls.menu, producto=cls.patatas, cantidad=1)
+        reconstruir_pesos_recuento()
+        cls.fecha = timezone.make_aware(datetime(2024, 5, 12, 13, 20))
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def crear_pedidos(self, cantidad):
+        for i in range(cantidad):
+            pedido = Pedido.objects.create(nombre_cliente=f'Cliente {i}', fecha_hora=self.fecha)
+            PedidoProducto.objects.create(pedido=pedido, producto=self.medio_pollo, cantidad=2)
+            PedidoProducto.objects.create(pedido=pedido, producto=self.cachopo, cantidad=1)
+            PedidoMenu.objects.create(pedido=pedido, menu=self.menu, cantidad=1)
+
+    def test_totales_del_tablero(self):
+        self.crear_pedidos(2)
+        tablero = construir_tablero(Pedido.objects.all())
+
+        self.assertEqual(tablero['total_ventas'], Decimal('78.00'))
+        self.assertEqual(tablero['total_pollos'], Decimal('4.00'))
+        self.assertEqual(tablero['total_cachopos_ternera'], Decimal('2'))
+        self.assertEqual(tablero['pedidos'][0].total_precio, Decimal('39.00'))
+        self.assertEqual(len(tablero['pedidos'][0].detalles), 3)
+        self.assertEqual(tablero['conteo_pedidos_por_intervalo'][('13:15', '13:30')], 2)
+
+    def test_numero_de_consultas_constante(self):
+        # El tablero debe costar las mismas consultas con 1 pedido que con 50
+        self.crear_pedidos(1)
+        with self.assertNumQueries(4):
+            construir_tablero(Pedido.objects.all())
+
+        self.crear_pedidos(49)
+        with self.assertNumQueries(4):
+            construir_tablero(Pedido.objects.all())
+
+    def test_vista_lista_pedidos(self):
+        self.crear_pedidos(20)
+        self.client.force_login(self.user)
+        url = reverse('lista_pedidos') + '?fecha=2024-05-12'
+
+        # sesión + usuario + tablero (4); el inventario solo se consulta para el día actual
+        with self.assertNumQueries(6):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['pedidos']), 20)
+
+
+class PesosRecuentoTests(TestCase):
+
+    def test_menu_expandido_por_sus_productos(self):
+        pollo = Producto.objects.create(nombre='Pollo', categoria='principal', contador='pollos')
+        menu = Menu.objects.create(nombre='Menú familiar', contador='cachopos_degustacion')
+        MenuProducto.objects.create(menu=menu, producto=pollo, cantidad=2)
+        reconstruir_pesos_recuento()
+
+        pesos = dict(PesoRecuento.objects.filter(menu=menu).values_list('contador', 'peso'))
+        self.assertEqual(pesos, {'pollos': Decimal('2.00'), 'cachopos_degustacion': Decimal('1.00')})
+
+    def test_renombrar_no_cambia_el_recuento(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(nombre='Pollo asado', categoria='principal', contador='pollos')
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.nombre = 'Pollo de corral'
+            producto.save()
+
+        pedido = Pedido.objects.create(nombre_cliente='Ana', fecha_hora=timezone.now())
+        PedidoProducto.objects.create(pedido=pedido, producto=producto, cantidad=3)
+        tablero = construir_tablero(Pedido.objects.all())
+        self.assertEqual(tablero['total_pollos'], Decimal('3.00'))
+
+    def test_cambio_de_catalogo_reconstruye_pesos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto = Producto.objects.create(nombre='Cachopo', categoria='principal')
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.contador = 'cachopos_lomo'
+            producto.save()
+        self.assertTrue(PesoRecuento.objects.filter(producto=producto, contador='cachopos_lomo').exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.delete()
+        self.assertFalse(PesoRecuento.objects.exists())
+
+    def test_un_menu_con_lineas_reconstruye_una_sola_vez(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            pollo = Producto.objects.create(nombre='Pollo', categoria='principal', contador='pollos')
+            patatas = Producto.objects.create(nombre='Patatas', categoria='raciones')
+        with patch('base.signals.reconstruir_pesos_recuento', wraps=reconstruir_pesos_recuento) as reconstruir:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    menu = Menu.objects.create(nombre='Menú pollo')
+                    MenuProducto.objects.create(menu=menu, producto=pollo, cantidad=1)
+                    MenuProducto.objects.create(menu=menu, producto=patatas, cantidad=2)
+        self.assertEqual(reconstruir.call_count, 1)
+        self.assertEqual(PesoRecuento.objects.get(menu=menu).peso, Decimal('1.00'))
+
+    def test_savepoint_deshecho_vuelve_a_encolar(self):
+        with patch('base.signals.reconstruir_pesos_recuento', wraps=reconstruir_pesos_recuento) as reconstruir:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        Producto.objects.create(nombre='Temporal', categoria='principal', contador='pollos')
+                        raise ValueError
+                except ValueError:
+                    pass
+                producto = Producto.objects.create(nombre='Pollo', categoria='principal', contador='pollos')
+        self.assertEqual(reconstruir.call_count, 1)
+        self.assertTrue(PesoRecuento.objects.filter(producto=producto).exists())
+
+
+@override_settings(ASADOR_TURNOS={'comida': ('13:00', '15:30'), 'cena': ('20:00', '21:00')}, ASADOR_MINUTOS_INTERVALO=15)
+class IntervalosPedidosTests(TestCase):
+
+    def crear_pedido(self, hora, minuto):
+        fecha_hora = timezone.make_aware(datetime(2024, 5, 12, hora, minuto))
+        return Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=fecha_hora)
+
+    def test_intervalos_configurados(self):
+        histograma = HistogramaIntervalos()
+        self.assertEqual(len(histograma.intervalos), 14)
+        self.assertEqual(histograma.intervalos[0], ('13:00', '13:15'))
+        self.assertEqual(histograma.intervalos[-1], ('20:45', '21:00'))
+
+    def test_hora_de_cierre_y_fuera_de_turno(self):
+        histograma = HistogramaIntervalos()
+        histograma.sumar(15, 30)
+        histograma.sumar(17, 0)
+        histograma.sumar(20, 5)
+        conteo = histograma.como_diccionario()
+        self.assertEqual(conteo[('15:15', '15:30')], 1)
+        self.assertEqual(conteo[('20:00', '20:15')], 1)
+        self.assertEqual(histograma.fuera_de_turno, 1)
+
+    def test_histograma_en_sql(self):
+        for hora, minuto in [(13, 0), (13, 14), (13, 59), (20, 30), (11, 0)]:
+            self.crear_pedido(hora, minuto)
+        with self.assertNumQueries(1):
+            histograma = histograma_pedidos(Pedido.objects.all(), minutos=30)
+        conteo = histograma.como_diccionario()
+        self.assertEqual(conteo[('13:00', '13:30')], 2)
+        self.assertEqual(conteo[('13:30', '14:00')], 1)
+        self.assertEqual(conteo[('20:30', '21:00')], 1)
+        self.assertEqual(histograma.fuera_de_turno, 1)
+
+    def test_endpoint_json(self):
+        self.crear_pedido(13, 20)
+        self.client.force_login(User.objects.create_user('cocina', password='clave-segura-123'))
+        response = self.client.get(reverse('intervalos_pedidos'), {'fecha': '2024-05-12'})
+        datos = response.json()
+        self.assertEqual(datos['minutos'], 15)
+        self.assertEqual(datos['intervalos'][1], {'inicio': '13:15', 'fin': '13:30', 'pedidos': 1})
+
+        response = self.client.get(reverse('intervalos_pedidos'), {'fecha': 'ayer'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ResumenVentasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pollo = Producto.objects.create(nombre='Pollo asado', categoria='principal', precio=Decimal('10.00'),
+                                            contador='pollos')
+        cls.cachopo = Producto.objects.create(nombre='Cachopo lomo', categoria='principal', precio=Decimal('14.00'),
+                                              contador='cachopos_lomo')
+        cls.menu = Menu.objects.create(nombre='Menú cachopo', precio=Decimal('20.00'))
+        MenuProducto.objects.create(menu=cls.menu, producto=cls.cachopo, cantidad=1)
+        reconstruir_pesos_recuento()
+        cls.dia = datetime(2024, 5, 12).date()
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def crear_pedido(self, dia=12):
+        pedido = Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=timezone.make_aware(datetime(2024, 5, dia, 14, 0)))
+        PedidoProducto.objects.create(pedido=pedido, producto=self.pollo, cantidad=2)
+        PedidoMenu.objects.create(pedido=pedido, menu=self.menu, cantidad=1)
+        return pedido
+
+    def assertResumen(self, fecha, pedidos, ventas, pollos, cachopos):
+        resumen = ResumenVentas.objects.get(fecha=fecha)
+        self.assertEqual(
+            (resumen.numero_pedidos, resumen.total_ventas, resumen.total_pollos, resumen.total_cachopos),
+            (pedidos, Decimal(ventas), Decimal(pollos), cachopos),
+        )
+
+    def test_resumen_se_actualiza_con_cada_cambio(self):
+        pedido = self.crear_pedido()
+        self.crear_pedido()
+        self.assertResumen(self.dia, 2, '80.00', '4.00', 2)
+
+        linea = PedidoProducto.objects.filter(pedido=pedido).first()
+        linea.cantidad = 1
+        linea.save()
+        self.assertResumen(self.dia, 2, '70.00', '3.00', 2)
+
+        PedidoMenu.objects.filter(pedido=pedido).delete()
+        self.assertResumen(self.dia, 2, '50.00', '3.00', 1)
+
+        pedido.delete()
+        self.assertResumen(self.dia, 1, '40.00', '2.00', 1)
+
+    def test_pedido_cambia_de_dia(self):
+        pedido = self.crear_pedido()
+        pedido.fecha_hora = timezone.make_aware(datetime(2024, 5, 13, 14, 0))
+        pedido.save()
+        self.assertResumen(self.dia, 0, '0.00', '0.00', 0)
+        self.assertResumen(datetime(2024, 5, 13).date(), 1, '40.00', '2.00', 1)
+
+    def test_aportacion_pedido_con_consultas_fijas(self):
+        pedido = self.crear_pedido()
+        for _ in range(10):
+            PedidoProducto.objects.create(pedido=pedido, producto=self.cachopo, cantidad=1)
+
+        with self.assertNumQueries(3):
+            aportacion = aportacion_pedido(pedido.pk)
+        self.assertEqual((aportacion.ventas, aportacion.pollos, aportacion.cachopos),
+                         (Decimal('180.00'), Decimal('2.00'), Decimal('11.00')))
+
+    def test_recalcular_coincide_con_incremental(self):
+        self.crear_pedido()
+        self.crear_pedido(dia=13)
+        ResumenVentas.objects.all().delete()
+
+        self.assertEqual(recalcular_resumenes(), 2)
+        self.assertResumen(self.dia, 1, '40.00', '2.00', 1)
+        self.assertResumen(datetime(2024, 5, 13).date(), 1, '40.00', '2.00', 1)
+
+    def test_recalcular_pone_a_cero_los_dias_sin_pedidos(self):
+        self.crear_pedido()
+        fuera = datetime(2024, 6, 1).date()
+        for fecha in (datetime(2024, 5, 14).date(), fuera):
+            ResumenVentas.objects.create(fecha=fecha, numero_pedidos=3, total_ventas=Decimal('90.00'),
+                                         total_pollos=Decimal('2.00'), total_cachopos=Decimal('1.00'), cerrado=True)
+
+        self.assertEqual(recalcular_resumenes(self.dia, datetime(2024, 5, 20).date()), 2)
+        self.assertResumen(self.dia, 1, '40.00', '2.00', 1)
+        self.assertResumen(datetime(2024, 5, 14).date(), 0, '0.00', '0.00', 0)
+        self.assertTrue(ResumenVentas.objects.get(fecha=datetime(2024, 5, 14).date()).cerrado)
+        self.assertResumen(fuera, 3, '90.00', '2.00', 1)
+
+    def test_contadores_admiten_negativos_y_pesos_fraccionarios(self):
+        medio = Producto.objects.create(nombre='Medio cachopo', categoria='principal', precio=Decimal('8.00'),
+                                        contador='cachopos_ternera', peso_contador=Decimal('0.50'))
+        reconstruir_pesos_recuento()
+        pedido = Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=timezone.make_aware(datetime(2024, 5, 12, 14, 0)))
+        PedidoProducto.objects.create(pedido=pedido, producto=medio, cantidad=1)
+        self.assertResumen(self.dia, 1, '8.00', '0.00', Decimal('0.50'))
+
+        # Resumen puesto a cero a mano: el borrado lo deja en negativo en vez de fallar
+        ResumenVentas.objects.update(numero_pedidos=0, total_ventas=0, total_cachopos=0)
+        pedido.delete()
+        self.assertResumen(self.dia, -1, '-8.00', '0.00', Decimal('-0.50'))
+
+    def test_cierre_dia_usa_los_datos_del_servidor(self):
+        self.crear_pedido()
+        self.client.force_login(self.user)
+        datos = {'accion': 'cierre_dia', 'fecha': '2024-05-12', 'numero_pedidos': 99, 'totalVentas': 1}
+
+        response = self.client.post(reverse('lista_pedidos'), datos, content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(response.json()['resumen']['numero_pedidos'], 1)
+        self.assertTrue(ResumenVentas.objects.get(fecha=self.dia).cerrado)
+
+        response = self.client.post(reverse('lista_pedidos'), datos, content_type='application/json')
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(ResumenVentas.objects.count(), 1)
+
+
+class InventarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pollo = Producto.objects.create(nombre='Pollo asado', categoria='principal', precio=Decimal('10.00'),
+                                            contador='pollos')
+        cls.patatas = Producto.objects.create(nombre='Patatas', categoria='raciones', precio=Decimal('3.00'))
+        cls.bebida = Producto.objects.create(nombre='Bebida', categoria='bebidas', precio=Decimal('2.00'))
+        cls.menu = Menu.objects.create(nombre='Menú pollo', precio=Decimal('12.00'))
+        MenuProducto.objects.create(menu=cls.menu, producto=cls.pollo, cantidad=1)
+        MenuProducto.objects.create(menu=cls.menu, producto=cls.patatas, cantidad=2)
+        Inventario.objects.create(producto=cls.pollo, cantidad_disponible=Decimal('20.00'))
+        Inventario.objects.create(producto=cls.patatas, cantidad_disponible=Decimal('50.00'))
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def assertExistencias(self, pollos, patatas):
+        self.assertEqual(
+            {inventario.producto_id: inventario.cantidad_disponible for inventario in existencias()},
+            {self.pollo.id: Decimal(pollos), self.patatas.id: Decimal(patatas)},
+        )
+
+    def test_pedido_descuenta_y_devuelve_existencias(self):
+        pedido = Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=timezone.now())
+        linea = PedidoProducto.objects.create(pedido=pedido, producto=self.pollo, cantidad=2)
+        PedidoProducto.objects.create(pedido=pedido, producto=self.bebida, cantidad=3)
+        PedidoMenu.objects.create(pedido=pedido, menu=self.menu, cantidad=2)
+        self.assertExistencias('16.00', '46.00')
+
+        linea.cantidad = 1
+        linea.save()
+        self.assertExistencias('17.00', '46.00')
+
+        PedidoMenu.objects.filter(pedido=pedido).delete()
+        self.assertExistencias('19.00', '50.00')
+
+        pedido.delete()
+        self.assertExistencias('20.00', '50.00')
+
+    def test_formulario_y_lote_descuentan_existencias(self):
+        self.client.force_login(self.user)
+        datos = {'nombre_cliente': 'Cliente', 'fecha_hora': '2024-05-12T14:00', 'observaciones': '',
+                 'productos[0][producto]': self.pollo.id, 'productos[0][cantidad]': 1,
+                 'menus[0][menu]': self.menu.id, 'menus[0][cantidad]': 1}
+        self.client.post(reverse('crear_pedido'), datos)
+        self.assertExistencias('18.00', '48.00')
+
+        lote = [{'nombre_cliente': f'Cliente {i}', 'fecha_hora': '2024-05-12T14:00',
+                 'menus': [{'menu': self.menu.id, 'cantidad': 2}]} for i in range(3)]
+        response = self.client.post(reverse('lote_pedidos'), json.dumps(lote), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertExistencias('12.00', '36.00')
+
+    def test_descuentos_simultaneos_no_se_pisan(self):
+        # Dos terminales con la misma lectura previa del inventario: el UPDATE se calcula en la base de datos
+        leido_terminal_1 = Inventario.objects.get(producto=self.pollo)
+        leido_terminal_2 = Inventario.objects.get(producto=self.pollo)
+        descontar_existencias({self.pollo.id: 3})
+        descontar_existencias({self.pollo.id: 4})
+        self.assertEqual(leido_terminal_1.cantidad_disponible, leido_terminal_2.cantidad_disponible)
+        self.assertExistencias('13.00', '50.00')
+
+        with self.assertNumQueries(1):
+            existencias()
+
+    def test_productos_con_contador_descuentan_por_peso(self):
+        medio = Producto.objects.create(nombre='Medio pollo asado', categoria='principal', precio=Decimal('6.00'),
+                                        contador='pollos', peso_contador=Decimal('0.50'))
+        pedido = Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=timezone.now())
+        PedidoProducto.objects.create(pedido=pedido, producto=medio, cantidad=3)
+        PedidoProducto.objects.create(pedido=pedido, producto=self.patatas, cantidad=3)
+        self.assertExistencias('18.50', '47.00')
+        self.assertEqual(existencias_contador('pollos'), Decimal('18.50'))
+
+        pedido.delete()
+        self.assertExistencias('20.00', '50.00')
+
+    def test_existencias_de_un_contador_en_una_sola_fila(self):
+        # Una fila propia del medio pollo (p. ej. creada a mano) ni se descuenta ni suma a los pollos restantes
+        medio = Producto.objects.create(nombre='Medio pollo asado', categoria='principal', precio=Decimal('6.00'),
+                                        contador='pollos', peso_contador=Decimal('0.50'))
+        Inventario.objects.create(producto=medio, cantidad_disponible=Decimal('200.00'))
+        descontar_existencias({medio.id: 2, self.pollo.id: 1})
+
+        self.assertEqual(Inventario.objects.get(producto=medio).cantidad_disponible, Decimal('200.00'))
+        self.assertExistencias('18.00', '50.00')
+        with self.assertNumQueries(1):
+            self.assertEqual(existencias_contador('pollos'), Decimal('18.00'))
+
+    def test_tablero_solo_muestra_existencias_del_dia_actual(self):
+        reconstruir_pesos_recuento()
+        self.client.force_login(self.user)
+        pedido = Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=timezone.now())
+        PedidoProducto.objects.create(pedido=pedido, producto=self.pollo, cantidad=2)
+
+        response = self.client.get(reverse('lista_pedidos'))
+        self.assertEqual((response.context['pollos_disponibles'], response.context['pollos_restantes']),
+                         (Decimal('20.00'), Decimal('18.00')))
+        self.assertContains(response, '<th>Disponibles</th>', html=True)
+
+        response = self.client.get(reverse('lista_pedidos'), {'fecha': '2024-05-12'})
+        self.assertFalse(response.context['es_hoy'])
+        self.assertNotIn('existencias', response.context)
+        self.assertNotContains(response, '<h3>Existencias</h3>', html=True)
+
+
+class LineasPedidoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.productos = [Producto.objects.create(nombre=f'Ración {i}', categoria='raciones', precio=Decimal('2.00'))
+                         for i in range(20)]
+        cls.menu = Menu.objects.create(nombre='Menú del día', precio=Decimal('12.00'))
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def datos_pedido(self, productos, menus=()):
+        datos = {'nombre_cliente': 'Catering', 'fecha_hora': '2024-05-12T14:00', 'observaciones': ''}
+        for i, (producto, cantidad) in enumerate(productos):
+            datos[f'productos[{i}][producto]'] = producto.id
+            datos[f'productos[{i}][cantidad]'] = cantidad
+        for i, (menu, cantidad) in enumerate(menus):
+            datos[f'menus[{i}][menu]'] = menu.id
+            datos[f'menus[{i}][cantidad]'] = cantidad
+        return datos
+
+    def test_crear_pedido_con_lineas(self):
+        self.client.force_login(self.user)
+        datos = self.datos_pedido([(p, 1) for p in self.productos], [(self.menu, 2)])
+        response = self.client.post(reverse('crear_pedido'), datos)
+
+        self.assertRedirects(response, reverse('lista_pedidos'), fetch_redirect_response=False)
+        pedido = Pedido.objects.get()
+        self.assertEqual(pedido.pedidoproducto_set.count(), 20)
+        self.assertEqual(ResumenVentas.objects.get().total_ventas, Decimal('64.00'))
+
+    def test_editar_pedido_de_20_lineas_con_pocas_consultas(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('crear_pedido'), self.datos_pedido([(p, 1) for p in self.productos]))
+        pedido = Pedido.objects.get()
+        lineas_antes = set(pedido.pedidoproducto_set.values_list('id', flat=True))
+
+        # 10 líneas cambian de cantidad, 5 desaparecen, 5 siguen igual y se añade un menú
+        nuevas = [(p, 3) for p in self.productos[:10]] + [(p, 1) for p in self.productos[10:15]]
+        with self.assertNumQueries(21):
+            self.client.post(reverse('editar_pedido', args=[pedido.id]), self.datos_pedido(nuevas, [(self.menu, 1)]))
+
+        self.assertEqual(pedido.pedidoproducto_set.count(), 15)
+        self.assertTrue(set(pedido.pedidoproducto_set.values_list('id', flat=True)) <= lineas_antes)
+        self.assertEqual(ResumenVentas.objects.get().total_ventas, Decimal('82.00'))
+
+    def test_producto_inexistente_no_deja_medio_pedido(self):
+        self.client.force_login(self.user)
+        datos = self.datos_pedido([(self.productos[0], 1)])
+        datos['productos[1][producto]'] = 999999
+        datos['productos[1][cantidad]'] = 1
+        response = self.client.post(reverse('crear_pedido'), datos)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(PedidoProducto.objects.exists())
+        self.assertFalse(ResumenVentas.objects.exists())
+
+
+class LotePedidosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pollo = Producto.objects.create(nombre='Pollo asado', categoria='principal', precio=Decimal('10.00'),
+                                            contador='pollos')
+        cls.patatas = Producto.objects.create(nombre='Patatas', categoria='raciones', precio=Decimal('3.00'))
+        cls.menu = Menu.objects.create(nombre='Menú pollo', precio=Decimal('12.00'))
+        MenuProducto.objects.create(menu=cls.menu, producto=cls.pollo, cantidad=1)
+        reconstruir_pesos_recuento()
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def pedido(self, i, productos=None):
+        return {
+            'nombre_cliente': f'Cliente {i}',
+            'fecha_hora': '2024-05-12T13:30',
+            'productos': productos or [{'producto': self.pollo.id, 'cantidad': 2}, {'producto': self.patatas.id}],
+            'menus': [{'menu': self.menu.id, 'cantidad': 1}],
+        }
+
+    def enviar(self, datos):
+        return self.client.post(reverse('lote_pedidos'), json.dumps(datos), content_type='application/json')
+
+    def test_lote_devuelve_ids_y_totales(self):
+        response = self.enviar({'pedidos': [self.pedido(i) for i in range(3)]})
+
+        self.assertEqual(response.status_code, 201)
+        pedidos = response.json()['pedidos']
+        self.assertEqual([p['id'] for p in pedidos], list(Pedido.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual({p['total'] for p in pedidos}, {'35.00'})
+        self.assertEqual(PedidoProducto.objects.count(), 6)
+        resumen = ResumenVentas.objects.get()
+        self.assertEqual(resumen.numero_pedidos, 3)
+        self.assertEqual(resumen.total_ventas, Decimal('105.00'))
+        self.assertEqual(resumen.total_pollos, Decimal('9.00'))
+
+    def test_pedido_suelto(self):
+        response = self.enviar(self.pedido(0))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Pedido.objects.count(), 1)
+
+    def test_un_pedido_incorrecto_anula_el_lote(self):
+        datos = [self.pedido(0), self.pedido(1, productos=[{'producto': 999999, 'cantidad': 1}])]
+        response = self.enviar(datos)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['errores'])
+        self.assertFalse(Pedido.objects.exists())
+        self.assertFalse(ResumenVentas.objects.exists())
+
+    def test_consultas_no_dependen_del_tamano_del_lote(self):
+        # Resumen del día ya creado: catálogo, inserciones, filas de existencias a descontar, su UPDATE e incremento
+        registrar_lote_pedidos([self.pedido(0)])
+        with self.assertNumQueries(14):
+            registrar_lote_pedidos([self.pedido(1)])
+        with self.assertNumQueries(14):
+            registrar_lote_pedidos([self.pedido(i) for i in range(50)])
+        self.assertEqual(ResumenVentas.objects.get().numero_pedidos, 52)
+
+    def test_precios_leidos_en_la_transaccion(self):
+        registrar_lote_pedidos([self.pedido(0)])
+        # Cambio de precio sin señales (como si lo hubiera guardado otro proceso): el siguiente lote ya lo usa
+        Producto.objects.filter(pk=self.pollo.pk).update(precio=Decimal('11.00'))
+        pedidos, _ = registrar_lote_pedidos([self.pedido(1)])
+        self.assertEqual(pedidos[0]['total'], '37.00')
+        self.assertEqual(ResumenVentas.objects.get().total_ventas, Decimal('72.00'))
+
+
+class TableroEventosTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('encargado', password='clave-segura-123')
+        self.producto = Producto.objects.create(nombre='Pollo asado', categoria='principal', precio=Decimal('10.00'),
+                                                contador='pollos')
+
+    def crear_pedido(self):
+        pedido = Pedido.objects.create(nombre_cliente='Cliente', fecha_hora=timezone.make_aware(datetime(2024, 5, 12, 13, 20)))
+        PedidoProducto.objects.create(pedido=pedido, producto=self.producto, cantidad=2)
+        return pedido
+
+    def marcar_entregado(self, pedido):
+        pedido.entregado = True
+        pedido.save()
+
+    async def recibir(self, cola):
+        return await asyncio.wait_for(cola.get(), timeout=1)
+
+    async def test_cambios_de_pedidos_llegan_a_las_pantallas(self):
+        cola = suscribir()
+        try:
+            pedido = await sync_to_async(self.crear_pedido)()
+            evento = await self.recibir(cola)
+            self.assertEqual((evento['tipo'], evento['pedidos'], evento['fecha']), ('creado', [pedido.pk], '2024-05-12'))
+            self.assertEqual((await self.recibir(cola))['contadores']['total_pollos'], '2.00')
+
+            await sync_to_async(self.marcar_entregado)(pedido)
+            evento = await self.recibir(cola)
+            self.assertEqual((evento['tipo'], evento['entregado']), ('entregado', True))
+            self.assertNotIn('contadores', evento)
+
+            await sync_to_async(pedido.delete)()
+            evento = await self.recibir(cola)
+            self.assertEqual((evento['tipo'], evento['contadores']['numero_pedidos']), ('eliminado', 0))
+            self.assertTrue(cola.empty())
+        finally:
+            cancelar_suscripcion(cola)
+
+    def test_sondeo_devuelve_version_y_contadores(self):
+        self.client.force_login(self.user)
+        pedido = self.crear_pedido()
+        menu = Menu.objects.create(nombre='Menú degustación', precio=Decimal('25.00'), contador='cachopos_degustacion')
+        MenuProducto.objects.create(menu=menu, producto=self.producto, cantidad=1)
+        PedidoMenu.objects.create(pedido=pedido, menu=menu, cantidad=2)
+        version = self.client.get(reverse('lista_pedidos'), {'fecha': '2024-05-12'}).context['version_tablero']
+
+        with self.assertNumQueries(5):  # sesión, usuario, versión y encargados de productos y de menús
+            datos = self.client.get(reverse('cambios_pedidos'), {'fecha': '2024-05-12'}).json()
+        self.assertEqual(datos['contadores']['version'], version)
+        self.assertEqual((datos['contadores']['numero_pedidos'], datos['contadores']['total_pollos'],
+                          datos['contadores']['total_cachopos_degustacion']), (1, '4.00', '2.00'))
+        self.assertNotIn('pollos_restantes', datos['contadores'])
+
+        self.marcar_entregado(pedido)
+        datos = self.client.get(reverse('cambios_pedidos'), {'fecha': '2024-05-12'}).json()
+        self.assertNotEqual(datos['contadores']['version'], version)
+        self.assertEqual(self.client.get(reverse('cambios_pedidos'), {'fecha': '12/05/2024'}).status_code, 400)
+
+    async def test_sin_asgi_responde_204(self):
+        await self.async_client.aforce_login(self.user)
+        with override_settings(ASADOR_EVENTOS_SSE=False):
+            response = await self.async_client.get(reverse('eventos_pedidos'), {'fecha': '2024-05-12'})
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+
+    @override_settings(ASADOR_EVENTOS_SSE=True)
+    async def test_flujo_sse(self):
+        response = await self.async_client.get(reverse('eventos_pedidos'))
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('eventos_pedidos'), {'fecha': '2024-05-12'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        flujo = aiter(response.streaming_content)
+        self.assertEqual(await anext(flujo), b'retry: 3000\n\n')
+
+        siguiente = asyncio.ensure_future(anext(flujo))
+        await asyncio.sleep(0)
+        publicar({'tipo': 'eliminado', 'pedidos': [1], 'fecha': '2024-05-11', 'contadores': {}})
+        publicar({'tipo': 'eliminado', 'pedidos': [2], 'fecha': '2024-05-12', 'contadores': {}})
+        contenido = await asyncio.wait_for(siguiente, timeout=1)
+        self.assertTrue(contenido.startswith(b'event: eliminado\ndata: {"tipo": "eliminado", "pedidos": [2]'))
+        await flujo.aclose()
+
+class BalanceAsadorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Dos años de resúmenes diarios y un gasto al mes
+        cls.inicio = datetime(2023, 1, 1).date()
+        ResumenVentas.objects.bulk_create(
+            ResumenVentas(fecha=cls.inicio + timedelta(days=i), total_ventas=Decimal('100.00'), numero_pedidos=10,
+                          total_pollos=Decimal('5.00'), total_cachopos=2)
+            for i in range(730)
+        )
+        Gasto.objects.bulk_create(Gasto(descripcion='Carbón', monto=Decimal('30.00'), fecha=datetime(2023, mes, 15).date())
+                                  for mes in range(1, 13))
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def test_totales_en_un_aggregate_por_tabla(self):
+        with self.assertNumQueries(2):
+            totales = totales_asador()
+        self.assertEqual(totales['ventas'], Decimal('73000.00'))
+        self.assertEqual(totales['pedidos'], 7300)
+        self.assertEqual(totales['cachopos'], 1460)
+        self.assertEqual(totales['gastos'], Decimal('360.00'))
+        self.assertEqual(totales['beneficios'], Decimal('72640.00'))
+        self.assertEqual((totales['primera'], totales['ultima']), (self.inicio, datetime(2024, 12, 30).date()))
+
+    def test_serie_agrupada_y_limitada(self):
+        totales = totales_asador()
+        with self.assertNumQueries(1):
+            agrupacion, recortada, serie = serie_asador(totales, max_puntos=120)
+        # 730 días no caben en 120 puntos por día, por semana sí (106 semanas: la primera empieza en domingo)
+        self.assertEqual((agrupacion, recortada, len(serie)), ('semana', False, 106))
+
+        agrupacion, recortada, serie = serie_asador(totales, 'mes', max_puntos=6)
+        self.assertEqual((agrupacion, recortada), ('mes', True))
+        self.assertEqual([item['periodo'].isoformat() for item in serie][0], '2024-07-01')
+        self.assertEqual(len(serie), 6)
+
+        _, _, serie = serie_asador(totales_asador('2023-01-01', '2023-01-31'), 'mes')
+        self.assertEqual(serie, [{'periodo': self.inicio, 'ventas': Decimal('3100.00'), 'gastos': Decimal('30.00'),
+                                  'beneficios': Decimal('3070.00')}])
+
+    def test_pagina_sin_historial_y_endpoint_del_grafico(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('balance_asador'))
+        # Sesión, usuario y los dos aggregate, sin importar los años de historial
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('balance_asador'))
+        self.assertEqual(response.context['total_ventas'], Decimal('73000.00'))
+        self.assertNotContains(response, '2023-01-01')
+
+        response = self.client.get(reverse('balance_asador_datos'), {'agrupacion': 'dia', 'puntos': 30})
+        datos = response.json()
+        self.assertEqual((datos['agrupacion'], datos['recortada'], len(datos['serie'])), ('dia', True, 30))
+        self.assertEqual(datos['serie'][-1], {'periodo': '2024-12-30', 'ventas': 100.0, 'gastos': 0.0, 'beneficios': 100.0})
+
+        response = self.client.get(reverse('balance_asador_datos'), {'puntos': 'muchos'})
+        self.assertEqual(response.status_code, 400)
+
+
+################ CARNICERÍA ################
+class BalanceCarniceriaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        fecha = lambda dia: datetime(2024, 1, dia).date()
+        Venta.objects.create(fecha=fecha(1), total=Decimal('100.00'))
+        Venta.objects.create(fecha=fecha(9), total=Decimal('50.00'))
+        FacturasIVA.objects.create(proveedor='Proveedor', numero_factura='P-1', fecha=fecha(2), total=Decimal('30.00'))
+        FacturaTienda.objects.create(proveedor='Proveedor', fecha=fecha(9), total=Decimal('10.00'))
+        GastosTienda.objects.create(fecha=fecha(3), gasto='Luz', total=Decimal('5.00'))
+        PagosBanco.objects.create(fecha=fecha(20), concepto='Préstamo', total=Decimal('15.00'))
+        Venta.objects.create(fecha=datetime(2024, 2, 1).date(), total=Decimal('40.00'))
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def test_totales_y_serie_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            totales, serie = balance_carniceria(agrupacion='semana')
+
+        self.assertEqual(totales, {'ventas': Decimal('190.00'), 'compras': Decimal('40.00'),
+                                   'gastos': Decimal('20.00'), 'beneficios': Decimal('130.00')})
+        self.assertEqual([(item['periodo'].isoformat(), item['beneficios']) for item in serie], [
+            ('2024-01-01', Decimal('65.00')), ('2024-01-08', Decimal('40.00')),
+            ('2024-01-15', Decimal('-15.00')), ('2024-01-29', Decimal('40.00')),
+        ])
+
+    def test_agrupaciones_y_filtro_de_fechas(self):
+        _, serie = balance_carniceria('2024-01-01', '2024-01-31', 'mes')
+        self.assertEqual(serie, [{'periodo': datetime(2024, 1, 1).date(), 'ventas': Decimal('150.00'),
+                                  'compras': Decimal('40.00'), 'gastos': Decimal('20.00'), 'beneficios': Decimal('90.00')}])
+
+        _, serie = balance_carniceria(agrupacion='dia')
+        self.assertEqual(len(serie), 6)
+        self.assertEqual(serie[0]['periodo'], datetime(2024, 1, 1).date())
+
+    def test_agrupacion_en_sqlite_igual_que_trunc(self):
+        # Domingos, lunes y cambios de mes y de año
+        for dia in range(40):
+            Venta.objects.create(fecha=datetime(2023, 12, 20).date() + timedelta(days=dia), total=Decimal('1.00'))
+        for agrupacion, truncar in (('semana', TruncWeek), ('mes', TruncMonth)):
+            nativa = Venta.objects.annotate(periodo=AGRUPACIONES[agrupacion]('fecha')).values_list('fecha', 'periodo')
+            self.assertEqual(list(nativa), list(Venta.objects.annotate(periodo=truncar('fecha')).values_list('fecha', 'periodo')))
+
+    def test_vista_con_grafico_de_evolucion(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('balance_carniceria'))
+        # Sesión, usuario y el balance
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('balance_carniceria'), {'agrupacion': 'mes'})
+
+        self.assertEqual(response.context['beneficios'], Decimal('130.00'))
+        self.assertEqual([item['periodo'] for item in json.loads(response.context['serie'])], ['2024-01-01', '2024-02-01'])
+
+        response = self.client.get(reverse('balance_carniceria'), {'agrupacion': 'año'})
+        self.assertEqual(response.context['agrupacion'], 'mes')
+
+
+class ResumenCarniceriaTests(TestCase):
+
+    def resumen(self, dia):
+        return ResumenCarniceria.objects.get(fecha=datetime(2024, 3, dia).date())
+
+    def test_altas_cambios_y_bajas_actualizan_el_dia(self):
+        fecha = datetime(2024, 3, 1).date()
+        venta = Venta.objects.create(fecha=fecha, total=Decimal('100.00'))
+        Venta.objects.create(fecha=fecha, total='20.50')
+        GastosPersonales.objects.create(fecha=fecha, gasto='Comida', total=Decimal('8.00'))
+        capital = Capital.objects.create(fecha=fecha, tipo_ingreso='EF', total=Decimal('300.00'))
+        self.assertEqual((self.resumen(1).ventas, self.resumen(1).gastos_personales, self.resumen(1).capital_ef),
+                         (Decimal('120.50'), Decimal('8.00'), Decimal('300.00')))
+
+        venta.total = Decimal('90.00')
+        venta.save()
+        self.assertEqual(self.resumen(1).ventas, Decimal('110.50'))
+
+        # Cambiar de día y de tipo de ingreso mueve el importe
+        venta = Venta.objects.get(pk=venta.pk)
+        venta.fecha = datetime(2024, 3, 2).date()
+        venta.save()
+        capital.tipo_ingreso = 'TA'
+        capital.save()
+        self.assertEqual((self.resumen(1).ventas, self.resumen(2).ventas), (Decimal('20.50'), Decimal('90.00')))
+        self.assertEqual((self.resumen(1).capital_ef, self.resumen(1).capital_ta), (Decimal('0.00'), Decimal('300.00')))
+
+        venta.delete()
+        self.assertEqual(self.resumen(2).ventas, Decimal('0.00'))
+
+    def test_recalcular_coincide_con_el_incremental(self):
+        fecha = datetime(2024, 3, 1).date()
+        for modelo, datos in ((Venta, {}), (FacturasIVA, {'proveedor': 'P', 'numero_factura': '1'}),
+                              (FacturaTienda, {'proveedor': 'P'}), (GastosTienda, {'gasto': 'Luz'}),
+                              (PagosBanco, {'concepto': 'Préstamo'}), (Capital, {'tipo_ingreso': 'BB'})):
+            modelo.objects.create(fecha=fecha, total=Decimal('10.00'), **datos)
+        incremental = ResumenCarniceria.objects.values().get(fecha=fecha)
+
+        ResumenCarniceria.objects.all().delete()
+        ResumenCarniceria.objects.create(fecha=datetime(2024, 3, 5).date(), ventas=Decimal('99.00'))  # Día sin movimientos
+        self.assertEqual(recalcular_resumen_carniceria(), 1)
+        recalculado = ResumenCarniceria.objects.values().get(fecha=fecha)
+        incremental.pop('id'), recalculado.pop('id')
+        self.assertEqual(recalculado, incremental)
+        self.assertFalse(ResumenCarniceria.objects.filter(fecha=datetime(2024, 3, 5).date()).exists())
+
+    def test_totales_de_capital_desde_el_resumen(self):
+        fecha = datetime(2024, 3, 4).date()
+        Capital.objects.create(fecha=fecha, tipo_ingreso='EF', total=Decimal('100.00'))
+        Capital.objects.create(fecha=fecha, tipo_ingreso='S1', total=Decimal('50.00'))
+        Capital.objects.create(fecha=fecha, tipo_ingreso='TA', total=Decimal('30.00'))
+        user = User.objects.create_user('encargado', password='clave-segura-123')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('lista_capital'), {'fecha_inicio': '2024-03-04', 'fecha_fin': '2024-03-10'})
+        self.assertEqual(response.context['total_capitales'], Decimal('150.00'))
+        self.assertEqual(response.context['total_tarjetas'], Decimal('30.00'))
+
+
+class FacturaTotalesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Restaurante', codigo='C001', direccion='Calle Mayor 1', cif_dni='B12345678')
+
+    def datos_factura(self, lineas, factura=None):
+        datos = {
+            'cliente': self.cliente.id,
+            'numero_factura': 'F-1',
+            'facturaproducto_set-TOTAL_FORMS': len(lineas),
+            'facturaproducto_set-INITIAL_FORMS': len([linea for linea in lineas if linea.get('id')]),
+        }
+        for i, linea in enumerate(lineas):
+            for campo, valor in linea.items():
+                datos[f'facturaproducto_set-{i}-{campo}'] = valor
+        return datos
+
+    def assertTotales(self, factura, neto, iva, total):
+        factura.refresh_from_db()
+        self.assertEqual((factura.total_neto, factura.total_iva, factura.total), (Decimal(neto), Decimal(iva), Decimal(total)))
+
+    def test_totales_tras_crear_y_editar(self):
+        lineas = [{'descripcion': 'Lomo', 'cantidad': '2.000', 'precio_kg': '10.00'},
+                  {'descripcion': 'Chuletas', 'cantidad': '1.500', 'precio_kg': '8.00'}]
+        self.client.post(reverse('crear_factura'), self.datos_factura(lineas))
+        factura = Factura.objects.get()
+        self.assertTotales(factura, '32.00', '3.20', '35.20')
+
+        chuletas = factura.facturaproducto_set.get(descripcion='Chuletas')
+        lomo = factura.facturaproducto_set.get(descripcion='Lomo')
+        lineas = [{'id': lomo.id, 'descripcion': 'Lomo', 'cantidad': '3.000', 'precio_kg': '10.00'},
+                  {'id': chuletas.id, 'descripcion': 'Chuletas', 'cantidad': '1.500', 'precio_kg': '8.00', 'DELETE': 'on'}]
+        self.client.post(reverse('editar_factura', args=[factura.id]), self.datos_factura(lineas))
+        self.assertTotales(factura, '30.00', '3.00', '33.00')
+
+    def test_save_calcula_totales_con_una_consulta(self):
+        factura = Factura.objects.create(cliente=self.cliente, numero_factura='F-2')
+        for i in range(5):
+            FacturaProducto.objects.create(factura=factura, descripcion=f'Pieza {i}', cantidad=Decimal('1.000'),
+                                           precio_kg=Decimal('4.00'))
+        with self.assertNumQueries(2):  # agregado + UPDATE
+            factura.save()
+        self.assertTotales(factura, '20.00', '2.00', '22.00')
+
+    def test_totales_redondeados_a_centimos(self):
+        # SQLite suma los decimales como números en coma flotante: el agregado devuelve colas como 7.800000000000001
+        factura = Factura.objects.create(cliente=self.cliente, numero_factura='F-3')
+        for precio in ('1.10', '2.20', '4.50'):
+            FacturaProducto.objects.create(factura=factura, descripcion='Pieza', cantidad=Decimal('1.000'),
+                                           precio_kg=Decimal(precio))
+        factura.calcular_totales()
+        self.assertEqual([valor.as_tuple().exponent for valor in (factura.total_neto, factura.total_iva, factura.total)],
+                         [-2, -2, -2])
+        self.assertEqual((factura.total_neto, factura.total_iva, factura.total),
+                         (Decimal('7.80'), Decimal('0.78'), Decimal('8.58')))
+
+    def test_recalcular_totales_por_rango(self):
+        facturas = [Factura.objects.create(cliente=self.cliente, numero_factura=f'F-{i}') for i in range(3)]
+        for factura in facturas:
+            FacturaProducto.objects.create(factura=factura, descripcion='Lomo', cantidad=Decimal('1.000'),
+                                           precio_kg=Decimal('10.00'))
+        # Las líneas se han creado después de la factura: sus totales siguen a cero
+        facturas[2].save()
+        Factura.objects.filter(pk=facturas[1].pk).update(fecha_emision=datetime(2020, 1, 1).date())
+
+        with self.assertNumQueries(5):  # agregado + facturas + bulk_update dentro de su transacción
+            self.assertEqual(recalcular_totales(fecha_inicio=datetime(2021, 1, 1).date()), 1)
+        self.assertTotales(facturas[0], '10.00', '1.00', '11.00')
+        self.assertTotales(facturas[1], '0.00', '0.00', '0.00')
+        self.assertEqual(recalcular_totales(), 1)
+        self.assertTotales(facturas[1], '10.00', '1.00', '11.00')
+        self.assertEqual(recalcular_totales(), 0)
+
+
+# Numeración automática de facturas por serie y ejercicio
+class NumeracionFacturasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+        cls.cliente = Cliente.objects.create(nombre='Restaurante', codigo='C001', direccion='Calle Mayor 1', cif_dni='B12345678')
+        cls.año = timezone.localdate().year
+
+    def test_numeros_consecutivos_al_crear_desde_la_vista(self):
+        self.client.force_login(self.user)
+        datos = {'cliente': self.cliente.id, 'facturaproducto_set-TOTAL_FORMS': 0, 'facturaproducto_set-INITIAL_FORMS': 0}
+        for _ in range(3):
+            self.client.post(reverse('crear_factura'), datos)
+        self.assertEqual(list(Factura.objects.order_by('id').values_list('numero_factura', flat=True)),
+                         [f'F{self.año}-00001', f'F{self.año}-00002', f'F{self.año}-00003'])
+        self.assertEqual(ContadorFactura.objects.get(serie='F', ejercicio=self.año).ultimo, 3)
+
+    def test_contador_por_serie_y_ejercicio(self):
+        Factura.objects.create(cliente=self.cliente)
+        rectificativa = Factura.objects.create(cliente=self.cliente, serie='R')
+        anterior = Factura.objects.create(cliente=self.cliente, fecha_emision=datetime(2023, 12, 31).date())
+        siguiente = Factura.objects.create(cliente=self.cliente)
+        self.assertEqual(rectificativa.numero_factura, f'R{self.año}-00001')
+        self.assertEqual(anterior.numero_factura, 'F2023-00001')
+        self.assertEqual((siguiente.serie, siguiente.ejercicio, siguiente.numero), ('F', self.año, 2))
+
+    def test_sin_huecos_si_la_factura_no_llega_a_guardarse(self):
+        Factura.objects.create(cliente=self.cliente)
+        # Falla algo después de numerar la factura dentro de la transacción del alta
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                Factura.objects.create(cliente=self.cliente)
+                raise ValueError('Líneas no válidas')
+        self.assertEqual(Factura.objects.create(cliente=self.cliente).numero, 2)
+
+    def test_numero_escrito_a_mano_no_usa_el_contador(self):
+        factura = Factura.objects.create(cliente=self.cliente, numero_factura='A-17')
+        self.assertIsNone(factura.numero)
+        self.assertFalse(ContadorFactura.objects.exists())
+
+    def test_salta_los_numeros_ya_usados(self):
+        Factura.objects.create(cliente=self.cliente, numero_factura=f'F{self.año}-00001')
+        Factura.objects.create(cliente=self.cliente, numero_factura=f'F{self.año}-00002')
+        self.assertEqual(Factura.objects.create(cliente=self.cliente).numero_factura, f'F{self.año}-00003')
+        self.assertEqual(ContadorFactura.objects.get(serie='F', ejercicio=self.año).ultimo, 3)
+
+    def test_asignar_numero_es_constante_en_consultas(self):
+        for _ in range(20):
+            Factura.objects.create(cliente=self.cliente)
+        with CaptureQueriesContext(connection) as consultas:
+            Factura.objects.create(cliente=self.cliente)
+        sentencias = [consulta['sql'].split()[0] for consulta in consultas.captured_queries if 'SAVEPOINT' not in consulta['sql']]
+        self.assertEqual(sentencias, ['UPDATE', 'SELECT', 'SELECT', 'INSERT'])
+
+
+class FacturaPdfCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nombre='Restaurante', codigo='C001', direccion='Calle Mayor 1', cif_dni='B12345678')
+        cls.factura = Factura.objects.create(cliente=cls.cliente, numero_factura='F-1')
+        cls.linea = FacturaProducto.objects.create(factura=cls.factura, descripcion='Lomo', cantidad=Decimal('2.000'),
+                                                   precio_kg=Decimal('10.00'))
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = override_settings(FACTURAS_PDF_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def ruta_actual(self):
+        factura = Factura.objects.get(pk=self.factura.pk)
+        return ruta_pdf_factura(factura, list(factura.facturaproducto_set.all()))
+
+    def test_descarga_repetida_se_sirve_desde_disco(self):
+        ruta = self.ruta_actual()
+        guardar_pdf_factura(ruta, b'%PDF-cacheado')
+
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('previsualizar_factura', args=[self.factura.pk]))
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-cacheado')
+        self.assertIn('Factura_Pettisso_F-1.pdf', response['Content-Disposition'])
+
+    def test_cambios_invalidan_la_cache(self):
+        ruta = self.ruta_actual()
+        guardar_pdf_factura(ruta, b'%PDF')
+
+        self.linea.precio_kg = Decimal('11.00')
+        self.linea.save()
+        self.assertFalse(ruta.exists())
+        self.assertNotEqual(self.ruta_actual(), ruta)
+
+        ruta = self.ruta_actual()
+        guardar_pdf_factura(ruta, b'%PDF')
+        self.cliente.direccion = 'Calle Nueva 2'
+        self.cliente.save()
+        self.assertFalse(ruta.exists())
+
+    def test_html_de_impresion_sin_peticiones_al_servidor(self):
+        factura = Factura.objects.select_related('cliente').get(pk=self.factura.pk)
+        html = html_impresion_factura(factura, list(factura.facturaproducto_set.all()))
+
+        self.assertIn('.factura-container', html)  # estilos incrustados
+        self.assertNotIn('<link', html)
+        self.assertNotIn('http', html)
+        logo = re.search(r'<img src="file://([^"]+)"', html).group(1)
+        self.assertTrue(Path(logo).exists())
+        self.assertIn('Lomo', html)
+
+        # La previsualización usa el mismo contenido con el logo servido como estático
+        response = self.client.get(reverse('previsualizar_factura', args=[self.factura.pk]))
+        self.assertContains(response, 'images/logo_factura.png')
+        self.assertContains(response, 'Lomo')
+
+    def test_exportar_zip_del_rango(self):
+        otra = Factura.objects.create(cliente=self.cliente, numero_factura='F-2')
+        fuera = Factura.objects.create(cliente=self.cliente, numero_factura='F-3')
+        Factura.objects.filter(pk=fuera.pk).update(fecha_emision=datetime(2020, 1, 1).date())
+        for factura in (self.factura, otra):
+            factura = Factura.objects.get(pk=factura.pk)
+            guardar_pdf_factura(ruta_pdf_factura(factura, list(factura.facturaproducto_set.all())),
+                                f'%PDF {factura.numero_factura}'.encode())
+
+        self.client.force_login(self.user)
+        hoy = timezone.localdate().strftime('%Y-%m-%d')
+        response = self.client.get(reverse('exportar_facturas'), {'fecha_inicio': hoy, 'fecha_fin': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse('exportar_facturas'), {'fecha_inicio': hoy, 'fecha_fin': hoy})
+        self.assertEqual(response['X-Facturas-Total'], '2')
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archivo:
+            self.assertEqual(
+                {nombre: archivo.read(nombre) for nombre in archivo.namelist()},
+                {f'Factura_Pettisso_F-1_{self.factura.pk}.pdf': b'%PDF F-1', f'Factura_Pettisso_F-2_{otra.pk}.pdf': b'%PDF F-2'},
+            )
+
+    def test_la_cache_distingue_el_renderizador(self):
+        factura = Factura.objects.get(pk=self.factura.pk)
+        productos = list(factura.facturaproducto_set.all())
+        self.assertNotEqual(ruta_pdf_factura(factura, productos, renderizador='wkhtmltopdf'),
+                            ruta_pdf_factura(factura, productos, renderizador='pillow'))
+        with self.assertRaises(ImproperlyConfigured):
+            obtener_renderizador('desconocido')
+
+    @override_settings(FACTURAS_PDF_RENDERIZADOR='pillow')
+    def test_previsualizacion_con_renderizador_en_proceso(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('previsualizar_factura', args=[self.factura.pk]))
+        pdf = b''.join(response.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(pdf.count(b'/Type /Page\n'), 1)
+        self.assertTrue(self.ruta_actual().exists())
+
+    def test_renderizador_pillow_reparte_las_lineas_en_paginas(self):
+        FacturaProducto.objects.bulk_create(
+            FacturaProducto(factura=self.factura, descripcion=f'Pieza {i}', cantidad=Decimal('1.000'),
+                            precio_kg=Decimal('10.00'), total_neto=Decimal('10.00'), iva=Decimal('1.00'),
+                            total=Decimal('11.00'))
+            for i in range(60)
+        )
+        factura = Factura.objects.select_related('cliente').get(pk=self.factura.pk)
+        pdf = RenderizadorPillow().renderizar(factura, list(factura.facturaproducto_set.all()))
+        self.assertGreater(pdf.count(b'/Type /Page\n'), 1)
+
+
+# Listas de la carnicería paginadas por (fecha, id) con el botón "Cargar más"
+@override_settings(CARNICERIA_TAMANO_PAGINA=2)
+class ListasPaginadasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+        # Cinco ventas en tres días: varias comparten fecha y solo el id las desempata
+        cls.fechas = [datetime(2024, 3, 1), datetime(2024, 3, 1), datetime(2024, 3, 2), datetime(2024, 3, 2), datetime(2024, 3, 3)]
+        cls.ventas = [Venta.objects.create(fecha=timezone.make_aware(fecha), total=Decimal('10.00')) for fecha in cls.fechas]
+        cls.rango = {'fecha_inicio': '2024-03-01', 'fecha_fin': '2024-03-31'}
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_el_cursor_recorre_todas_las_filas_sin_repetir(self):
+        vistas, cursor = [], None
+        while True:
+            filas, cursor = pagina_keyset(Venta.objects.all(), 'fecha', cursor)
+            vistas.extend(filas)
+            if not cursor:
+                break
+        esperadas = sorted(self.ventas, key=lambda venta: (venta.fecha, venta.id), reverse=True)
+        self.assertEqual([venta.id for venta in vistas], [venta.id for venta in esperadas])
+
+    def test_la_lista_solo_carga_la_primera_pagina(self):
+        response = self.client.get(reverse('lista_ventas'), self.rango)
+        self.assertEqual(len(response.context['ventas']), 2)
+        self.assertTrue(response.context['cursor_ventas'])
+        self.assertContains(response, 'data-tabla="ventas"')
+
+    def test_cargar_mas_devuelve_las_filas_siguientes_en_json(self):
+        cursor = self.client.get(reverse('lista_ventas'), self.rango).context['cursor_ventas']
+        ids = []
+        while cursor:
+            datos = self.client.get(reverse('lista_ventas'), {**self.rango, 'tabla': 'ventas', 'cursor': cursor}).json()
+            self.assertTrue(datos['success'])
+            ids += [int(i) for i in re.findall(r'id="venta-(\d+)"', datos['html'])]
+            cursor = datos['cursor']
+        self.assertEqual(len(ids), 3)
+        self.assertEqual(ids, [venta.id for venta in sorted(self.ventas[:3], key=lambda v: (v.fecha, v.id), reverse=True)])
+
+    def test_cursor_o_tabla_no_validos_devuelven_400(self):
+        url = reverse('lista_ventas')
+        self.assertEqual(self.client.get(url, {'tabla': 'ventas', 'cursor': 'no-es-un-cursor'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'tabla': 'compras', 'cursor': ''}).status_code, 400)
+
+    def test_fechas_no_validas_usan_la_semana_actual(self):
+        response = self.client.get(reverse('lista_ventas'), {'fecha_inicio': '2024-13-01', 'fecha_fin': 'mañana'})
+        self.assertEqual(list(response.context['ventas']), [])
+        lunes = timezone.localdate() - timedelta(days=timezone.localdate().weekday())
+        self.assertEqual(response.context['fecha_inicio'], lunes.strftime('%Y-%m-%d'))
+
+    def test_tablas_de_una_misma_lista_se_paginan_por_separado(self):
+        for dia in range(1, 4):
+            Capital.objects.create(fecha=timezone.make_aware(datetime(2024, 3, dia)), tipo_ingreso='TA', total=Decimal('5.00'))
+        Capital.objects.create(fecha=timezone.make_aware(datetime(2024, 3, 1)), tipo_ingreso='EF', total=Decimal('5.00'))
+        response = self.client.get(reverse('lista_capital'), self.rango)
+        self.assertEqual(len(response.context['tarjetas']), 2)
+        self.assertEqual(len(response.context['capitales']), 1)
+        self.assertIsNone(response.context['cursor_capitales'])
+        datos = self.client.get(reverse('lista_capital'), {**self.rango, 'tabla': 'tarjetas',
+                                                         'cursor': response.context['cursor_tarjetas']}).json()
+        self.assertEqual(datos['filas'], 1)
+        self.assertIsNone(datos['cursor'])
+
+    def test_clientes_en_orden_alfabetico(self):
+        for i, nombre in enumerate(['Carmen', 'Alberto', 'Beatriz']):
+            Cliente.objects.create(nombre=nombre, codigo=f'C{i}', direccion='Calle Mayor 1', cif_dni=f'B{i}')
+        response = self.client.get(reverse('lista_clientes'))
+        self.assertEqual([cliente.nombre for cliente in response.context['clientes']], ['Alberto', 'Beatriz'])
+        datos = self.client.get(reverse('lista_clientes'), {'tabla': 'clientes', 'cursor': response.context['cursor_clientes']}).json()
+        self.assertIn('Carmen', datos['html'])
+        self.assertIsNone(datos['cursor'])
+
+
+# Autocompletado de clientes en las facturas
+@override_settings(CLIENTES_BUSQUEDA_MAX=5)
+class BusquedaClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+        cls.carniceria = Cliente.objects.create(nombre='Carnicería Ruiz', codigo='MAY-001', direccion='Calle Mayor 1', cif_dni='B11111111')
+        cls.asador = Cliente.objects.create(nombre='Asador del Ruiz', codigo='MAY-002', direccion='Calle Mayor 2', cif_dni='B22222222')
+        for i in range(10):
+            Cliente.objects.create(nombre=f'Restaurante {i}', codigo=f'RES-{i:03}', direccion='Calle Real', cif_dni=f'A{i:08}')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_primero_los_que_empiezan_por_el_texto(self):
+        Cliente.objects.create(nombre='Ruiz e Hijos', codigo='ZZZ-1', direccion='Calle Real', cif_dni='C33333333')
+        clientes = buscar_clientes('ruiz')
+        self.assertEqual([cliente.nombre for cliente in clientes], ['Ruiz e Hijos', 'Asador del Ruiz', 'Carnicería Ruiz'])
+
+    def test_busca_en_codigo_y_cif_sin_distinguir_mayusculas(self):
+        self.assertEqual(buscar_clientes('may-002'), [self.asador])
+        self.assertEqual(buscar_clientes('b1111'), [self.carniceria])
+
+    def test_sin_distinguir_tildes_ni_mayusculas(self):
+        alvarez = Cliente.objects.create(nombre='ÁLVAREZ SL', codigo='ALV-1', direccion='Calle Real', cif_dni='D44444444')
+        self.assertEqual(buscar_clientes('álv'), [alvarez])
+        self.assertEqual(buscar_clientes('alv'), [alvarez])
+        self.assertEqual(buscar_clientes('carniceria'), [self.carniceria])
+
+        alvarez.nombre = 'Ñandú Álvarez'
+        alvarez.save(update_fields=['nombre'])
+        self.assertEqual(buscar_clientes('ÑAND'), [alvarez])
+        self.assertEqual(buscar_clientes('varez'), [alvarez])
+
+    def test_resultados_limitados(self):
+        self.assertEqual(len(buscar_clientes('res', limite=100)), 5)
+        self.assertEqual(len(buscar_clientes('res', limite=2)), 2)
+        self.assertEqual(buscar_clientes('   '), [])
+
+    def test_vista_devuelve_los_clientes_en_json(self):
+        datos = self.client.get(reverse('buscar_clientes'), {'q': 'MAY-001'}).json()
+        self.assertEqual(datos, {'success': True, 'clientes': [self.carniceria.to_dict()]})
+        self.assertEqual(self.client.get(reverse('buscar_clientes'), {'q': 'a', 'limite': 'x'}).status_code, 400)
+        for limite in ('-5', '0'):
+            self.assertEqual(self.client.get(reverse('buscar_clientes'), {'q': 'a', 'limite': limite}).status_code, 400)
+
+    def test_formulario_de_factura_no_carga_todos_los_clientes(self):
+        response = self.client.get(reverse('crear_factura'))
+        self.assertNotContains(response, '<option')
+        self.assertNotContains(response, 'RES-000')
+        self.assertContains(response, reverse('buscar_clientes'))
+
+    def test_editar_factura_muestra_el_cliente_elegido(self):
+        factura = Factura.objects.create(cliente=self.asador, numero_factura='F-1')
+        response = self.client.get(reverse('editar_factura', args=[factura.pk]))
+        self.assertContains(response, f'value="{self.asador.pk}"')
+        self.assertContains(response, 'MAY-002 - Asador del Ruiz')
+        self.assertNotContains(response, 'RES-000')
+
+    def test_lista_de_clientes_filtra_por_texto(self):
+        response = self.client.get(reverse('lista_clientes'), {'q': 'ruiz'})
+        self.assertEqual({cliente.pk for cliente in response.context['clientes']}, {self.carniceria.pk, self.asador.pk})
+
+
+################ ÍNDICES ################
+# Las consultas principales de las vistas por rango de fechas deben usar un índice (EXPLAIN QUERY PLAN)
+class PlanesConsultaTests(TestCase):
+
+    # Tablas que crecen cada día y se filtran por fecha: nunca deben recorrerse enteras
+    TABLAS_POR_FECHA = {
+        'base_pedido', 'base_gasto', 'base_resumenventas', 'base_venta', 'base_facturasiva', 'base_facturatienda',
+        'base_gastostienda', 'base_gastospersonales', 'base_pagosbanco', 'base_capital', 'base_factura',
+        'base_resumencarniceria',
+    }
+    RANGO = {'fecha_inicio': '2024-01-01', 'fecha_fin': '2024-01-31'}
+
+    @classmethod
+    def setUpTestData(cls):
+        producto = Producto.objects.create(nombre='Pollo asado', categoria='principal', precio=Decimal('10.00'))
+        cliente = Cliente.objects.create(nombre='Restaurante', codigo='C001', direccion='Calle Mayor 1', cif_dni='B12345678')
+        for dia in range(1, 61):
+            fecha = datetime(2024, 1, 1).date() + timedelta(days=dia)
+            pedido = Pedido.objects.create(nombre_cliente=f'Cliente {dia}', fecha_hora=timezone.make_aware(
+                datetime.combine(fecha, datetime.min.time()).replace(hour=13)))
+            PedidoProducto.objects.create(pedido=pedido, producto=producto, cantidad=1)
+            Gasto.objects.create(descripcion='Carbón', monto=Decimal('5.00'), fecha=fecha)
+            Venta.objects.create(fecha=fecha, total=Decimal('100.00'))
+            FacturasIVA.objects.create(proveedor='Proveedor', numero_factura=str(dia), fecha=fecha, total=Decimal('20.00'))
+            FacturaTienda.objects.create(proveedor='Proveedor', fecha=fecha, total=Decimal('10.00'))
+            GastosTienda.objects.create(fecha=fecha, gasto='Luz', total=Decimal('3.00'))
+            GastosPersonales.objects.create(fecha=fecha, gasto='Comida', total=Decimal('2.00'))
+            PagosBanco.objects.create(fecha=fecha, concepto='Préstamo', total=Decimal('4.00'))
+            Capital.objects.create(fecha=fecha, tipo_ingreso='TA' if dia % 2 else 'EF', total=Decimal('50.00'))
+            factura = Factura.objects.create(cliente=cliente, numero_factura=f'F-{dia}')
+            Factura.objects.filter(pk=factura.pk).update(fecha_emision=fecha)
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+
+    def planes(self, nombre_url, parametros):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(reverse(nombre_url), parametros).status_code, 200)
+        planes = []
+        with connection.cursor() as cursor:
+            for consulta in consultas.captured_queries:
+                if consulta['sql'].startswith('SELECT'):
+                    cursor.execute(f'EXPLAIN QUERY PLAN {consulta["sql"]}')
+                    planes.append((consulta['sql'], [fila[3] for fila in cursor.fetchall()]))
+        return planes
+
+    def test_ninguna_vista_recorre_entera_una_tabla_por_fecha(self):
+        vistas = [
+            ('lista_pedidos', {'fecha': '2024-01-05'}), ('lista_gastos', self.RANGO), ('balance_asador', self.RANGO),
+            ('balance_asador_datos', self.RANGO), ('lista_ventas', self.RANGO), ('lista_compras', self.RANGO),
+            ('lista_gastos_pagos_tienda', self.RANGO), ('lista_capital', self.RANGO), ('lista_facturas', self.RANGO),
+            ('balance_carniceria', self.RANGO),
+        ]
+        for nombre_url, parametros in vistas:
+            with self.subTest(vista=nombre_url):
+                planes = self.planes(nombre_url, parametros)
+                tablas_usadas = set()
+                for sql, plan in planes:
+                    for paso in plan:
+                        tabla = re.match(r'(?:SCAN|SEARCH) (\w+)', paso)
+                        if tabla and tabla.group(1) in self.TABLAS_POR_FECHA:
+                            tablas_usadas.add(tabla.group(1))
+                            self.assertFalse(paso.startswith('SCAN'), f'{paso}\n{sql}')
+                self.assertTrue(tablas_usadas, f'{nombre_url} no consulta ninguna tabla por fecha')
+
+    @override_settings(CARNICERIA_TAMANO_PAGINA=10)
+    def test_la_pagina_siguiente_usa_el_indice(self):
+        self.client.force_login(self.user)
+        cursor = self.client.get(reverse('lista_ventas'), self.RANGO).context['cursor_ventas']
+        planes = self.planes('lista_ventas', {**self.RANGO, 'tabla': 'ventas', 'cursor': cursor})
+        pasos = [paso for _, plan in planes for paso in plan if 'base_venta' in paso]
+        self.assertTrue(pasos)
+        self.assertTrue(all('venta_fecha_idx' in paso for paso in pasos), pasos)
+
+    def test_busqueda_de_clientes_por_prefijo_usa_los_indices(self):
+        sql, parametros = por_prefijo('res').order_by('nombre', 'id')[:20].query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', parametros)
+            plan = [fila[3] for fila in cursor.fetchall()]
+        for indice in ('cliente_codigo_busqueda_idx', 'cliente_nombre_busqueda_idx', 'cliente_cif_dni_busqueda_idx'):
+            self.assertTrue(any(indice in paso for paso in plan), plan)
+        self.assertFalse(any(paso.startswith('SCAN base_cliente') for paso in plan), plan)
+
+    def test_tarjetas_usan_el_indice_compuesto(self):
+        planes = self.planes('lista_capital', self.RANGO)
+        self.assertTrue(any('capital_tipo_fecha_idx' in paso for _, plan in planes for paso in plan))
+
+
+################ BASE DE DATOS ################
+# PRAGMAs que se aplican a cada conexión SQLite nueva
+class ConexionSqliteTests(TestCase):
+
+    def pragmas(self, **ajustes):
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(**ajustes):
+            conexion = connections['default'].__class__({**connection.settings_dict, 'NAME': str(Path(carpeta) / 'prueba.sqlite3')}, 'prueba')
+            try:
+                with conexion.cursor() as cursor:
+                    valores = {}
+                    for pragma in ('journal_mode', 'busy_timeout', 'synchronous', 'mmap_size'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        valores[pragma] = cursor.fetchone()[0]
+                    return valores
+            finally:
+                conexion.close()
+
+    def test_conexion_nueva_en_modo_wal(self):
+        self.assertEqual(self.pragmas(), {'journal_mode': 'wal', 'busy_timeout': 5000, 'synchronous': 1,
+                                          'mmap_size': 256 * 1024 * 1024})
+
+    def test_sin_pragmas_usa_los_valores_de_sqlite(self):
+        valores = self.pragmas(SQLITE_PRAGMAS={})
+        self.assertEqual(valores['journal_mode'], 'delete')
+        self.assertEqual(valores['synchronous'], 2)  # FULL
+
+    def test_conexiones_persistentes_con_comprobacion(self):
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], settings.DB_CONN_MAX_AGE)
+        self.assertTrue(connection.settings_dict['CONN_HEALTH_CHECKS'])
+
+
+################ ARRANQUE ################
+# Arranque en frío de un worker con la configuración de producción (proceso nuevo: importación y primera petición)
+class ArranqueProduccionTests(SimpleTestCase):
+    # Los tiempos de arranque no se comprueban aquí (dependen de la máquina): benchmark_arranque --presupuesto-ms
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.carpeta = tempfile.TemporaryDirectory()
+        cls.entorno = {'STATIC_ROOT': str(Path(cls.carpeta.name) / 'static'), 'DB_NOMBRE': str(Path(cls.carpeta.name) / 'db.sqlite3')}
+        recopilar_estaticos('pettisso.settings_produccion', cls.entorno['STATIC_ROOT'])
+        cls.medida = medir_arranque('pettisso.settings_produccion', cls.entorno)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.carpeta.cleanup()
+        super().tearDownClass()
+
+    def test_primera_peticion_responde(self):
+        self.assertEqual(self.medida['estado'], '200 OK')
+
+    def test_sin_barra_de_depuracion(self):
+        self.assertFalse(self.medida['barra_depuracion'])
+
+    def test_estaticos_con_hash_en_el_nombre(self):
+        with override_settings(STATIC_ROOT=self.entorno['STATIC_ROOT'], STORAGES={
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'}}):
+            from django.contrib.staticfiles.storage import staticfiles_storage
+            self.assertRegex(staticfiles_storage.url('styles/login.css'), r'styles/login\.[0-9a-f]{12}\.css$')
+
+
+# collectstatic de producción: PNG optimizados, copias .gz y el middleware que las sirve con caché larga
+class EstaticosComprimidosTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.carpeta = tempfile.TemporaryDirectory()
+        cls.raiz = Path(cls.carpeta.name)
+        cls.ajustes = override_settings(STATIC_ROOT=str(cls.raiz), ESTATICOS_MAX_AGE=31536000, STORAGES={
+            **settings.STORAGES, 'staticfiles': {'BACKEND': 'base.storage.EstaticosComprimidosStorage'}})
+        cls.ajustes.enable()
+        call_command('collectstatic', '--noinput', verbosity=0)
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        cls.login_css = staticfiles_storage.stored_name('styles/login.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        cls.carpeta.cleanup()
+        super().tearDownClass()
+
+    def pedir(self, nombre, **cabeceras):
+        middleware = EstaticosMiddleware(lambda request: HttpResponse(status=404))
+        response = middleware(RequestFactory().get(settings.STATIC_URL + nombre, headers=cabeceras))
+        if hasattr(response, 'streaming_content'):
+            response.contenido = b''.join(response.streaming_content)
+            response.close()
+        return response
+
+    def test_copia_gz_del_css_con_hash(self):
+        original = (self.raiz / self.login_css).read_bytes()
+        comprimido = (self.raiz / (self.login_css + '.gz')).read_bytes()
+        self.assertEqual(gzip.decompress(comprimido), original)
+        self.assertLess(len(comprimido), len(original))
+
+    def test_png_optimizados_no_crecen(self):
+        for png in (settings.BASE_DIR / 'base' / 'static').rglob('*.png'):
+            recopilado = self.raiz / png.relative_to(settings.BASE_DIR / 'base' / 'static')
+            self.assertLessEqual(recopilado.stat().st_size, png.stat().st_size, png.name)
+
+    def test_sirve_gzip_con_cache_de_un_ano(self):
+        response = self.pedir(self.login_css, accept_encoding='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(gzip.decompress(response.contenido), (self.raiz / self.login_css).read_bytes())
+
+    def test_sin_accept_encoding_sirve_el_original(self):
+        response = self.pedir(self.login_css)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.contenido, (self.raiz / self.login_css).read_bytes())
+
+    def test_accept_encoding_por_codificaciones_y_pesos(self):
+        self.assertEqual(codificaciones_aceptadas('gzip;q=0.5, BR ; q=0, x-gzip, *;q=0.1, deflate;q=no'),
+                         {'gzip': 0.5, 'br': 0.0, 'x-gzip': 1.0, '*': 0.1, 'deflate': 0.0})
+        # br;q=0 en las que aceptarían br, para no depender de que esté instalado brotli
+        for cabecera, codificacion in (('gzip;q=0', None), ('x-gzip', None), ('gzip;q=0.5, br;q=0', 'gzip'),
+                                       ('identity, br;q=0, *;q=0.3', 'gzip'), ('br;q=0, *, gzip;q=0', None)):
+            response = self.pedir(self.login_css, accept_encoding=cabecera)
+            self.assertEqual(response.get('Content-Encoding'), codificacion, cabecera)
+
+    def test_nombre_sin_hash_se_revalida(self):
+        response = self.pedir('styles/login.css')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+        response = self.pedir('styles/login.css', if_modified_since=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_no_sale_de_static_root(self):
+        self.assertEqual(self.pedir('../' * 5 + 'etc/passwd').status_code, 404)
+        self.assertEqual(self.pedir('styles/no-existe.css').status_code, 404)
+
+
+################ MÉTRICAS ################
+class MetricasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('encargado', password='clave-segura-123')
+        cls.personal = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+
+    def setUp(self):
+        registro.reiniciar()
+
+    def test_registra_la_peticion_por_nombre_de_url(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('lista_pedidos')).status_code, 200)
+
+        metricas = registro.vistas['lista_pedidos']
+        self.assertEqual(dict(metricas.peticiones), {('GET', 200): 1})
+        self.assertEqual(metricas.segundos.total, 1)
+        self.assertGreater(metricas.consultas.suma, 0)
+        self.assertGreater(metricas.segundos_bd.suma, 0)
+        self.assertGreater(metricas.bytes.suma, 0)
+
+    def test_histograma_acumulado(self):
+        histograma = Histograma((1, 5, 10))
+        for valor in (0.5, 1, 3, 7, 50):
+            histograma.sumar(valor)
+        self.assertEqual(histograma.acumulado(), [(1, 2), (5, 3), (10, 4), ('+Inf', 5)])
+        self.assertEqual(histograma.suma, 61.5)
+
+    def test_endpoint_prometheus_solo_para_el_personal(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('lista_pedidos'))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+
+        self.client.force_login(self.personal)
+        response = self.client.get(reverse('metricas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('pettisso_peticiones_total{vista="lista_pedidos",metodo="GET",estado="200"} 1\n', texto)
+        self.assertIn('pettisso_peticion_segundos_bucket{vista="lista_pedidos",le="+Inf"} 1\n', texto)
+        self.assertIn('# TYPE pettisso_consultas histogram', texto)
+
+    async def test_modo_asincrono_mide_las_consultas_de_otros_hilos(self):
+        async def vista(request):
+            await sync_to_async(lambda: list(User.objects.all()))()
+            return HttpResponse('hola')
+
+        middleware = MetricasMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/'))
+        self.assertEqual(response.content, b'hola')
+
+        metricas = registro.vistas['<sin resolver>']
+        self.assertEqual((metricas.segundos.total, metricas.consultas.suma, metricas.bytes.suma), (1, 1, 4))
+
+    def test_respuestas_en_streaming_no_se_miden(self):
+        middleware = MetricasMiddleware(lambda request: StreamingHttpResponse(iter([b'evento'])))
+        self.assertFalse(iscoroutinefunction(middleware))
+        middleware(RequestFactory().get('/'))
+        self.assertEqual(registro.vistas, {})
+
+    @override_settings(METRICAS_UMBRAL_LENTO_MS=0)
+    def test_peticion_lenta_en_el_log(self):
+        self.client.force_login(self.user)
+        with self.assertLogs('base.metricas', 'WARNING') as log:
+            self.client.get(reverse('lista_pedidos'))
+        linea = json.loads(log.records[0].getMessage())
+        self.assertEqual((linea['evento'], linea['vista'], linea['estado']), ('peticion_lenta', 'lista_pedidos', 200))
+        self.assertGreater(linea['consultas'], 0)
+
+
+################ DATOS SINTÉTICOS ################
+class DatosSinteticosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hasta = timezone.localdate()
+        cls.creadas = generar_datos_sinteticos(dias=21, escala=0.3, semilla=7, hasta=cls.hasta)
+
+    def test_genera_todos_los_movimientos(self):
+        for modelo in (Pedido, PedidoProducto, PedidoMenu, Factura, FacturaProducto, Cliente, Venta, FacturasIVA,
+                       FacturaTienda, GastosTienda, Capital, Gasto):
+            self.assertGreater(modelo.objects.count(), 0, modelo.__name__)
+            self.assertEqual(modelo.objects.count(), self.creadas[modelo.__name__], modelo.__name__)
+        self.assertEqual(Venta.objects.count(), 21)
+        self.assertTrue(Inventario.objects.exists())
+
+    def test_resumenes_y_totales_reconstruidos(self):
+        self.assertEqual(ResumenVentas.objects.aggregate(total=Sum('numero_pedidos'))['total'], Pedido.objects.count())
+        self.assertEqual(ResumenCarniceria.objects.aggregate(total=Sum('ventas'))['total'],
+                         Venta.objects.aggregate(total=Sum('total'))['total'])
+        factura = Factura.objects.order_by('id').first()
+        self.assertEqual(factura.total, factura.facturaproducto_set.aggregate(total=Sum('total'))['total'])
+
+    def test_la_numeracion_sigue_en_el_contador(self):
+        ultima = Factura.objects.filter(ejercicio=self.hasta.year).order_by('-numero').first()
+        self.assertEqual(ContadorFactura.objects.get(serie='F', ejercicio=self.hasta.year).ultimo, ultima.numero)
+        nueva = Factura.objects.create(cliente=Cliente.objects.first())
+        self.assertEqual(nueva.numero, ultima.numero + 1)
+
+    def test_clientes_nuevos_siguen_al_mayor_codigo(self):
+        # Hay menos clientes que el mayor código: contar los clientes repetiría C000500
+        Cliente.objects.create(nombre='Cliente antiguo', codigo='C000500', direccion='Calle Mayor 1', cif_dni='X0000000T')
+        clientes = generar_clientes(random.Random(1), 2)
+        self.assertEqual([cliente.codigo for cliente in clientes], ['C000501', 'C000502'])
+
+    def test_percentil_95_interpolado(self):
+        self.assertEqual(percentil_95([float(ms) for ms in range(10, 0, -1)]), 9.55)
+        self.assertEqual(percentil_95([3.0]), 3.0)
+
+    def test_benchmark_de_todas_las_vistas(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            salida = Path(carpeta) / 'vistas.json'
+            call_command('benchmark_vistas', repeticiones=1, salida=str(salida), stdout=io.StringIO())
+            referencia = json.loads(salida.read_text(encoding='utf-8'))
+
+            self.assertIn('lista_pedidos', referencia['vistas'])
+            self.assertIn('previsualizar_factura', referencia['vistas'])
+            for nombre, medida in referencia['vistas'].items():
+                self.assertEqual(medida['estado'], 200, nombre)
+                self.assertLessEqual(medida['p50_ms'], medida['p95_ms'], nombre)
+            self.assertFalse(User.objects.filter(username='benchmark-vistas').exists())
+
+            # Una referencia con menos consultas hace fallar la comparación
+            referencia['vistas']['lista_pedidos']['consultas'] = 0
+            (Path(carpeta) / 'anterior.json').write_text(json.dumps(referencia), encoding='utf-8')
+            with self.assertRaisesMessage(CommandError, 'lista_pedidos'):
+                call_command('benchmark_vistas', repeticiones=1, vistas=['lista_pedidos'], salida=str(salida),
+                             comparar=str(Path(carpeta) / 'anterior.json'), stdout=io.StringIO())
@@ -1,14 +1,17 @@
+from django.conf import settings
 from django.urls import path
 from .views.home_views import home
-from debug_toolbar.toolbar import debug_toolbar_urls
 from django.contrib.auth import views as auth_views
-from django.urls import path
 
 # Importa las vistas de los archivos correspondientes
 from .views.asador.pedidos_views import (
     PedidoListView,
     PedidoCreateView,
     PedidoUpdateView,
+    IntervalosPedidosView,
+    PedidoLoteView,
+    TableroEventosView,
+    TableroCambiosView,
 )
 
 from .views.asador.productos_views import (
@@ -37,6 +40,7 @@ from .views.asador.gastos_views import (
 
 from .views.asador.balance_views import (
     BalanceAsadorView,
+    BalanceAsadorDatosView,
 )
 
 from .views.carniceria.ventas_views import (
@@ -73,6 +77,7 @@ from .views.carniceria.clientes_views import (
     ClienteListView,
     ClienteCreateView,
     ClienteUpdateView,
+    ClienteBusquedaView,
 )
 
 from .views.carniceria.facturas_views import (
@@ -80,12 +85,15 @@ from .views.carniceria.facturas_views import (
     FacturaCreateView,
     FacturaUpdateView,
     FacturaPreviewView,
+    FacturaExportarView,
 )
 
 from .views.carniceria.balance_carniceria_views import (
     BalanceCarniceriaView,
 )
 
+from .views.metricas_views import MetricasView
+
 urlpatterns = [
     # Ruta para el login y logout
     path('login/', auth_views.LoginView.as_view(template_name='login/login.html'), name='login'),
@@ -99,6 +107,10 @@ urlpatterns = [
     path('pedidos/', PedidoListView.as_view(), name='lista_pedidos'),
     path('pedidos/nuevo/', PedidoCreateView.as_view(), name='crear_pedido'),
     path('pedidos/<int:pk>/editar/', PedidoUpdateView.as_view(), name='editar_pedido'),
+    path('pedidos/intervalos/', IntervalosPedidosView.as_view(), name='intervalos_pedidos'),
+    path('pedidos/lote/', PedidoLoteView.as_view(), name='lote_pedidos'),
+    path('pedidos/eventos/', TableroEventosView.as_view(), name='eventos_pedidos'),  # Tablero en vivo (ASGI)
+    path('pedidos/cambios/', TableroCambiosView.as_view(), name='cambios_pedidos'),  # Tablero en vivo (sondeo)
 
     # Rutas para Productos
     path('productos/', ProductoListView.as_view(), name='lista_productos'),
@@ -122,6 +134,7 @@ urlpatterns = [
 
     # Ruta para Balance
     path('balance/asador/', BalanceAsadorView.as_view(), name='balance_asador'),
+    path('balance/asador/datos/', BalanceAsadorDatosView.as_view(), name='balance_asador_datos'),
 
     ## RUTAS CARNICERIA ##
     # Rutas para Ventas
@@ -154,14 +167,24 @@ urlpatterns = [
     path('clientes/', ClienteListView.as_view(), name='lista_clientes'),
     path('clientes/nuevo/', ClienteCreateView.as_view(), name='crear_cliente'),
     path('clientes/<int:pk>/editar/', ClienteUpdateView.as_view(), name='editar_cliente'),
+    path('clientes/buscar/', ClienteBusquedaView.as_view(), name='buscar_clientes'),
 
     # Ruta para facturas
     path('facturas/', FacturaListView.as_view(), name='lista_facturas'),
     path('factura/nuevo/', FacturaCreateView.as_view(), name='crear_factura'),
     path('factura/<int:pk>/editar/', FacturaUpdateView.as_view(), name='editar_factura'),
     path('factura/<int:pk>/previsualizar/', FacturaPreviewView.as_view(), name='previsualizar_factura'),
+    path('facturas/exportar/', FacturaExportarView.as_view(), name='exportar_facturas'),
 
     # Ruta para balance carniceria
     path('balance/carniceria/', BalanceCarniceriaView.as_view(), name='balance_carniceria'),
 
-] + debug_toolbar_urls()
+    # Métricas de las vistas en formato Prometheus (solo personal)
+    path('metricas/', MetricasView.as_view(), name='metricas'),
+
+]
+
+# URLs de la barra de depuración solo si está instalada (la configuración de producción no la carga)
+if 'debug_toolbar' in settings.INSTALLED_APPS:
+    from debug_toolbar.toolbar import debug_toolbar_urls
+    urlpatterns += debug_toolbar_urls()
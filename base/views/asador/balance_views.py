@@ -1,11 +1,8 @@
-import json
-
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.views import View
-from base.models import Gasto, ResumenVentas
-from django.db.models import Sum
-from decimal import Decimal
+from base.services.balance_service import AGRUPACIONES, serie_asador, totales_asador
 
 class BalanceAsadorView(LoginRequiredMixin, View):
     # Configuración de LoginRequiredMixin
@@ -16,47 +13,48 @@ class BalanceAsadorView(LoginRequiredMixin, View):
         fecha_inicio = request.GET.get('fecha_inicio')
         fecha_fin = request.GET.get('fecha_fin')
 
-        # Filtrar las ventas según las fechas seleccionadas
-        if fecha_inicio and fecha_fin:
-            resumen_ventas = ResumenVentas.objects.filter(fecha__range=[fecha_inicio, fecha_fin]).order_by('fecha')
-            gastos = Gasto.objects.filter(fecha__range=[fecha_inicio, fecha_fin]).order_by('fecha')
-        else:
-            resumen_ventas = ResumenVentas.objects.all().order_by('fecha')
-            gastos = Gasto.objects.all().order_by('fecha')
-
-        # Convertir los QuerySets a listas de diccionarios y formatear fechas
-        resumen_ventas_list = list(resumen_ventas.values())
-        for item in resumen_ventas_list:
-            item['fecha'] = item['fecha'].strftime('%Y-%m-%d')  # Convertir a cadena
-            item['total_ventas'] = float(item['total_ventas'])  # Convertir a float
-            item['total_pollos'] = float(item['total_pollos'])  # Convertir a float
-            item['total_cachopos'] = float(item['total_cachopos'])  # Convertir a float
-
-        gastos_list = list(gastos.values())
-        for item in gastos_list:
-            item['fecha'] = item['fecha'].strftime('%Y-%m-%d')  # Convertir a cadena
-            item['monto'] = float(item['monto'])  # Convertir a float
-
-        # Calcular totales
-        total_ventas = resumen_ventas.aggregate(Sum('total_ventas'))['total_ventas__sum'] or Decimal('0.00')
-        numero_pedidos = resumen_ventas.aggregate(Sum('numero_pedidos'))['numero_pedidos__sum'] or 0
-        total_pollos = resumen_ventas.aggregate(Sum('total_pollos'))['total_pollos__sum'] or Decimal('0.00')
-        total_cachopos = resumen_ventas.aggregate(Sum('total_cachopos'))['total_cachopos__sum'] or 0
-
-        # Obtener total de los gastos
-        total_gastos = gastos.aggregate(Sum('monto'))['monto__sum'] or Decimal('0.00')
-
-        # Calcular beneficios
-        total_beneficios = total_ventas - total_gastos
+        # Solo los totales: la evolución la pide el gráfico a BalanceAsadorDatosView
+        totales = totales_asador(fecha_inicio, fecha_fin)
 
         context = {
-            'resumen_ventas': json.dumps(resumen_ventas_list),  # Lista de registros detallados de ventas
-            'gastos': json.dumps(gastos_list),  # Lista de registros detallados de gastos
-            'total_ventas': total_ventas,
-            'total_gastos': total_gastos,
-            'total_beneficios': total_beneficios,
-            'numero_pedidos': numero_pedidos,
-            'total_pollos': total_pollos,
-            'total_cachopos': total_cachopos,
+            'total_ventas': totales['ventas'],
+            'total_gastos': totales['gastos'],
+            'total_beneficios': totales['beneficios'],
+            'numero_pedidos': totales['pedidos'],
+            'total_pollos': totales['pollos'],
+            'total_cachopos': totales['cachopos'],
         }
         return render(request, 'asador/balance/balance.html', context)
+
+
+# Datos del gráfico de evolución: agrupados por día, semana o mes en SQL y con un número máximo de puntos
+class BalanceAsadorDatosView(LoginRequiredMixin, View):
+    # Configuración de LoginRequiredMixin
+    login_url = 'login'
+    redirect_field_name = None
+
+    def get(self, request):
+        fecha_inicio = request.GET.get('fecha_inicio')
+        fecha_fin = request.GET.get('fecha_fin')
+        agrupacion = request.GET.get('agrupacion')
+        if agrupacion not in AGRUPACIONES:
+            agrupacion = None  # Elegir según el rango de fechas
+        try:
+            max_puntos = max(int(request.GET.get('puntos', 0)), 0)
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Número de puntos no válido.'}, status=400)
+
+        totales = totales_asador(fecha_inicio, fecha_fin)
+        agrupacion, recortada, serie = serie_asador(totales, agrupacion, max_puntos)
+
+        return JsonResponse({
+            'success': True,
+            'agrupacion': agrupacion,
+            'recortada': recortada,  # Hay datos más antiguos que no caben en el gráfico
+            'serie': [{
+                'periodo': item['periodo'].strftime('%Y-%m-%d'),
+                'ventas': float(item['ventas']),
+                'gastos': float(item['gastos']),
+                'beneficios': float(item['beneficios']),
+            } for item in serie],
+        })
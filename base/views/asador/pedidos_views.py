@@ -1,15 +1,26 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
+import asyncio
 import json
 
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import redirect, render, get_object_or_404
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView
-from django.http import JsonResponse
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from base.forms import PedidoForm
-from base.models import Inventario, Menu, Pedido, PedidoMenu, PedidoProducto, Producto, ResumenVentas
+from base.models import Menu, Pedido, PedidoMenu, PedidoProducto, Producto
+from base.services.eventos_service import cancelar_suscripcion, contadores_dia, suscribir, version_tablero
+from base.services.intervalos_service import histograma_pedidos
+from base.services.inventario_service import existencias, existencias_contador
+from base.services.lote_pedidos_service import MAXIMO_PEDIDOS_LOTE, registrar_lote_pedidos
+from base.services.pedidos_service import construir_tablero, filtrar_pedidos_dia, guardar_lineas, leer_lineas
+from base.services.resumen_service import cerrar_dia
 
 # Listar todos los pedidos
 class PedidoListView(LoginRequiredMixin, ListView):
@@ -21,63 +32,39 @@ class PedidoListView(LoginRequiredMixin, ListView):
     login_url = 'login'
     redirect_field_name = None
 
-    # Método para el cierre del día
-    def cierre_dia(self, fecha, numero_pedidos, total_pollos, total_cachopos, total_ventas, overwrite=False):
-        # Convertir la fecha a un objeto datetime en zona horaria actual
+    # Método para el cierre del día: el resumen ya se mantiene en el servidor con cada pedido
+    def cierre_dia(self, fecha, overwrite=False):
+        # Convertir la fecha a un objeto date
         try:
-            fecha_cierre = timezone.make_aware(datetime.strptime(fecha, '%Y-%m-%d')).date()
-            print(f"fecha cierre: {fecha_cierre}")
-        except ValueError:
+            fecha_cierre = datetime.strptime(fecha, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
             return JsonResponse({'success': False, 'message': 'Formato de fecha incorrecto.'})
 
-        # Verificar si ya existe un resumen para esa fecha
-        resumen_existente = ResumenVentas.objects.filter(fecha=fecha_cierre).first()
-
-        if resumen_existente and not overwrite:
+        resumen, ya_cerrado = cerrar_dia(fecha_cierre)
+        if ya_cerrado and not overwrite:
             return JsonResponse({'success': False, 'message': 'Ya existe un resumen para la fecha señalada'})
 
-        # Si se desea sobreescribir, actualizar el resumen existente o crear uno nuevo
-        if resumen_existente:
-            resumen_existente.total_ventas = total_ventas
-            resumen_existente.numero_pedidos = numero_pedidos
-            resumen_existente.total_pollos = total_pollos
-            resumen_existente.total_cachopos = total_cachopos
-            resumen_existente.save()
-            message = 'Resumen de ventas actualizado correctamente.'
-        else:
-            # Crear un nuevo ResumenVentas
-            ResumenVentas.objects.create(
-                fecha=fecha_cierre,
-                total_ventas=total_ventas,
-                numero_pedidos=numero_pedidos,
-                total_pollos=total_pollos,
-                total_cachopos=total_cachopos
-            )
-            message = 'Cierre de día realizado correctamente.'
-
-        return JsonResponse({'success': True, 'message': message})
+        message = 'Resumen de ventas actualizado correctamente.' if ya_cerrado else 'Cierre de día realizado correctamente.'
+        return JsonResponse({
+            'success': True,
+            'message': message,
+            'resumen': {
+                'numero_pedidos': resumen.numero_pedidos,
+                'total_ventas': str(resumen.total_ventas),
+                'total_pollos': str(resumen.total_pollos),
+                'total_cachopos': resumen.total_cachopos,
+            },
+        })
 
 
     # Filtro de fecha
     def get_queryset(self):
         queryset = super().get_queryset()
-        fecha = self.request.GET.get('fecha')
-        if fecha:
-            try:
-                # Convertir la fecha a un objeto datetime en zona horaria actual y sin hora
-                fecha_inicio = timezone.make_aware(datetime.strptime(fecha, '%Y-%m-%d'))
-                fecha_fin = fecha_inicio + timedelta(days=1) - timedelta(seconds=1)
-
-                # Filtrar pedidos que estén dentro del rango del día
-                queryset = queryset.filter(fecha_hora__range=(fecha_inicio, fecha_fin))
-            except ValueError:
-                print("Formato de fecha incorrecto")
-        else:
-            # Filtrar por la fecha actual en zona horaria local si no hay fecha proporcionada
-            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            end_of_today = today + timedelta(days=1) - timedelta(seconds=1)
-            queryset = queryset.filter(fecha_hora__range=(today, end_of_today))
-
+        try:
+            # Filtrar pedidos que estén dentro del día indicado (o del día actual)
+            queryset = filtrar_pedidos_dia(queryset, self.request.GET.get('fecha'))
+        except ValueError:
+            print("Formato de fecha incorrecto")
         return queryset
 
     # Total del pedido y cantidad de pedidos por intervalos horarios
@@ -87,129 +74,25 @@ class PedidoListView(LoginRequiredMixin, ListView):
         # Obtener la fecha del filtro o la fecha actual si no hay filtro
         fecha_filtro = self.request.GET.get('fecha')
         context['fecha'] = fecha_filtro or datetime.today().date().strftime('%Y-%m-%d')  # .date() para solo la parte de la fecha
-        context['pedidos'] = self.get_queryset() 
-
-        # Inicializamos el contador de pollos en el contexto
-        total_pollos = Decimal('0.0')
-        total_cachopos_ternera = Decimal('0.0')
-        total_cachopos_pollo = Decimal('0.0')
-        total_cachopos_lomo = Decimal('0.0')
-        total_cachopos_degustacion = Decimal('0.0')
-
-        # Inicializamos la variable total_ventas
-        total_ventas = 0
-
-        # Inicializamos un diccionario para contar los pedidos por intervalo
-        intervalos = [('13:00', '13:15'),('13:15', '13:30'),('13:30', '13:45'), ('13:45', '14:00'), ('14:00', '14:15'), ('14:15', '14:30'), ('14:30', '14:45'), ('14:45', '15:00'), ('15:00', '15:15'), ('15:15', '15:30')]        
-        conteo_pedidos_por_intervalo = {intervalo: 0 for intervalo in intervalos}
-
-        # Calcular el precio total por cada pedido
-        for pedido in context['pedidos']:
-            # Inicializamos el total en 0
-            total_precio = 0
-
-            # Preparar una lista para los detalles de cada pedido
-            pedido.detalles = []
-
-            # Sumar precios de productos
-            for detalle in pedido.pedidoproducto_set.all():
-                precio_detalle = detalle.cantidad * detalle.producto.precio
-                total_precio += detalle.cantidad * detalle.producto.precio
-                pedido.detalles.append({
-                    'nombre': detalle.producto.nombre,
-                    'cantidad': detalle.cantidad,
-                    'precio': precio_detalle
-                })
-                # Contar los pollos
-                if detalle.producto.nombre.lower() == 'pollo asado':
-                    total_pollos += detalle.cantidad
-                elif detalle.producto.nombre.lower() == 'medio pollo asado':
-                    total_pollos += Decimal('0.50') * detalle.cantidad 
-                elif detalle.producto.nombre.lower() == 'cachopo ternera':
-                    total_cachopos_ternera += detalle.cantidad
-                elif detalle.producto.nombre.lower() == 'cachopo pollo':
-                    total_cachopos_pollo += detalle.cantidad
-                elif detalle.producto.nombre.lower() == 'cachopo lomo':
-                    total_cachopos_lomo += detalle.cantidad
-
-            # Sumar precios de menús
-            for detalle in pedido.pedidomenu_set.all():
-                precio_detalle = detalle.cantidad * detalle.menu.precio
-                total_precio += precio_detalle
-                pedido.detalles.append({
-                    'nombre': detalle.menu.nombre,
-                    'cantidad': detalle.cantidad,
-                    'precio': precio_detalle
-                })
-                if detalle.menu.nombre.lower() == 'menú cachopo degustación':
-                    total_cachopos_degustacion += detalle.cantidad * Decimal('1.00')
-                    
-                # Contar los pollos en los menús usando MenuProducto
-                for menu_producto in detalle.menu.menuproducto_set.all():
-                    nombre_producto = menu_producto.producto.nombre.lower()
-                    # Contar los pollos
-                    if 'pollo asado' in nombre_producto:
-                        # El factor de cantidad es el número de menús, multiplicado por la cantidad de cada producto en el menú
-                        if 'medio pollo' in nombre_producto:
-                            total_pollos += Decimal('0.50') * detalle.cantidad * menu_producto.cantidad
-                        else:
-                            total_pollos += detalle.cantidad * menu_producto.cantidad
-                    
-                    # Contar los cachopos de ternera, pollo y lomo
-                    if 'cachopo' in nombre_producto:
-                        if 'ternera' in nombre_producto:
-                            total_cachopos_ternera += detalle.cantidad * menu_producto.cantidad
-                        elif 'pollo' in nombre_producto:
-                            total_cachopos_pollo += detalle.cantidad * menu_producto.cantidad
-                        elif 'lomo' in nombre_producto:
-                            total_cachopos_lomo += detalle.cantidad * menu_producto.cantidad
-
-            # Añadir el total a cada pedido
-            pedido.total_precio = total_precio
-            # Acumulamos el total de ventas
-            total_ventas += total_precio
-
-            # Obtener la hora del pedido
-            hora_pedido = timezone.localtime(pedido.fecha_hora).time()  # Ajustamos a la zona horaria local
-
-            # Contamos los pedidos por intervalo
-            for i, (inicio, fin) in enumerate(intervalos):
-                inicio_hora = datetime.strptime(inicio, '%H:%M').time()
-                fin_hora = datetime.strptime(fin, '%H:%M').time()
-
-                # Verificamos si la hora del pedido está dentro del intervalo
-                if i == len(intervalos) - 1:  # Si es el último intervalo
-                    if inicio_hora <= hora_pedido <= fin_hora:  # Permitimos la hora final también
-                        conteo_pedidos_por_intervalo[(inicio, fin)] += 1
-                        break  # Salimos del bucle una vez que encontramos el intervalo
-                else:
-                    if inicio_hora <= hora_pedido < fin_hora:  # Los demás intervalos son estrictos
-                        conteo_pedidos_por_intervalo[(inicio, fin)] += 1
-                        break  # Salimos del bucle una vez que encontramos el intervalo
-
-        # Asignar total de pollos y cachopos al contexto
-        context['total_pollos'] = total_pollos
-        context['total_cachopos_ternera'] = total_cachopos_ternera
-        context['total_cachopos_pollo'] = total_cachopos_pollo
-        context['total_cachopos_lomo'] = total_cachopos_lomo
-        context['total_cachopos_degustacion'] = total_cachopos_degustacion
-
-        # Obtener inventarios
-        inventario_pollo = Inventario.objects.filter(producto_id=1).first()
-        if inventario_pollo:
-            # Añadir inventario de pollo al contexto
-            context['inventario_pollos'] = inventario_pollo
-            # obtenemos el recuento de pollos restantes
-            context['pollos_restantes'] = inventario_pollo.cantidad_disponible - total_pollos
-        else:
-            context['inventario_pollos'] = None
-            context['pollos_restantes'] = 0
-
-        # añadimos el total de ventas  al contexto
-        context['total_ventas'] = total_ventas 
-
-        # Añadir el conteo de pedidos por intervalo al contexto
-        context['conteo_pedidos_por_intervalo'] = conteo_pedidos_por_intervalo 
+
+        # Construir el tablero con un número fijo de consultas
+        tablero = construir_tablero(self.object_list)
+        context.update(tablero)
+
+        # Existencias de todos los productos con inventario: el inventario se descuenta con cada pedido, así que solo
+        # describe el día actual. Los pollos disponibles son los que quedan más los encargados hoy
+        context['es_hoy'] = context['fecha'] == datetime.today().date().strftime('%Y-%m-%d')
+        if context['es_hoy']:
+            context['existencias'] = existencias()
+            context['pollos_restantes'] = existencias_contador('pollos')
+            context['pollos_disponibles'] = context['pollos_restantes'] + tablero['total_pollos']
+
+        # Cambios de otras pantallas: por eventos si se sirve por ASGI, si no consultando cada cierto tiempo la versión
+        # del tablero (TableroCambiosView) y recargando solo si ha cambiado
+        context['eventos_en_vivo'] = settings.ASADOR_EVENTOS_SSE
+        context['sondeo_segundos'] = settings.ASADOR_SONDEO_SEGUNDOS
+        pedidos = tablero['pedidos']
+        context['version_tablero'] = version_tablero(len(pedidos), max((p.modificado for p in pedidos), default=None))
 
         return context
 
@@ -252,22 +135,140 @@ class PedidoListView(LoginRequiredMixin, ListView):
         # Acción para cierre del día
         elif accion == 'cierre_dia':
             fecha = data.get('fecha')
-            numero_pedidos = data.get('numero_pedidos')
-            total_pollos = data.get('total_pollos')
-            total_cachopos = data.get('total_cachopos')
-            total_ventas = data.get('totalVentas')
             overwrite = data.get('overwrite', False)  # Valor por defecto es False
-            print(f"fecha: {fecha}")
-            return self.cierre_dia(fecha, numero_pedidos, total_pollos, total_cachopos, total_ventas, overwrite)
+            return self.cierre_dia(fecha, overwrite)
         
         return JsonResponse({'success': False, 'message': 'No se pudo procesar la solicitud.'})
 
+# Recuento de pedidos por intervalo en JSON para la pantalla de cocina
+class IntervalosPedidosView(LoginRequiredMixin, View):
+    # Configuración de LoginRequiredMixin
+    login_url = 'login'
+    redirect_field_name = None
+
+    def get(self, request):
+        fecha = request.GET.get('fecha')
+        try:
+            pedidos = filtrar_pedidos_dia(Pedido.objects.all(), fecha)
+            minutos = int(request.GET.get('minutos') or 0) or None
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Parámetros incorrectos.'}, status=400)
+        if minutos is not None and not 5 <= minutos <= 120:
+            return JsonResponse({'success': False, 'message': 'El intervalo debe estar entre 5 y 120 minutos.'}, status=400)
+
+        histograma = histograma_pedidos(pedidos, minutos)
+        return JsonResponse({'success': True, 'fecha': fecha or timezone.localdate().strftime('%Y-%m-%d'), **histograma.como_json()})
+
+# Versión y contadores del tablero de un día en JSON: las pantallas servidas sin eventos la consultan cada
+# ASADOR_SONDEO_SEGUNDOS en lugar de pedir la lista de pedidos entera
+class TableroCambiosView(LoginRequiredMixin, View):
+    # Configuración de LoginRequiredMixin
+    login_url = 'login'
+    redirect_field_name = None
+
+    def get(self, request):
+        fecha = request.GET.get('fecha')
+        try:
+            fecha = datetime.strptime(fecha, '%Y-%m-%d').date() if fecha else timezone.localdate()
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Formato de fecha incorrecto.'}, status=400)
+        return JsonResponse({'success': True, 'fecha': fecha.isoformat(), 'contadores': contadores_dia(fecha)})
+
+# Alta de pedidos en lote (JSON) para tomar pedidos por teléfono sin pasar por el formulario
+class PedidoLoteView(LoginRequiredMixin, View):
+    # Configuración de LoginRequiredMixin
+    login_url = 'login'
+    redirect_field_name = None
+
+    def post(self, request):
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'message': 'Error al procesar los datos JSON.'}, status=400)
+
+        # Se acepta un pedido suelto, una lista de pedidos o {"pedidos": [...]}
+        if isinstance(data, dict):
+            data = data['pedidos'] if 'pedidos' in data else [data]
+        if not isinstance(data, list) or not data:
+            return JsonResponse({'success': False, 'message': 'No se ha recibido ningún pedido.'}, status=400)
+        if len(data) > MAXIMO_PEDIDOS_LOTE:
+            return JsonResponse({'success': False, 'message': f'Máximo {MAXIMO_PEDIDOS_LOTE} pedidos por envío.'}, status=400)
+
+        try:
+            pedidos, errores = registrar_lote_pedidos(data)
+        except IntegrityError:
+            # Un producto o menú eliminado por otro proceso mientras se guardaba el lote
+            return JsonResponse({'success': False, 'message': 'El catálogo ha cambiado, vuelve a enviar los pedidos.'}, status=409)
+        if errores:
+            return JsonResponse({'success': False, 'message': 'Hay pedidos con errores.', 'errores': errores}, status=400)
+        return JsonResponse({'success': True, 'pedidos': pedidos}, status=201)
+
+# Tablero en vivo: las pantallas de cocina y mostrador reciben los cambios de los pedidos (server-sent events)
+# en lugar de recargar la lista. Necesita servirse por ASGI (pettisso/asgi.py) para mantener las conexiones abiertas:
+# sin ASADOR_EVENTOS_SSE responde 204 (el navegador no reintenta) y la lista consulta los cambios por su cuenta
+class TableroEventosView(View):
+    # Segundos entre comentarios de mantenimiento para que proxies y navegadores no cierren la conexión
+    mantener_conexion = 15
+
+    async def get(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect('login')
+        if not settings.ASADOR_EVENTOS_SSE:
+            return HttpResponse(status=204)
+
+        fecha = request.GET.get('fecha')
+        try:
+            if fecha:
+                datetime.strptime(fecha, '%Y-%m-%d')
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'Formato de fecha incorrecto.'}, status=400)
+
+        response = StreamingHttpResponse(self.eventos(fecha), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def eventos(self, fecha):
+        cola = suscribir()
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=self.mantener_conexion)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                # Con ?fecha=AAAA-MM-DD solo se envían los cambios de ese día
+                if fecha and evento['fecha'] != fecha:
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            cancelar_suscripcion(cola)
+
+# Guardar el pedido y sus líneas en una sola transacción (compartido por crear y editar)
+class LineasPedidoMixin:
+    creado = False
+
+    def form_valid(self, form):
+        try:
+            productos = leer_lineas(self.request.POST, 'productos', 'producto')
+            menus = leer_lineas(self.request.POST, 'menus', 'menu')
+            with transaction.atomic():
+                self.object = form.save()
+                guardar_lineas(self.object, productos, menus, creado=self.creado)
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
 # Crear un nuevo pedido
-class PedidoCreateView(CreateView):
+class PedidoCreateView(LineasPedidoMixin, CreateView):
     model = Pedido
     form_class = PedidoForm
     template_name = 'asador/pedidos/crear_pedido.html'
     success_url = reverse_lazy('lista_pedidos')
+    creado = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -275,45 +276,9 @@ class PedidoCreateView(CreateView):
         context['menus'] = Menu.objects.all().order_by('nombre')
         return context
 
-    def form_valid(self, form):
-        # Guardar el pedido
-        pedido = form.save()
-        print(f"Fecha y hora del pedido guardado: {pedido.fecha_hora}")
-        # Procesar productos asociados
-        i = 0
-        while True:
-            producto_id = self.request.POST.get(f'productos[{i}][producto]')
-            cantidad = self.request.POST.get(f'productos[{i}][cantidad]')
-            
-            if producto_id is None or cantidad is None:
-                break  # Salir del bucle si no hay más productos
-
-            if producto_id and cantidad:
-                producto = get_object_or_404(Producto, id=producto_id)
-                PedidoProducto.objects.create(pedido=pedido, producto=producto, cantidad=int(cantidad))
-            
-            i += 1  # Incrementar el índice para la próxima iteración
-
-        # Procesar menús asociados
-        i = 0
-        while True:
-            menu_id = self.request.POST.get(f'menus[{i}][menu]')
-            cantidad = self.request.POST.get(f'menus[{i}][cantidad]')
-
-            if menu_id is None or cantidad is None:
-                break  # Salir del bucle si no hay más menús
-
-            if menu_id and cantidad:
-                menu = get_object_or_404(Menu, id=menu_id)
-                PedidoMenu.objects.create(pedido=pedido, menu=menu, cantidad=int(cantidad))
-            
-            i += 1  # Incrementar el índice para la próxima iteración
-
-        return super().form_valid(form)
-
 
 # Editar un pedido existente
-class PedidoUpdateView(UpdateView):
+class PedidoUpdateView(LineasPedidoMixin, UpdateView):
     model = Pedido
     form_class = PedidoForm
     template_name = 'asador/pedidos/editar_pedido.html'
@@ -323,51 +288,11 @@ class PedidoUpdateView(UpdateView):
         context = super().get_context_data(**kwargs)
         context['productos'] = Producto.objects.all().order_by('categoria', 'nombre')
         context['menus'] = Menu.objects.all().order_by('nombre')
-        context['pedido_productos'] = PedidoProducto.objects.filter(pedido=self.object)
-        context['pedido_menus'] = PedidoMenu.objects.filter(pedido=self.object)
+        context['pedido_productos'] = PedidoProducto.objects.filter(pedido=self.object).select_related('producto')
+        context['pedido_menus'] = PedidoMenu.objects.filter(pedido=self.object).select_related('menu')
         return context
     
     def get_initial(self):
         initial = super().get_initial()
         initial['fecha_hora'] = self.object.fecha_hora.astimezone(timezone.get_current_timezone()).replace(tzinfo=None).isoformat()
         return initial
-
-    def form_valid(self, form):
-        # Guardar el pedido
-        pedido = form.save()
-
-        # Eliminar los productos y menús existentes antes de agregar los nuevos
-        PedidoProducto.objects.filter(pedido=pedido).delete()
-        PedidoMenu.objects.filter(pedido=pedido).delete()
-
-        # Procesar productos asociados
-        i = 0
-        while True:
-            producto_id = self.request.POST.get(f'productos[{i}][producto]')
-            cantidad = self.request.POST.get(f'productos[{i}][cantidad]')
-            
-            if producto_id is None or cantidad is None:
-                break  # Salir del bucle si no hay más productos
-
-            if producto_id and cantidad:
-                producto = get_object_or_404(Producto, id=producto_id)
-                PedidoProducto.objects.create(pedido=pedido, producto=producto, cantidad=int(cantidad))
-            
-            i += 1  # Incrementar el índice para la próxima iteración
-
-        # Procesar menús asociados
-        i = 0
-        while True:
-            menu_id = self.request.POST.get(f'menus[{i}][menu]')
-            cantidad = self.request.POST.get(f'menus[{i}][cantidad]')
-
-            if menu_id is None or cantidad is None:
-                break  # Salir del bucle si no hay más menús
-
-            if menu_id and cantidad:
-                menu = get_object_or_404(Menu, id=menu_id)
-                PedidoMenu.objects.create(pedido=pedido, menu=menu, cantidad=int(cantidad))
-            
-            i += 1  # Incrementar el índice para la próxima iteración
-
-        return super().form_valid(form)
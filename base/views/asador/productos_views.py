@@ -31,12 +31,12 @@ class ProductoListView(LoginRequiredMixin, ListView):
 class ProductoCreateView(CreateView):
     model = Producto
     template_name = 'asador/productos/crear_producto.html'
-    fields = ['nombre', 'categoria', 'precio']
+    fields = ['nombre', 'categoria', 'precio', 'contador', 'peso_contador']
     success_url = reverse_lazy('lista_productos')
 
 
 class ProductoUpdateView(UpdateView):
     model = Producto
     template_name = 'asador/productos/editar_producto.html'
-    fields = ['nombre', 'categoria', 'precio']
+    fields = ['nombre', 'categoria', 'precio', 'contador', 'peso_contador']
     success_url = reverse_lazy('lista_productos')
\ No newline at end of file
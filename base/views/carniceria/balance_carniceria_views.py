@@ -3,9 +3,7 @@ import json
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import render
 from django.views import View
-from django.db.models import Sum, Q
-from decimal import Decimal
-from base.models import Venta, FacturasIVA, FacturaTienda, GastosTienda, GastosPersonales, PagosBanco
+from base.services.balance_service import AGRUPACION_POR_DEFECTO, AGRUPACIONES, balance_carniceria
 
 class BalanceCarniceriaView(LoginRequiredMixin, View):
 
@@ -16,32 +14,28 @@ class BalanceCarniceriaView(LoginRequiredMixin, View):
     def get(self, request):
         fecha_inicio = request.GET.get('fecha_inicio')
         fecha_fin = request.GET.get('fecha_fin')
-
-        # Filtrar registros según las fechas seleccionadas
-        filtros = Q()
-        if fecha_inicio and fecha_fin:
-            filtros &= Q(fecha__range=[fecha_inicio, fecha_fin])
-
-        # Obtener y sumar el total de ventas
-        total_ventas = Venta.objects.filter(filtros).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-
-        # Obtener y sumar los totales de compras
-        total_facturas_iva = FacturasIVA.objects.filter(filtros).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        total_facturas_tienda = FacturaTienda.objects.filter(filtros).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        compras = total_facturas_iva + total_facturas_tienda
-
-        # Obtener y sumar los totales de gastos
-        total_gastos_tienda = GastosTienda.objects.filter(filtros).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
-        total_pagos_banco = PagosBanco.objects.filter(filtros).aggregate(Sum('total'))['total__sum'] or Decimal('0.00')
-        gastos = total_gastos_tienda + total_pagos_banco
-
-        # Calcular beneficios
-        beneficios = total_ventas - compras - gastos
+        agrupacion = request.GET.get('agrupacion')
+        if agrupacion not in AGRUPACIONES:
+            agrupacion = AGRUPACION_POR_DEFECTO
+
+        # Totales y evolución por día, semana o mes en una sola consulta
+        totales, serie = balance_carniceria(fecha_inicio, fecha_fin, agrupacion)
+
+        # Serie para el gráfico de evolución
+        serie_list = [{
+            'periodo': item['periodo'].strftime('%Y-%m-%d'),  # Convertir a cadena
+            'ventas': float(item['ventas']),
+            'compras': float(item['compras']),
+            'gastos': float(item['gastos']),
+            'beneficios': float(item['beneficios']),
+        } for item in serie]
 
         context = {
-            'ventas': total_ventas,
-            'compras': compras,
-            'gastos': gastos,
-            'beneficios': beneficios,
+            'ventas': totales['ventas'],
+            'compras': totales['compras'],
+            'gastos': totales['gastos'],
+            'beneficios': totales['beneficios'],
+            'serie': json.dumps(serie_list),
+            'agrupacion': agrupacion,
         }
         return render(request, 'carniceria/balance/balance.html', context)
@@ -1,4 +1,3 @@
-from datetime import datetime, timedelta
 import json
 
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -6,13 +5,14 @@ from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView, TemplateView
 from django.http import JsonResponse
-from django.utils.timezone import make_aware
 from base.forms import CapitalForm
 from base.models import Capital
-from django.db.models import Sum
+from base.services.paginacion_service import rango_fechas_lista
+from base.services.resumen_carniceria_service import totales_capital
+from base.views.mixins import PaginacionKeysetMixin
 
 
-class CapitalListView(LoginRequiredMixin, TemplateView):
+class CapitalListView(LoginRequiredMixin, PaginacionKeysetMixin, TemplateView):
     template_name = 'carniceria/capital/lista_capital.html'
 
     # Configuración de LoginRequiredMixin
@@ -20,52 +20,36 @@ class CapitalListView(LoginRequiredMixin, TemplateView):
     redirect_field_name = None
 
 
+    # Tablas paginadas por (fecha, id): el capital sin tarjetas y las tarjetas ('TA'), con la misma plantilla de filas
+    tablas_paginadas = {
+        'capitales': ('carniceria/capital/filas_capital.html', 'fecha'),
+        'tarjetas': ('carniceria/capital/filas_capital.html', 'fecha'),
+    }
+
+    def consulta_tabla(self, tabla):
+        capitales = Capital.objects.filter(fecha__range=(self.fecha_inicio, self.fecha_fin))
+        if tabla == 'tarjetas':
+            return capitales.filter(tipo_ingreso='TA')
+        return capitales.exclude(tipo_ingreso='TA')
+
+    def get(self, request, *args, **kwargs):
+        # Rango de fechas del filtro (la semana actual si falta o no es válido)
+        self.fecha_inicio, self.fecha_fin, self.fecha_inicio_str, self.fecha_fin_str = rango_fechas_lista(
+            request.GET.get('fecha_inicio'), request.GET.get('fecha_fin'))
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Obtener las fechas de los parámetros GET
-        fecha_inicio_str = self.request.GET.get('fecha_inicio')
-        fecha_fin_str = self.request.GET.get('fecha_fin')
-
-        if fecha_inicio_str and fecha_fin_str:
-            try:
-                # Convertir las fechas a objetos datetime
-                fecha_inicio = make_aware(datetime.strptime(fecha_inicio_str, '%Y-%m-%d'))
-                fecha_fin = make_aware(datetime.strptime(fecha_fin_str, '%Y-%m-%d')) + timedelta(days=1) - timedelta(seconds=1)
-            except ValueError:
-                fecha_inicio, fecha_fin = None, None
-        else:
-            # Si no hay fechas, usar la semana actual
-            hoy = datetime.now().date()
-            fecha_inicio = hoy - timedelta(days=hoy.weekday())  # Lunes de esta semana
-            fecha_fin = fecha_inicio + timedelta(days=6)  # Domingo de esta semana
-            fecha_inicio = make_aware(datetime.combine(fecha_inicio, datetime.min.time()))
-            fecha_fin = make_aware(datetime.combine(fecha_fin, datetime.max.time()))
-
-        # Filtrar las ventas por el rango de fechas y excluir las de tipo 'TA' (Tarjetas)
-        if fecha_inicio and fecha_fin:
-            capitales = Capital.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).exclude(tipo_ingreso='TA').order_by('-fecha')
-        else:
-            capitales = Capital.objects.exclude(tipo_ingreso='TA').order_by('-fecha')
-
-        # Calcular el total de capitales excluyendo el tipo 'TA' (Tarjetas)
-        total_capitales = Capital.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).exclude(tipo_ingreso='TA').aggregate(total=Sum('total'))['total'] or 0
-
-        # obtener el objeto de capitales
-        tarjetas = Capital.objects.filter(tipo_ingreso='TA', fecha__range=(fecha_inicio, fecha_fin))
-        
-        # Calcular el total de capitales con tipo 'TA' (Tarjetas)
-        total_tarjetas = tarjetas.aggregate(total=Sum('total'))['total'] or 0
-
-        # Añadir las capitales y los totales al contexto
-        context['capitales'] = capitales
-        context['total_capitales'] = total_capitales
-        context['tarjetas'] = tarjetas
-        context['total_tarjetas'] = total_tarjetas
+        # Primera página del capital y de las tarjetas
+        self.contexto_paginado(context)
+
+        # Totales del capital (sin tarjetas) y de las tarjetas desde el resumen diario de la carnicería
+        context['total_capitales'], context['total_tarjetas'] = totales_capital(self.fecha_inicio, self.fecha_fin)
 
         # Añadir las fechas al contexto para el formulario
-        context['fecha_inicio'] = fecha_inicio_str if fecha_inicio_str else fecha_inicio.strftime('%Y-%m-%d')
-        context['fecha_fin'] = fecha_fin_str if fecha_fin_str else fecha_fin.strftime('%Y-%m-%d')
+        context['fecha_inicio'] = self.fecha_inicio_str
+        context['fecha_fin'] = self.fecha_fin_str
 
         return context
 
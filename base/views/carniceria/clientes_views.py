@@ -3,13 +3,16 @@ import json
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import CreateView, UpdateView, TemplateView
 from django.http import JsonResponse
 from base.forms import ClienteForm
 from base.models import Cliente
+from base.services.clientes_service import buscar_clientes, por_subcadena
+from base.views.mixins import PaginacionKeysetMixin
 
 
-class ClienteListView(LoginRequiredMixin, TemplateView):
+class ClienteListView(LoginRequiredMixin, PaginacionKeysetMixin, TemplateView):
     template_name = 'carniceria/clientes/lista_clientes.html'
 
     # Configuración de LoginRequiredMixin
@@ -17,14 +20,21 @@ class ClienteListView(LoginRequiredMixin, TemplateView):
     redirect_field_name = None
 
 
+    # Tabla paginada por (nombre, id) en orden alfabético con su plantilla de filas
+    tablas_paginadas = {'clientes': ('carniceria/clientes/filas_clientes.html', 'nombre')}
+    orden_descendente = False
+
+    def consulta_tabla(self, tabla):
+        # Con texto de búsqueda, solo los clientes que lo contienen en código, nombre o CIF/DNI
+        texto = self.request.GET.get('q', '').strip()
+        return por_subcadena(texto) if texto else Cliente.objects.all()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Obtener los clientes
-        clientes = Cliente.objects.all()
-
-        # Añadir los clientes al contexto
-        context['clientes'] = clientes
+        # Primera página de clientes
+        self.contexto_paginado(context)
+        context['q'] = self.request.GET.get('q', '')
 
         return context
 
@@ -45,6 +55,24 @@ class ClienteListView(LoginRequiredMixin, TemplateView):
             return JsonResponse({'success': False, 'message': 'Error al procesar los datos JSON.'})
 
 
+# Autocompletado de clientes: ?q=<texto> devuelve los primeros que coinciden (nunca la tabla entera)
+class ClienteBusquedaView(LoginRequiredMixin, View):
+    # Configuración de LoginRequiredMixin
+    login_url = 'login'
+    redirect_field_name = None
+
+    def get(self, request):
+        try:
+            limite = int(request.GET['limite']) if request.GET.get('limite') else None
+        except ValueError:
+            return JsonResponse({'success': False, 'message': 'El límite debe ser un número.'}, status=400)
+        if limite is not None and limite < 1:
+            return JsonResponse({'success': False, 'message': 'El límite debe ser al menos 1.'}, status=400)
+
+        clientes = buscar_clientes(request.GET.get('q'), limite)
+        return JsonResponse({'success': True, 'clientes': [cliente.to_dict() for cliente in clientes]})
+
+
 class ClienteCreateView(CreateView):
     model = Cliente
     form_class = ClienteForm
@@ -1,4 +1,3 @@
-from datetime import datetime, timedelta
 import json
 
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -9,13 +8,10 @@ from django.http import JsonResponse
 from base.forms import FacturaTiendaForm, FacturasIVAForm
 from base.models import FacturasIVA, FacturaTienda
 from django.views.generic.base import TemplateView
-from django.utils.timezone import make_aware
-from datetime import datetime, timedelta
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404
-from datetime import datetime, timedelta
+from base.services.paginacion_service import rango_fechas_lista
+from base.views.mixins import PaginacionKeysetMixin
 
-class CompraListView(LoginRequiredMixin, TemplateView):
+class CompraListView(LoginRequiredMixin, PaginacionKeysetMixin, TemplateView):
     template_name = 'carniceria/compras/lista_compras.html'
 
     # Configuración de LoginRequiredMixin
@@ -23,42 +19,31 @@ class CompraListView(LoginRequiredMixin, TemplateView):
     redirect_field_name = None
 
 
+    # Tablas paginadas por (fecha, id) con sus plantillas de filas
+    tablas_paginadas = {
+        'facturas_iva': ('carniceria/compras/filas_facturas_iva.html', 'fecha'),
+        'facturas_tienda': ('carniceria/compras/filas_facturas_tienda.html', 'fecha'),
+    }
+
+    def consulta_tabla(self, tabla):
+        modelo = FacturasIVA if tabla == 'facturas_iva' else FacturaTienda
+        return modelo.objects.filter(fecha__range=(self.fecha_inicio, self.fecha_fin))
+
+    def get(self, request, *args, **kwargs):
+        # Rango de fechas del filtro (la semana actual si falta o no es válido)
+        self.fecha_inicio, self.fecha_fin, self.fecha_inicio_str, self.fecha_fin_str = rango_fechas_lista(
+            request.GET.get('fecha_inicio'), request.GET.get('fecha_fin'))
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Obtener las fechas de los parámetros GET
-        fecha_inicio_str = self.request.GET.get('fecha_inicio')
-        fecha_fin_str = self.request.GET.get('fecha_fin')
-
-        if fecha_inicio_str and fecha_fin_str:
-            try:
-                # Convertir las fechas a objetos datetime
-                fecha_inicio = make_aware(datetime.strptime(fecha_inicio_str, '%Y-%m-%d'))
-                fecha_fin = make_aware(datetime.strptime(fecha_fin_str, '%Y-%m-%d')) + timedelta(days=1) - timedelta(seconds=1)
-            except ValueError:
-                fecha_inicio, fecha_fin = None, None
-        else:
-            # Si no hay fechas, usar la semana actual
-            hoy = datetime.now().date()
-            # Calcular el lunes de la semana en curso (inicio de la semana)
-            fecha_inicio = hoy - timedelta(days=hoy.weekday())  # Lunes de esta semana
-            # Calcular el domingo de la semana en curso (fin de la semana)
-            fecha_fin = fecha_inicio + timedelta(days=6)  # Domingo de esta semana
-            # Convertir a datetime y hacer aware
-            fecha_inicio = make_aware(datetime.combine(fecha_inicio, datetime.min.time()))
-            fecha_fin = make_aware(datetime.combine(fecha_fin, datetime.max.time()))
-
-        # Filtrar ambas tablas por el rango de fechas si es válido
-        if fecha_inicio and fecha_fin:
-            context['facturas_iva'] = FacturasIVA.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by('-fecha')
-            context['facturas_tienda'] = FacturaTienda.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by('-fecha')
-        else:
-            context['facturas_iva'] = FacturasIVA.objects.all().order_by('-fecha')
-            context['facturas_tienda'] = FacturaTienda.objects.all().order_by('-fecha')
+        # Primera página de cada tabla en el rango de fechas
+        self.contexto_paginado(context)
 
         # Añadir las fechas al contexto para el formulario
-        context['fecha_inicio'] = fecha_inicio_str if fecha_inicio_str else fecha_inicio.strftime('%Y-%m-%d')
-        context['fecha_fin'] = fecha_fin_str if fecha_fin_str else fecha_fin.strftime('%Y-%m-%d')
+        context['fecha_inicio'] = self.fecha_inicio_str
+        context['fecha_fin'] = self.fecha_fin_str
 
         return context
 
@@ -5,60 +5,52 @@ from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from base.models import Factura, FacturaProducto
 from base.forms import FacturaForm, FacturaProductoFormSet
+from base.services.exportar_facturas_service import flujo_zip_facturas
+from base.services.facturas_pdf_service import pdf_factura
+from base.services.paginacion_service import rango_fechas_lista
+from base.views.mixins import PaginacionKeysetMixin
 from django.db import transaction
-from django.utils.timezone import make_aware
-from datetime import datetime, timedelta
-from django.http import HttpResponse
-from django.template.loader import get_template
-import pdfkit
-from django.conf import settings
-from bs4 import BeautifulSoup
-
-class FacturaListView(LoginRequiredMixin, ListView):
+from django.http import FileResponse, StreamingHttpResponse
+from django.views import View
+import logging
+
+logger = logging.getLogger(__name__)
+
+class FacturaListView(LoginRequiredMixin, PaginacionKeysetMixin, ListView):
     model = Factura
     template_name = 'carniceria/facturas/lista_facturas.html'
     context_object_name = 'facturas'
-    ordering = ['numero_factura']
 
     # Configuración de LoginRequiredMixin
     login_url = 'login'
     redirect_field_name = None
 
 
+    # Tabla paginada por (fecha_emision, id) con su plantilla de filas
+    tablas_paginadas = {'facturas': ('carniceria/facturas/filas_facturas.html', 'fecha_emision')}
+
+    def get_queryset(self):
+        return Factura.objects.select_related('cliente').filter(
+            fecha_emision__range=(self.fecha_inicio.date(), self.fecha_fin.date()))
+
+    def consulta_tabla(self, tabla):
+        return self.get_queryset()
+
+    def get(self, request, *args, **kwargs):
+        # Rango de fechas del filtro (la semana actual si falta o no es válido)
+        self.fecha_inicio, self.fecha_fin, self.fecha_inicio_str, self.fecha_fin_str = rango_fechas_lista(
+            request.GET.get('fecha_inicio'), request.GET.get('fecha_fin'))
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Obtener las fechas de los parámetros GET
-        fecha_inicio_str = self.request.GET.get('fecha_inicio')
-        fecha_fin_str = self.request.GET.get('fecha_fin')
-
-        if fecha_inicio_str and fecha_fin_str:
-            try:
-                # Convertir las fechas a objetos datetime
-                fecha_inicio = make_aware(datetime.strptime(fecha_inicio_str, '%Y-%m-%d'))
-                fecha_fin = make_aware(datetime.strptime(fecha_fin_str, '%Y-%m-%d')) + timedelta(days=1) - timedelta(seconds=1)
-            except ValueError:
-                fecha_inicio, fecha_fin = None, None
-        else:
-            # Si no hay fechas, usar la semana actual
-            hoy = datetime.now().date()
-            # Calcular el lunes de la semana en curso (inicio de la semana)
-            fecha_inicio = hoy - timedelta(days=hoy.weekday())  # Lunes de esta semana
-            # Calcular el domingo de la semana en curso (fin de la semana)
-            fecha_fin = fecha_inicio + timedelta(days=6)  # Domingo de esta semana
-            # Convertir a datetime y hacer aware
-            fecha_inicio = make_aware(datetime.combine(fecha_inicio, datetime.min.time()))
-            fecha_fin = make_aware(datetime.combine(fecha_fin, datetime.max.time()))
-
-        # Filtrar las facturas por el rango de fechas si es válido
-        if fecha_inicio and fecha_fin:
-            context['facturas'] = Factura.objects.select_related('cliente').filter(fecha_emision__range=(fecha_inicio, fecha_fin)).order_by('-fecha_emision')
-        else:
-            context['facturas'] = Factura.objects.select_related('cliente').all().order_by('-fecha_emision')
+        # Primera página de facturas del rango de fechas (sustituye a la lista completa)
+        self.contexto_paginado(context)
 
         # Añadir las fechas al contexto para el formulario
-        context['fecha_inicio'] = fecha_inicio_str if fecha_inicio_str else fecha_inicio.strftime('%Y-%m-%d')
-        context['fecha_fin'] = fecha_fin_str if fecha_fin_str else fecha_fin.strftime('%Y-%m-%d')
+        context['fecha_inicio'] = self.fecha_inicio_str
+        context['fecha_fin'] = self.fecha_fin_str
 
         return context
 
@@ -69,7 +61,39 @@ class FacturaListView(LoginRequiredMixin, ListView):
                 factura = get_object_or_404(Factura, id=factura_id)
                 factura.delete()
                 return JsonResponse({'success': True, 'message': 'Factura eliminada correctamente.'})
-        return super().get(request, *args, **kwargs)
+        return self.get(request, *args, **kwargs)
+
+# Exportar en un ZIP los PDFs de todas las facturas del filtro de fechas de la lista.
+# Los PDFs que faltan se generan en paralelo y el ZIP se envía según se van añadiendo.
+# X-Facturas-Total es el número de PDFs del ZIP; el avance por factura solo queda en el log del servidor
+class FacturaExportarView(LoginRequiredMixin, View):
+    # Configuración de LoginRequiredMixin
+    login_url = 'login'
+    redirect_field_name = None
+
+    def get(self, request):
+        filtro = (request.GET.get('fecha_inicio'), request.GET.get('fecha_fin'))
+        fecha_inicio, fecha_fin, *fechas_str = rango_fechas_lista(*filtro)
+        # Sin filtro se exporta la semana actual, como en la lista; un filtro que no es válido no se sustituye
+        if all(filtro) and tuple(fechas_str) != filtro:
+            return JsonResponse({'success': False, 'message': 'Formato de fecha incorrecto.'}, status=400)
+
+        facturas = Factura.objects.filter(fecha_emision__range=(fecha_inicio.date(), fecha_fin.date())).order_by('fecha_emision', 'id')
+        total = facturas.count()
+        if not total:
+            return JsonResponse({'success': False, 'message': 'No hay facturas en las fechas indicadas.'}, status=404)
+
+        def progreso(hechas, total):
+            logger.info('Exportando facturas: %s/%s', hechas, total)
+
+        response = StreamingHttpResponse(
+            flujo_zip_facturas(facturas, progreso=progreso),
+            content_type='application/zip',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="Facturas_Pettisso_{fecha_inicio:%Y-%m-%d}_{fecha_fin:%Y-%m-%d}.zip"')
+        response['X-Facturas-Total'] = str(total)
+        return response
 
 from django.db import transaction
 
@@ -102,6 +126,9 @@ class FacturaCreateView(CreateView):
                 productos_formset.save()
                 print("Productos guardados para la Factura con ID:", self.object.pk)
 
+                # Totales calculados con las líneas ya guardadas
+                self.object.save(update_fields=['total_neto', 'total_iva', 'total'])
+
                 # Verificar los productos guardados
                 for producto_form in productos_formset:
                     if producto_form.instance.pk:
@@ -157,6 +184,9 @@ class FacturaUpdateView(UpdateView):
                         print("Deleting product:", producto_form.instance.pk)
                         producto_form.instance.delete()
 
+                # Totales calculados con las líneas ya guardadas y borradas
+                self.object.save(update_fields=['total_neto', 'total_iva', 'total'])
+
                 # Agregar logs después de la validación y guardado
                 print("Form Data:", form.cleaned_data)
                 print("Product Formset Data:", [producto_form.cleaned_data for producto_form in productos_formset.forms if producto_form.cleaned_data])
@@ -203,85 +233,10 @@ class FacturaPreviewView(DetailView):
 
     def post(self, request, *args, **kwargs):
         factura = self.get_object()
-        productos = FacturaProducto.objects.filter(factura=factura)
+        productos = list(FacturaProducto.objects.filter(factura=factura))
 
-        # Contexto para el template
-        context = {
-            'factura': factura,
-            'cliente': factura.cliente,
-            'productos': productos,
-            'empresa': {
-                'nombre': factura.nombre_emisor,
-                'telefono': factura.telefono_empresa,
-                'email': factura.email_empresa,
-                'direccion': factura.direccion_emisor,
-                'cif_nif': factura.cif_nif_emisor
-            },
-            'totales': {
-                'neto': factura.total_neto,
-                'iva': factura.total_iva,
-                'total': factura.total
-            },
-        }
-
-        # Renderizar el template HTML
-        template = get_template(self.template_name)
-        html = template.render(context)
-
-        # Usar BeautifulSoup para extraer el div "factura-container"
-        soup = BeautifulSoup(html, 'html.parser')
-        factura_container = soup.find('div', class_='factura-container')
-
-        if not factura_container:
-            return HttpResponse('Error: No se encontró el contenido de la factura.', status=400)
-
-        # Ajustar las rutas relativas de las imágenes
-        for img in factura_container.find_all('img'):
-            src = img['src']
-            if src.startswith('/'):  # Convertir rutas relativas a absolutas
-                img['src'] = request.build_absolute_uri(src)
-
-        # Convertir el div extraído a HTML
-        factura_html = f"""
-        <html>
-            <head>
-                <style>
-                    html, body {{
-                        margin: 0;
-                        padding: 0;
-                        width: 100%;
-                        height: 100%;
-                    }}
-                </style>
-                <link rel="stylesheet" href="{request.build_absolute_uri(settings.STATIC_URL + 'styles/carniceria/facturas/facturas.css')}">
-            </head>
-            <body>
-                {factura_container}
-            </body>
-        </html>
-        """
-
-        # Configuración de pdfkit
-        options = {
-            'page-size': 'A4',
-            'margin-top': '0mm',
-            'margin-right': '0mm',
-            'margin-bottom': '0mm',
-            'margin-left': '0mm',
-            'encoding': 'UTF-8',
-            'enable-local-file-access': None,  # Habilitar acceso a archivos locales
-        }
+        # Si la factura no ha cambiado desde la última descarga se sirve el PDF ya generado
+        ruta_pdf = pdf_factura(factura, productos)
 
-        # Generar el PDF desde el div renderizado
-        pdf = pdfkit.from_string(
-            factura_html,
-            False,
-            options=options,
-            configuration=pdfkit.configuration(wkhtmltopdf=settings.PDFKIT_WKHTMLTOPDF)
-        )
-
-        # Enviar el PDF como respuesta HTTP
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Factura_Pettisso_{factura.numero_factura}.pdf"'
-
-        return response
+        return FileResponse(open(ruta_pdf, 'rb'), as_attachment=True, content_type='application/pdf',
+                            filename=f'Factura_Pettisso_{factura.numero_factura}.pdf')
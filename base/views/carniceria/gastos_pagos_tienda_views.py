@@ -1,58 +1,49 @@
-from datetime import datetime, timedelta
 import json
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404
-from django.utils.timezone import make_aware
 from django.views.generic.base import TemplateView
 from django.http import JsonResponse
 from base.models import GastosTienda, GastosPersonales, PagosBanco
 from django.views.generic import CreateView, UpdateView
 from django.urls import reverse_lazy
 from base.forms import GastosTiendaForm, GastosPersonalesForm, PagosBancoForm
+from base.services.paginacion_service import rango_fechas_lista
+from base.views.mixins import PaginacionKeysetMixin
 
-class GastosPagosListView(LoginRequiredMixin, TemplateView):
+class GastosPagosListView(LoginRequiredMixin, PaginacionKeysetMixin, TemplateView):
     template_name = 'carniceria/gastos_pagos/lista_gastos_pagos_tienda.html'
 
     # Configuración de LoginRequiredMixin
     login_url = 'login'
     redirect_field_name = None
 
+    # Tablas paginadas por (fecha, id) con sus plantillas de filas
+    tablas_paginadas = {
+        'gastos_tienda': ('carniceria/gastos_pagos/filas_gastos_tienda.html', 'fecha'),
+        'pagos_banco': ('carniceria/gastos_pagos/filas_pagos_banco.html', 'fecha'),
+        'gastos_personales': ('carniceria/gastos_pagos/filas_gastos_personales.html', 'fecha'),
+    }
+    modelos = {'gastos_tienda': GastosTienda, 'pagos_banco': PagosBanco, 'gastos_personales': GastosPersonales}
+
+    def consulta_tabla(self, tabla):
+        return self.modelos[tabla].objects.filter(fecha__range=(self.fecha_inicio, self.fecha_fin))
+
+    def get(self, request, *args, **kwargs):
+        # Rango de fechas del filtro (la semana actual si falta o no es válido)
+        self.fecha_inicio, self.fecha_fin, self.fecha_inicio_str, self.fecha_fin_str = rango_fechas_lista(
+            request.GET.get('fecha_inicio'), request.GET.get('fecha_fin'))
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Obtener las fechas de los parámetros GET
-        fecha_inicio_str = self.request.GET.get('fecha_inicio')
-        fecha_fin_str = self.request.GET.get('fecha_fin')
-
-        if fecha_inicio_str and fecha_fin_str:
-            try:
-                # Convertir las fechas a objetos datetime
-                fecha_inicio = make_aware(datetime.strptime(fecha_inicio_str, '%Y-%m-%d'))
-                fecha_fin = make_aware(datetime.strptime(fecha_fin_str, '%Y-%m-%d')) + timedelta(days=1) - timedelta(seconds=1)
-            except ValueError:
-                fecha_inicio, fecha_fin = None, None
-        else:
-            # Si no hay fechas, usar la semana actual
-            hoy = datetime.now().date()
-            fecha_inicio = hoy - timedelta(days=hoy.weekday())  # Lunes de esta semana
-            fecha_fin = fecha_inicio + timedelta(days=6)  # Domingo de esta semana
-            fecha_inicio = make_aware(datetime.combine(fecha_inicio, datetime.min.time()))
-            fecha_fin = make_aware(datetime.combine(fecha_fin, datetime.max.time()))
-
-        # Filtrar ambas tablas por el rango de fechas si es válido
-        if fecha_inicio and fecha_fin:
-            context['gastos_tienda'] = GastosTienda.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by('-fecha')
-            context['gastos_personales'] = GastosPersonales.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by('-fecha')
-            context['pagos_banco'] = PagosBanco.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by('-fecha')
-        else:
-            context['gastos_tienda'] = GastosTienda.objects.all().order_by('-fecha')
-            context['gastos_personales'] = GastosPersonales.objects.all().order_by('-fecha')
-            context['pagos_banco'] = PagosBanco.objects.all().order_by('-fecha')
+        # Primera página de cada tabla en el rango de fechas
+        self.contexto_paginado(context)
 
         # Añadir las fechas al contexto para el formulario
-        context['fecha_inicio'] = fecha_inicio_str if fecha_inicio_str else fecha_inicio.strftime('%Y-%m-%d')
-        context['fecha_fin'] = fecha_fin_str if fecha_fin_str else fecha_fin.strftime('%Y-%m-%d')
+        context['fecha_inicio'] = self.fecha_inicio_str
+        context['fecha_fin'] = self.fecha_fin_str
 
         return context
 
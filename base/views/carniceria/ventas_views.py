@@ -1,52 +1,44 @@
-from datetime import datetime, timedelta
 import json
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404
-from django.utils.timezone import make_aware
 from django.views.generic.base import TemplateView
 from django.http import JsonResponse
 from django.views.generic import CreateView, UpdateView
 from django.urls import reverse_lazy
 from base.models import Venta
 from base.forms import VentaForm
+from base.services.paginacion_service import rango_fechas_lista
+from base.views.mixins import PaginacionKeysetMixin
 
 
-class VentaListView(LoginRequiredMixin, TemplateView):
+class VentaListView(LoginRequiredMixin, PaginacionKeysetMixin, TemplateView):
     template_name = 'carniceria/ventas/lista_ventas.html'
 
     # Configuración de LoginRequiredMixin
     login_url = 'login'
     redirect_field_name = None
 
+    # Tabla paginada por (fecha, id) con su plantilla de filas
+    tablas_paginadas = {'ventas': ('carniceria/ventas/filas_ventas.html', 'fecha')}
+
+    def consulta_tabla(self, tabla):
+        return Venta.objects.filter(fecha__range=(self.fecha_inicio, self.fecha_fin))
+
+    def get(self, request, *args, **kwargs):
+        # Rango de fechas del filtro (la semana actual si falta o no es válido)
+        self.fecha_inicio, self.fecha_fin, self.fecha_inicio_str, self.fecha_fin_str = rango_fechas_lista(
+            request.GET.get('fecha_inicio'), request.GET.get('fecha_fin'))
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Obtener fechas de los parámetros GET
-        fecha_inicio_str = self.request.GET.get('fecha_inicio')
-        fecha_fin_str = self.request.GET.get('fecha_fin')
-
-        if fecha_inicio_str and fecha_fin_str:
-            try:
-                fecha_inicio = make_aware(datetime.strptime(fecha_inicio_str, '%Y-%m-%d'))
-                fecha_fin = make_aware(datetime.strptime(fecha_fin_str, '%Y-%m-%d')) + timedelta(days=1) - timedelta(seconds=1)
-            except ValueError:
-                fecha_inicio, fecha_fin = None, None
-        else:
-            hoy = datetime.now().date()
-            fecha_inicio = hoy - timedelta(days=hoy.weekday())  
-            fecha_fin = fecha_inicio + timedelta(days=6)
-            fecha_inicio = make_aware(datetime.combine(fecha_inicio, datetime.min.time()))
-            fecha_fin = make_aware(datetime.combine(fecha_fin, datetime.max.time()))
-
-        # Filtrar ventas por rango de fechas
-        if fecha_inicio and fecha_fin:
-            context['ventas'] = Venta.objects.filter(fecha__range=(fecha_inicio, fecha_fin)).order_by('-fecha')
-        else:
-            context['ventas'] = Venta.objects.all().order_by('-fecha')
-
-        context['fecha_inicio'] = fecha_inicio_str if fecha_inicio_str else fecha_inicio.strftime('%Y-%m-%d')
-        context['fecha_fin'] = fecha_fin_str if fecha_fin_str else fecha_fin.strftime('%Y-%m-%d')
+        # Primera página de ventas del rango de fechas
+        self.contexto_paginado(context)
+
+        context['fecha_inicio'] = self.fecha_inicio_str
+        context['fecha_fin'] = self.fecha_fin_str
 
         return context
 
@@ -0,0 +1,16 @@
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import HttpResponse
+from django.views import View
+from base.services.metricas_service import registro
+
+
+# Métricas del proceso en formato de texto de Prometheus (solo para el personal)
+class MetricasView(LoginRequiredMixin, UserPassesTestMixin, View):
+    login_url = 'login'
+    redirect_field_name = None
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        return HttpResponse(registro.como_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from base.services.paginacion_service import pagina_keyset
+
+
+# Listas paginadas por clave: la página carga la primera tanda de cada tabla y el botón "Cargar más"
+# pide las siguientes a la misma URL con ?tabla=<nombre>&cursor=<cursor> (mismos filtros), que responde en JSON
+class PaginacionKeysetMixin:
+    # {nombre de la tabla: (plantilla de las filas, campo de orden)}; el orden es (campo, id) descendente
+    tablas_paginadas = {}
+    orden_descendente = True
+
+    def consulta_tabla(self, tabla):
+        raise NotImplementedError
+
+    def paginar(self, tabla, cursor=None):
+        _, campo = self.tablas_paginadas[tabla]
+        return pagina_keyset(self.consulta_tabla(tabla), campo, cursor, descendente=self.orden_descendente)
+
+    # Primera página de cada tabla en el contexto: <tabla> con las filas y cursor_<tabla> para seguir
+    def contexto_paginado(self, context):
+        for tabla in self.tablas_paginadas:
+            context[tabla], context[f'cursor_{tabla}'] = self.paginar(tabla)
+        return context
+
+    def get(self, request, *args, **kwargs):
+        if 'cursor' not in request.GET:
+            return super().get(request, *args, **kwargs)
+
+        tabla = request.GET.get('tabla')
+        if tabla not in self.tablas_paginadas:
+            return JsonResponse({'success': False, 'message': 'Tabla no válida.'}, status=400)
+        try:
+            filas, cursor = self.paginar(tabla, request.GET['cursor'])
+        except ValueError as e:
+            return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+        plantilla, _ = self.tablas_paginadas[tabla]
+        html = render_to_string(plantilla, {'filas': filas}, request=request)
+        return JsonResponse({'success': True, 'html': html, 'cursor': cursor, 'filas': len(filas)})
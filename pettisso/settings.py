@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    'base.middleware.MetricasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -75,12 +76,48 @@ WSGI_APPLICATION = 'pettisso.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Perfil de base de datos según el entorno: SQLite (por defecto) o un PostgreSQL local con DB_MOTOR=postgresql.
+# Las migraciones son las mismas para los dos motores
+DB_MOTOR = os.environ.get('DB_MOTOR', 'sqlite')
+
+# Segundos que se reutiliza una conexión entre peticiones (0: una conexión por petición).
+# CONN_HEALTH_CHECKS comprueba la conexión reutilizada antes de usarla
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_MOTOR == 'postgresql':
+    # Necesita el paquete psycopg (pip install "psycopg[binary]")
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NOMBRE', 'pettisso'),
+            'USER': os.environ.get('DB_USUARIO', 'pettisso'),
+            'PASSWORD': os.environ.get('DB_CLAVE', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PUERTO', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NOMBRE', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+# PRAGMAs de cada conexión SQLite nueva (base/signals.py). WAL deja leer mientras otro proceso escribe,
+# busy_timeout (ms) espera al bloqueo en vez de fallar con "database is locked", synchronous=NORMAL
+# solo sincroniza el disco en los checkpoints del WAL y mmap_size (bytes) lee la base de datos mapeada en memoria.
+# Con DB_SQLITE_WAL=0 se usan los valores por defecto de SQLite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'busy_timeout': 5000,
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+} if os.environ.get('DB_SQLITE_WAL', '1') == '1' else {}
 
 
 # Password validation
@@ -123,7 +160,8 @@ STATICFILES_DIRS = [
     BASE_DIR / 'base' / 'static',  # Ruta a la carpeta static dentro de tu app 'base'
 ]
 
-STATIC_ROOT = BASE_DIR / 'staticfiles'
+# Carpeta de collectstatic (STATIC_ROOT en el entorno para recopilarlos en otra)
+STATIC_ROOT = Path(os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles'))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
@@ -139,8 +177,58 @@ INTERNAL_IPS = [
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 
-# Ruta al ejecutable wkhtmltopdf según el sistema operativo
+# Turnos de servicio del asador e intervalos del control de horas (en minutos)
+ASADOR_TURNOS = {
+    'comida': ('13:00', '15:30'),
+    'cena': ('20:00', '23:00'),
+}
+ASADOR_MINUTOS_INTERVALO = 15
+
+# Tablero de pedidos en vivo por server-sent events (/pedidos/eventos/). Cada pantalla mantiene la conexión abierta,
+# así que solo se activa (ASADOR_EVENTOS_SSE=1) cuando se sirve por ASGI (pettisso/asgi.py): con WSGI cada pestaña
+# ocuparía un worker. Desactivado, la vista responde 204 y la lista de pedidos consulta cambios cada
+# ASADOR_SONDEO_SEGUNDOS
+ASADOR_EVENTOS_SSE = os.environ.get('ASADOR_EVENTOS_SSE', '0') == '1'
+ASADOR_SONDEO_SEGUNDOS = 20
+
+# Puntos máximos del gráfico de evolución del balance del asador (se agrupa por semana o mes si hay más)
+ASADOR_BALANCE_MAX_PUNTOS = 120
+
+# Filas por página de las listas de la carnicería (el resto se pide con "Cargar más")
+CARNICERIA_TAMANO_PAGINA = 50
+
+# Clientes que devuelve como máximo el autocompletado de clientes de las facturas
+CLIENTES_BUSQUEDA_MAX = 20
+
+# Serie de la numeración automática de facturas (F2025-00001, F2025-00002...; se reinicia cada año)
+FACTURAS_SERIE = 'F'
+
+# Peticiones a partir de estos milisegundos que se registran en el log 'base.metricas' (las métricas
+# de todas las peticiones se consultan en /metricas/ en formato Prometheus, solo para el personal)
+METRICAS_UMBRAL_LENTO_MS = int(os.environ.get('METRICAS_UMBRAL_LENTO_MS', 500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'base.metricas': {'handlers': ['consola'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Carpeta donde se guardan los PDFs de facturas ya generados (se reutilizan mientras la factura no cambie).
+# /cache/ está en .gitignore; FACTURAS_PDF_DIR en el entorno para guardarlos fuera del proyecto
+FACTURAS_PDF_DIR = Path(os.environ.get('FACTURAS_PDF_DIR', BASE_DIR / 'cache' / 'facturas'))
+
+# Renderizador del PDF de las facturas: 'wkhtmltopdf' (plantilla HTML, ejecutable externo) o, solo como último
+# recurso si no se puede instalar wkhtmltopdf, 'pillow' (en el proceso, el PDF es una imagen sin texto seleccionable)
+FACTURAS_PDF_RENDERIZADOR = os.environ.get('FACTURAS_PDF_RENDERIZADOR', 'wkhtmltopdf')
+
+# Ruta al ejecutable wkhtmltopdf según el sistema operativo (vacía: se busca en el PATH)
 # PDFKIT_WKHTMLTOPDF = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
+PDFKIT_WKHTMLTOPDF = os.environ.get('WKHTMLTOPDF', '')
 
 if DEBUG:
     INSTALLED_APPS += ["debug_toolbar"]
@@ -0,0 +1,47 @@
+"""
+Configuración de producción de pettisso.
+
+Parte de settings.py y quita todo lo que solo sirve para depurar. Se activa con
+DJANGO_SETTINGS_MODULE=pettisso.settings_produccion y necesita ejecutar
+``python manage.py collectstatic`` en cada despliegue (los estáticos llevan el hash en el nombre).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+DEBUG = False
+
+# Sin la barra de depuración: ni la app, ni su middleware, ni sus URLs (base/urls.py solo las añade si está instalada)
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if not middleware.startswith('debug_toolbar.')]
+
+# Los estáticos se sirven antes de sesiones y autenticación, ya comprimidos y con caché de un año (base/middleware.py)
+MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                  'base.middleware.EstaticosMiddleware')
+ESTATICOS_MAX_AGE = 365 * 24 * 60 * 60
+
+# Plantillas compiladas una sola vez por proceso con el cargador en caché
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# Estáticos con el hash del contenido en el nombre (se pueden cachear sin caducidad), PNG optimizados
+# y copias .gz (y .br si está instalado brotli) generadas en collectstatic
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'base.storage.EstaticosComprimidosStorage'},
+}
+
+# Sesiones solo en la base de datos. No se usa cached_db: con LocMemCache cada worker tendría su propia copia
+# y un logout o un cambio de sesión en un worker no llegaría a los demás, que seguirían leyendo la sesión antigua.
+# Para cachear las sesiones haría falta una caché compartida entre procesos (Redis, Memcached)
+SESSION_ENGINE = 'django.contrib.sessions.backends.db'